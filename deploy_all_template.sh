@@ -11,6 +11,8 @@ LAYER_ARN_ARM="" # <--- YOUR ACTUAL ARM LAYER ARN
 ROLE_ARN=""      # <--- YOUR ACTUAL IAM ROLE ARN
 # Path to code
 PATH_TO_CODE="termProject/functions/deepseek" 
+# Helpers imported by every handler (bundled as the 'shared' package)
+PATH_TO_SHARED="termProject/functions/shared"
 
 # Function list (filenames corresponding to function names)
 # FUNCTIONS=("gpt_func1" "gpt_func2" "gpt_func3" "gpt_func4" "gpt_func5")
@@ -23,8 +25,10 @@ for func in "${FUNCTIONS[@]}"; do
     # Create temporary directory for packaging to avoid polluting source files
     mkdir -p build_temp
     cp "${PATH_TO_CODE}/${func}.py" build_temp/lambda_function.py
+    mkdir -p build_temp/shared
+    cp "${PATH_TO_SHARED}"/*.py build_temp/shared/
     cd build_temp
-    zip -r "../${func}.zip" lambda_function.py
+    zip -r "../${func}.zip" lambda_function.py shared
     cd ..
     rm -rf build_temp
 
@@ -3,8 +3,19 @@ import base64
 import io
 import time
 from PIL import Image
+from shared import buffers
+from shared import container
+from shared import engine as image_engine
+from shared import modes
+from shared import passthrough
+from shared import preflight
+from shared import profiler
+from shared import streaming
+from shared import stripes
 
 
+@container.tracked
+@profiler.profiled
 def lambda_handler(event, context):
     try:
         # Parse event body
@@ -12,27 +23,88 @@ def lambda_handler(event, context):
             event = json.loads(event)
 
         image_b64 = event.get('image', '')
+        params = event.get('params', {})
         if not image_b64:
             return {"success": False, "image": "", "execution_time_ms": 0.0, "error": "Missing 'image' in input"}
 
+        # Optional alternative engine (None keeps the default Pillow path below)
+        engine = image_engine.resolve_engine(params)
+        # Optional stripe parallelism across all vCPUs
+        parallel = bool(params.get('parallel', False))
+        parallel_stats = {} if parallel else None
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get('zero_copy', False))
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get('stream', False))
+        stream_stats = None
+        # Optional colour-mode contract: alpha is kept (LA) instead of dropped
+        preserve_mode = modes.preserve(params)
+
         # Start timing
         start_time = time.perf_counter()
 
+        # Optional header-only pre-flight: routes the request before the full decode
+        preflight_plan = preflight.plan(image_b64, params, stage=1) if params.get('preflight') else None
+
+        # Optional no-op detection: an image already in mode L returns the input bytes untouched
+        noop = passthrough.check(image_b64, params, stage=1, preflight_plan=preflight_plan)
+        if noop:
+            return {
+                "success": True,
+                "image": passthrough.payload(image_b64),
+                "execution_time_ms": round((time.perf_counter() - start_time) * 1000, 2),
+                "engine": engine,
+                "parallel": parallel_stats,
+                "stream": None,
+                "preflight": preflight_plan,
+                "passthrough": True,
+                "mode": "L",
+                "error": None
+            }
+
         # Decode base64
-        image_bytes = base64.b64decode(image_b64)
+        if stream:
+            # Oversized images are rejected at the header, before the rest is decoded
+            source_img, stream_stats = streaming.open_b64(image_b64, params, preflight_plan)
+        else:
+            if zero_copy:
+                image_source = buffers.decode_b64(image_b64)
+            else:
+                image_source = io.BytesIO(base64.b64decode(image_b64))
+            source_img = Image.open(image_source)
+            if preflight_plan:
+                preflight.apply_draft(source_img, preflight_plan)
 
         # Open and process image
-        with Image.open(io.BytesIO(image_bytes)) as img:
+        with source_img as img:
+            def to_grey(src):
+                if engine:
+                    return image_engine.greyscale(src, engine)
+                return src.convert('L')
+
             # Convert to greyscale
-            grey_img = img.convert('L')
+            tiles = preflight.tile_count(preflight_plan)
+            if parallel or tiles:
+                # Parallel stripes, or memory-bounded tiles one after another
+                grey_img, pixel_stats = stripes.map_stripes(
+                    img, to_grey, workers=None if parallel else 1, stripes=tiles)
+                if parallel:
+                    parallel_stats["pixels"] = pixel_stats
+            else:
+                grey_img = to_grey(img)
+            if preserve_mode:
+                grey_img = modes.with_alpha(grey_img, modes.source_alpha(img))
 
-            # Save to buffer
-            buffer = io.BytesIO()
-            grey_img.save(buffer, format='JPEG', quality=85)
+            # Save to buffer (PNG for LA)
+            buffer = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+            grey_img.save(buffer, **modes.save_options(grey_img, quality=85))
             buffer.seek(0)
 
             # Encode to base64
-            result_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+            if zero_copy:
+                result_b64 = buffers.encode_b64(buffer)
+            else:
+                result_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
 
         # Calculate execution time
         execution_time = (time.perf_counter() - start_time) * 1000
@@ -41,6 +113,12 @@ def lambda_handler(event, context):
             "success": True,
             "image": result_b64,
             "execution_time_ms": round(execution_time, 2),
+            "engine": engine,
+            "parallel": parallel_stats,
+            "stream": stream_stats,
+            "preflight": preflight_plan,
+            "passthrough": noop,
+            "mode": grey_img.mode,
             "error": None
         }
 
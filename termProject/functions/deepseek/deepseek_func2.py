@@ -3,8 +3,20 @@ import base64
 import io
 import time
 from PIL import Image, ImageResampling
+from shared import buffers
+from shared import container
+from shared import engine as image_engine
+from shared import geometry
+from shared import modes
+from shared import passthrough
+from shared import preflight
+from shared import profiler
+from shared import pyramid
+from shared import streaming
 
 
+@container.tracked
+@profiler.profiled
 def lambda_handler(event, context):
     try:
         # Parse input event
@@ -20,25 +32,85 @@ def lambda_handler(event, context):
         # Get dimensions with defaults
         width = int(params.get('width', 800))
         height = int(params.get('height', 600))
+        # Optional multi-resolution output: sizes=[[w, h], ...] replaces width/height
+        sizes = pyramid.parse_sizes(params)
+        result_images = None
+        pyramid_stats = None
+        # Optional fused rotation: Step 4's angle applied in the same resampling pass
+        rotate = geometry.parse_angle(params)
+        fused_stats = None
+        # Optional colour-mode contract (L/LA kept end to end)
+        preserve_mode = modes.preserve(params)
+
+        # Optional alternative engine (None keeps the default Pillow path below)
+        engine = image_engine.resolve_engine(params)
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get('zero_copy', False))
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get('stream', False))
+        stream_stats = None
 
         # Start timing
         start_time = time.perf_counter()
 
+        # Optional header-only pre-flight: routes the request before the full decode
+        preflight_plan = preflight.plan(image_b64, params, stage=2) if params.get('preflight') else None
+
+        # Optional no-op detection: resizing to the current size returns the input bytes untouched
+        noop = passthrough.check(image_b64, params, stage=2, size=None if sizes or rotate else (width, height),
+                                 preflight_plan=preflight_plan)
+        if noop:
+            return {
+                "success": True,
+                "image": passthrough.payload(image_b64),
+                "execution_time_ms": round((time.perf_counter() - start_time) * 1000, 2),
+                "engine": engine,
+                "stream": None,
+                "preflight": preflight_plan,
+                "passthrough": True,
+                "error": None
+            }
+
         # Decode base64
-        image_bytes = base64.b64decode(image_b64)
+        if stream:
+            # Oversized images are rejected at the header, before the rest is decoded
+            source_img, stream_stats = streaming.open_b64(image_b64, params, preflight_plan)
+        else:
+            if zero_copy:
+                image_source = buffers.decode_b64(image_b64)
+            else:
+                image_source = io.BytesIO(base64.b64decode(image_b64))
+            source_img = Image.open(image_source)
+            if preflight_plan:
+                preflight.apply_draft(source_img, preflight_plan)
 
         # Process image
-        with Image.open(io.BytesIO(image_bytes)) as img:
-            # Resize with high quality
-            resized_img = img.resize((width, height), resample=ImageResampling.LANCZOS)
+        with source_img as img:
+            if sizes:
+                # Pyramid: every size from this one decode, largest first
+                result_images, pyramid_stats = pyramid.render(img, sizes, zero_copy, preserve_mode)
+                result_b64 = result_images[0]
+                output_mode = pyramid_stats["mode"]
+            else:
+                # Resize with high quality
+                if rotate is not None:
+                    resized_img, fused_stats = geometry.resize_rotate(img, (width, height), rotate)
+                elif engine:
+                    resized_img = image_engine.resize(img, (width, height), engine)
+                else:
+                    resized_img = img.resize((width, height), resample=ImageResampling.LANCZOS)
 
-            # Save to buffer
-            buffer = io.BytesIO()
-            resized_img.save(buffer, format='JPEG', quality=85)
-            buffer.seek(0)
+                # Save to buffer (PNG for LA)
+                output_mode = resized_img.mode
+                buffer = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+                resized_img.save(buffer, **modes.save_options(resized_img, quality=85))
+                buffer.seek(0)
 
-            # Encode result
-            result_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+                # Encode result
+                if zero_copy:
+                    result_b64 = buffers.encode_b64(buffer)
+                else:
+                    result_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
 
         # Calculate execution time
         execution_time = (time.perf_counter() - start_time) * 1000
@@ -47,6 +119,14 @@ def lambda_handler(event, context):
             "success": True,
             "image": result_b64,
             "execution_time_ms": round(execution_time, 2),
+            "engine": engine,
+            "stream": stream_stats,
+            "preflight": preflight_plan,
+            "passthrough": noop,
+            "images": result_images,
+            "pyramid": pyramid_stats,
+            "fused": fused_stats,
+            "mode": output_mode,
             "error": None
         }
 
@@ -4,8 +4,19 @@ import io
 import time
 import traceback
 from PIL import Image
+from shared import buffers
+from shared import container
+from shared import depth as depth_map
+from shared import engine as image_engine
+from shared import modes
+from shared import preflight
+from shared import profiler
+from shared import streaming
+from shared import stripes
 
 
+@container.tracked
+@profiler.profiled
 def lambda_handler(event, context):
     try:
         # Parse input
@@ -14,7 +25,20 @@ def lambda_handler(event, context):
 
         image_b64 = event.get('image', '')
         params = event.get('params', {})
-        target_depth = params.get('target_depth', 8)  # Default per specs
+        depth_options = depth_map.parse_options(params)  # target_depth defaults to 8 per specs
+
+        # Optional alternative engine (None keeps the default Pillow path below)
+        engine = image_engine.resolve_engine(params)
+        # Optional stripe parallelism across all vCPUs (error diffusion stays serial)
+        parallel = bool(params.get('parallel', False))
+        parallel_stats = {} if parallel else None
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get('zero_copy', False))
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get('stream', False))
+        stream_stats = None
+        # Optional colour-mode contract: LA input keeps its alpha band
+        preserve_mode = modes.preserve(params)
 
         if not image_b64:
             return {"success": False, "image": "", "execution_time_ms": 0.0, "error": "Missing 'image' in input"}
@@ -22,11 +46,31 @@ def lambda_handler(event, context):
         # Start timing
         start_time = time.perf_counter()
 
+        # Optional header-only pre-flight: routes the request before the full decode
+        preflight_plan = preflight.plan(image_b64, params, stage=3) if params.get('preflight') else None
+
         # Step 1: Decode base64
-        image_bytes = base64.b64decode(image_b64)
+        if stream:
+            # Oversized images are rejected at the header, before the rest is decoded
+            source_img, stream_stats = streaming.open_b64(image_b64, params, preflight_plan)
+        else:
+            if zero_copy:
+                image_source = buffers.decode_b64(image_b64)
+            else:
+                image_source = io.BytesIO(base64.b64decode(image_b64))
+            source_img = Image.open(image_source)
+            if preflight_plan:
+                preflight.apply_draft(source_img, preflight_plan)
 
         # Step 2: Open image and convert to mode "I"
-        with Image.open(io.BytesIO(image_bytes)) as img:
+        def map_pixels(img):
+            if depth_map.needs_true_depth(img, depth_options):
+                # 16-bit sources / non-8-bit targets: LUT-based quantization (stays uint16)
+                return depth_map.map_depth(img, depth_options)
+            if engine:
+                # Steps 2-5 as one vectorized mapping
+                return image_engine.color_depth(img, engine)
+
             img = img.convert('I')  # 32-bit signed integer mode
 
             # Step 3: Simulate 10-bit data (multiply by 4)
@@ -37,15 +81,34 @@ def lambda_handler(event, context):
             img = img.point(lambda p: 255.0 * ((p / 1023.0) ** inv_gamma) if isinstance(p, (int, float)) else 0)
 
             # Step 5: Downsample to 8-bit grayscale
-            img = img.convert('L')
+            return img.convert('L')
+
+        with source_img as img:
+            # Under preserve_mode the mapping runs on the L band and the alpha is put back after
+            img, alpha = modes.split_alpha(img, preserve_mode)
+            tiles = preflight.tile_count(preflight_plan)
+            if (parallel or tiles) and depth_map.is_pixelwise(depth_options):
+                # Parallel stripes, or memory-bounded tiles one after another
+                img, pixel_stats = stripes.map_stripes(
+                    img, map_pixels, workers=None if parallel else 1, stripes=tiles)
+                if parallel:
+                    parallel_stats["pixels"] = pixel_stats
+            else:
+                img = map_pixels(img)
+            img = modes.with_alpha(img, alpha)
 
-            # Step 6: Save to buffer
-            buffer = io.BytesIO()
-            img.save(buffer, format='JPEG', quality=85)
+            # Step 6: Save to buffer (PNG when the result is deeper than 8 bits)
+            buffer = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+            encode_stats = stripes.save(img, buffer, parallel, **depth_map.save_options(img))
+            if encode_stats:
+                parallel_stats["encode"] = encode_stats
             buffer.seek(0)
 
             # Step 7: Encode to base64
-            result_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+            if zero_copy:
+                result_b64 = buffers.encode_b64(buffer)
+            else:
+                result_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
 
         # Calculate execution time
         execution_time = (time.perf_counter() - start_time) * 1000
@@ -54,6 +117,12 @@ def lambda_handler(event, context):
             "success": True,
             "image": result_b64,
             "execution_time_ms": round(execution_time, 2),
+            "engine": engine,
+            "target_depth": depth_options["target_depth"],
+            "parallel": parallel_stats,
+            "stream": stream_stats,
+            "preflight": preflight_plan,
+            "mode": img.mode,
             "error": None
         }
 
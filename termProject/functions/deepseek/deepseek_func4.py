@@ -3,8 +3,18 @@ import base64
 import io
 import time
 from PIL import Image
+from shared import buffers
+from shared import container
+from shared import engine as image_engine
+from shared import modes
+from shared import passthrough
+from shared import preflight
+from shared import profiler
+from shared import streaming
 
 
+@container.tracked
+@profiler.profiled
 def lambda_handler(event, context):
     try:
         # Parse input event
@@ -20,24 +30,66 @@ def lambda_handler(event, context):
         # Get rotation angle with default
         angle = float(params.get('angle', 90))
 
+        # Optional alternative engine (None keeps the default Pillow path below)
+        engine = image_engine.resolve_engine(params)
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get('zero_copy', False))
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get('stream', False))
+        stream_stats = None
+
         # Start timing
         start_time = time.perf_counter()
 
+        # Optional header-only pre-flight: routes the request before the full decode
+        preflight_plan = preflight.plan(image_b64, params, stage=4) if params.get('preflight') else None
+
+        # Optional no-op detection: rotating by a multiple of 360 degrees returns the input bytes untouched
+        noop = passthrough.check(image_b64, params, stage=4, angle=angle, preflight_plan=preflight_plan)
+        if noop:
+            return {
+                "success": True,
+                "image": passthrough.payload(image_b64),
+                "execution_time_ms": round((time.perf_counter() - start_time) * 1000, 2),
+                "engine": engine,
+                "stream": None,
+                "preflight": preflight_plan,
+                "passthrough": True,
+                "error": None
+            }
+
         # Decode base64
-        image_bytes = base64.b64decode(image_b64)
+        if stream:
+            # Oversized images are rejected at the header, before the rest is decoded
+            source_img, stream_stats = streaming.open_b64(image_b64, params, preflight_plan)
+        else:
+            if zero_copy:
+                image_source = buffers.decode_b64(image_b64)
+            else:
+                image_source = io.BytesIO(base64.b64decode(image_b64))
+            source_img = Image.open(image_source)
+            if preflight_plan:
+                preflight.apply_draft(source_img, preflight_plan)
 
         # Process image
-        with Image.open(io.BytesIO(image_bytes)) as img:
+        with source_img as img:
             # Rotate with expand to prevent cropping
-            rotated_img = img.rotate(angle, expand=True)
+            if engine:
+                rotated_img = image_engine.rotate(img, angle, engine)
+            else:
+                rotated_img = img.rotate(angle, expand=True)
 
-            # Save to buffer
-            buffer = io.BytesIO()
-            rotated_img.save(buffer, format='JPEG', quality=85)
+            # Save to buffer (PNG for LA)
+            output_mode = rotated_img.mode
+            buffer = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+            rotated_img.save(buffer, **modes.save_options(rotated_img, quality=85))
             buffer.seek(0)
 
             # Encode result
-            result_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+            if zero_copy:
+                result_b64 = buffers.encode_b64(buffer)
+            else:
+                result_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
 
         # Calculate execution time
         execution_time = (time.perf_counter() - start_time) * 1000
@@ -46,6 +98,11 @@ def lambda_handler(event, context):
             "success": True,
             "image": result_b64,
             "execution_time_ms": round(execution_time, 2),
+            "engine": engine,
+            "stream": stream_stats,
+            "preflight": preflight_plan,
+            "passthrough": noop,
+            "mode": output_mode,
             "error": None
         }
 
@@ -5,11 +5,23 @@ import time
 import boto3
 from botocore.exceptions import ClientError
 from PIL import Image
+from shared import buffers
+from shared import container
+from shared import dedup
+from shared import modes
+from shared import passthrough
+from shared import preflight
+from shared import profiler
+from shared import renditions
+from shared import streaming
+from shared import stripes
 
 # Global S3 client initialization
 s3_client = boto3.client('s3')
 
 
+@container.tracked
+@profiler.profiled(output_keys=("s3_url",))
 def lambda_handler(event, context):
     try:
         # Parse input event
@@ -22,10 +34,26 @@ def lambda_handler(event, context):
         if not image_b64:
             return {"success": False, "s3_url": "", "execution_time_ms": 0.0, "error": "Missing 'image' in input"}
 
-        # Get parameters with defaults
-        target_format = params.get('target_format', 'PNG').upper()
+        # Get parameters with defaults (a target_format list asks for one rendition per format)
+        formats = renditions.parse_formats(params.get('target_format'))
+        target_format = formats[0] if formats else params.get('target_format', 'PNG').upper()
         bucket_name = params.get('bucket_name', 'test-bucket')
         s3_key = params.get('s3_key', 'output/test.png')
+        # Optional parallel PNG encoding across all vCPUs
+        parallel = bool(params.get('parallel', False))
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get('zero_copy', False))
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get('stream', False))
+        stream_stats = None
+        # Optional content-addressed upload (identical outputs are stored once)
+        dedup_options = dedup.parse_options(params)
+        dedup_stats = None
+        s3_keys = None
+        rendition_stats = None
+        output_mode = None
+        # Optional colour-mode contract: LA keeps its alpha in PNG instead of being flattened
+        preserve_mode = modes.preserve(params)
 
         # Content type mapping
         content_types = {
@@ -39,33 +67,67 @@ def lambda_handler(event, context):
         # Start timing
         start_time = time.perf_counter()
 
-        # Decode base64
-        image_bytes = base64.b64decode(image_b64)
-
-        # Process image
-        with Image.open(io.BytesIO(image_bytes)) as img:
-            # Handle transparency for PNG
-            if target_format == 'PNG' and img.mode in ('RGBA', 'LA'):
-                background = Image.new(img.mode[:-1], img.size, (255, 255, 255))
-                background.paste(img, img.split()[-1])
-                img = background
-
-            # Save to buffer in target format
-            buffer = io.BytesIO()
-            img.save(buffer, format=target_format)
-            buffer.seek(0)
-
-        # Upload to S3
-        s3_client.put_object(
-            Bucket=bucket_name,
-            Key=s3_key,
-            Body=buffer,
-            ContentType=content_type
-        )
+        # Optional header-only pre-flight: routes the request before the full decode
+        preflight_plan = preflight.plan(image_b64, params, stage=5) if params.get('preflight') else None
+
+        # Optional no-op detection: a source already in target_format is uploaded as is
+        noop = passthrough.check(image_b64, params, stage=5, target_format=None if formats else target_format,
+                                 preflight_plan=preflight_plan)
+        if noop:
+            buffer = passthrough.open_bytes(image_b64, zero_copy)
+        else:
+            # Decode base64
+            if stream:
+                # Oversized images are rejected at the header, before the rest is decoded
+                source_img, stream_stats = streaming.open_b64(image_b64, params, preflight_plan)
+            else:
+                if zero_copy:
+                    image_source = buffers.decode_b64(image_b64)
+                else:
+                    image_source = io.BytesIO(base64.b64decode(image_b64))
+                source_img = Image.open(image_source)
+                if preflight_plan:
+                    preflight.apply_draft(source_img, preflight_plan)
+
+            # Process image
+            with source_img as img:
+                if formats:
+                    # Multi-format: decoded once, renditions encoded and uploaded concurrently
+                    s3_keys, rendition_stats = renditions.encode_and_upload(
+                        img, formats, s3_client, bucket_name, s3_key, parallel, zero_copy, dedup_options)
+                else:
+                    # Handle transparency for PNG
+                    if target_format == 'PNG' and img.mode in ('RGBA', 'LA') and not modes.keeps(img, preserve_mode):
+                        background = Image.new(img.mode[:-1], img.size, (255, 255, 255))
+                        background.paste(img, img.split()[-1])
+                        img = background
+
+                    output_mode = img.mode
+
+                    # Save to buffer in target format
+                    buffer = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+                    encode_stats = stripes.save(img, buffer, parallel, format=target_format)
+                    buffer.seek(0)
+
+        # Upload to S3 (a target_format list was uploaded rendition by rendition)
+        if not formats:
+            if dedup_options:
+                s3_key, dedup_stats = dedup.upload(s3_client, bucket_name, s3_key, buffer, content_type, dedup_options)
+            else:
+                s3_client.put_object(
+                    Bucket=bucket_name,
+                    Key=s3_key,
+                    Body=buffer,
+                    ContentType=content_type
+                )
 
         # Construct S3 URL
         region = s3_client.meta.region_name
         s3_url = f"https://s3.{region}.amazonaws.com/{bucket_name}/{s3_key}"
+        s3_urls = None
+        if formats:
+            s3_urls = {fmt: f"https://s3.{region}.amazonaws.com/{bucket_name}/{key}" for fmt, key in s3_keys.items()}
+            s3_url = s3_urls[formats[0]]
 
         # Calculate execution time
         execution_time = (time.perf_counter() - start_time) * 1000
@@ -74,6 +136,14 @@ def lambda_handler(event, context):
             "success": True,
             "s3_url": s3_url,
             "execution_time_ms": round(execution_time, 2),
+            "s3_urls": s3_urls,
+            "parallel": {"encode": encode_stats} if parallel and not (noop or formats) else None,
+            "stream": stream_stats,
+            "preflight": preflight_plan,
+            "passthrough": noop,
+            "dedup": dedup_stats,
+            "renditions": rendition_stats,
+            "mode": output_mode,
             "error": None
         }
 
@@ -3,7 +3,18 @@ import base64
 import io
 import time
 from PIL import Image
+from shared import buffers
+from shared import container
+from shared import engine as image_engine
+from shared import modes
+from shared import passthrough
+from shared import preflight
+from shared import profiler
+from shared import streaming
+from shared import stripes
 
+@container.tracked
+@profiler.profiled
 def lambda_handler(event, context):
     """
     AWS Lambda handler to convert a Base64 encoded image to Greyscale.
@@ -14,6 +25,12 @@ def lambda_handler(event, context):
     output_image = None
     execution_time_ms = 0.0
     error_message = None
+    stream_stats = None
+    preflight_plan = None
+    noop = None
+    engine = None
+    parallel_stats = None
+    output_mode = None
 
     try:
         # 1. Parse Input Payload
@@ -33,30 +50,83 @@ def lambda_handler(event, context):
             raise ValueError("Missing 'image' key in input payload.")
 
         input_b64 = payload['image']
-        
+
+        # Optional alternative engine (None keeps the default Pillow path below)
+        params = payload.get('params', {})
+        if not isinstance(params, dict):
+            params = {}
+        engine = image_engine.resolve_engine(params)
+        # Optional stripe parallelism across all vCPUs
+        parallel = bool(params.get('parallel', False))
+        parallel_stats = {} if parallel else None
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get('zero_copy', False))
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get('stream', False))
+        # Optional colour-mode contract: alpha is kept (LA) instead of dropped
+        preserve_mode = modes.preserve(params)
+
         # 2. Start Timer (Immediately before decoding)
         start_time = time.perf_counter()
 
         # 3. Image Processing
         try:
-            # Decode Base64 string to bytes
-            image_data = base64.b64decode(input_b64)
+            # Optional header-only pre-flight: routes the request before the full decode
+            preflight_plan = preflight.plan(input_b64, params, stage=1) if params.get('preflight') else None
+
+            # Optional no-op detection: an image already in mode L is returned untouched
+            noop = passthrough.check(input_b64, params, stage=1, preflight_plan=preflight_plan)
+            if noop:
+                output_image = passthrough.payload(input_b64)
+                output_mode = "L"
+            else:
+                # Decode Base64 string to bytes
+                if stream:
+                    # Oversized images are rejected at the header, before the rest is decoded
+                    source_img, stream_stats = streaming.open_b64(input_b64, params, preflight_plan)
+                else:
+                    if zero_copy:
+                        image_source = buffers.decode_b64(input_b64)
+                    else:
+                        image_source = io.BytesIO(base64.b64decode(input_b64))
+                    source_img = Image.open(image_source)
+                    if preflight_plan:
+                        preflight.apply_draft(source_img, preflight_plan)
             
-            # Open image from bytes
-            with Image.open(io.BytesIO(image_data)) as img:
-                # Convert to Greyscale (Mode 'L')
-                grey_img = img.convert('L')
-                
-                # Save to buffer as JPEG with quality 85 to optimize size
-                output_buffer = io.BytesIO()
-                grey_img.save(output_buffer, format="JPEG", quality=85)
+                # Open image from bytes
+                with source_img as img:
+                    def to_grey(src):
+                        if engine:
+                            return image_engine.greyscale(src, engine)
+                        return src.convert('L')
+
+                    # Convert to Greyscale (Mode 'L')
+                    tiles = preflight.tile_count(preflight_plan)
+                    if parallel or tiles:
+                        # Parallel stripes, or memory-bounded tiles one after another
+                        grey_img, pixel_stats = stripes.map_stripes(
+                            img, to_grey, workers=None if parallel else 1, stripes=tiles)
+                        if parallel:
+                            parallel_stats["pixels"] = pixel_stats
+                    else:
+                        grey_img = to_grey(img)
+                    if preserve_mode:
+                        grey_img = modes.with_alpha(grey_img, modes.source_alpha(img))
+                    output_mode = grey_img.mode
                 
-                # Encode result back to Base64
-                output_data = output_buffer.getvalue()
-                output_b64_bytes = base64.b64encode(output_data)
+                    # Save to buffer as JPEG with quality 85 to optimize size (PNG for LA)
+                    output_buffer = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+                    grey_img.save(output_buffer, **modes.save_options(grey_img, quality=85))
                 
-                # Convert bytes to string for JSON response
-                output_image = output_b64_bytes.decode('utf-8')
+                    # Encode result back to Base64
+                    if zero_copy:
+                        output_image = buffers.encode_b64(output_buffer)
+                    else:
+                        output_data = output_buffer.getvalue()
+                        output_b64_bytes = base64.b64encode(output_data)
+
+                        # Convert bytes to string for JSON response
+                        output_image = output_b64_bytes.decode('utf-8')
 
         except Exception as process_error:
             # Re-raise specific processing errors to be caught by the outer block
@@ -80,5 +150,11 @@ def lambda_handler(event, context):
         "success": success,
         "image": output_image,
         "execution_time_ms": round(execution_time_ms, 4),
+        "engine": engine,
+        "parallel": parallel_stats,
+        "stream": stream_stats,
+        "preflight": preflight_plan,
+        "passthrough": noop,
+        "mode": output_mode,
         "error": error_message
     }
\ No newline at end of file
@@ -3,7 +3,19 @@ import base64
 import io
 import time
 from PIL import Image
+from shared import buffers
+from shared import container
+from shared import engine as image_engine
+from shared import geometry
+from shared import modes
+from shared import passthrough
+from shared import preflight
+from shared import profiler
+from shared import pyramid
+from shared import streaming
 
+@container.tracked
+@profiler.profiled
 def lambda_handler(event, context):
     """
     AWS Lambda handler to resize a Base64 encoded image.
@@ -13,6 +25,14 @@ def lambda_handler(event, context):
     output_image = None
     execution_time_ms = 0.0
     error_message = None
+    stream_stats = None
+    preflight_plan = None
+    noop = None
+    output_images = None
+    pyramid_stats = None
+    fused_stats = None
+    engine = None
+    output_mode = None
 
     try:
         # 1. Parse Input Payload
@@ -44,32 +64,84 @@ def lambda_handler(event, context):
             target_width = 800
             target_height = 600
 
+        # Optional alternative engine (None keeps the default Pillow path below)
+        engine = image_engine.resolve_engine(params)
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get('zero_copy', False))
+        # Optional multi-resolution output: sizes=[[w, h], ...] replaces width/height
+        sizes = pyramid.parse_sizes(params)
+        # Optional fused rotation: Step 4's angle applied in the same resampling pass
+        rotate = geometry.parse_angle(params)
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get('stream', False))
+        # Optional colour-mode contract: LA input is resized as is instead of widened to RGB
+        preserve_mode = modes.preserve(params)
+
         # 3. Start Timer (Covers Decode -> Resize -> Encode)
         start_time = time.perf_counter()
 
         # 4. Processing
         try:
-            # Decode
-            image_data = base64.b64decode(payload['image'])
+            # Optional header-only pre-flight: routes the request before the full decode
+            preflight_plan = preflight.plan(payload['image'], params, stage=2) if params.get('preflight') else None
+
+            # Optional no-op detection: resizing to the current size returns the input bytes untouched
+            noop = passthrough.check(payload['image'], params, stage=2,
+                                     size=None if sizes or rotate else (target_width, target_height),
+                                     preflight_plan=preflight_plan)
+            if noop:
+                output_image = passthrough.payload(payload['image'])
+            else:
+                # Decode
+                if stream:
+                    # Oversized images are rejected at the header, before the rest is decoded
+                    source_img, stream_stats = streaming.open_b64(payload['image'], params, preflight_plan)
+                else:
+                    if zero_copy:
+                        image_source = buffers.decode_b64(payload['image'])
+                    else:
+                        image_source = io.BytesIO(base64.b64decode(payload['image']))
+                    source_img = Image.open(image_source)
+                    if preflight_plan:
+                        preflight.apply_draft(source_img, preflight_plan)
             
-            with Image.open(io.BytesIO(image_data)) as img:
-                # Convert to RGB to ensure compatibility with JPEG (removes Alpha channel if present)
-                if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-                    img = img.convert('RGB')
+                with source_img as img:
+                    if sizes:
+                        # Pyramid: every size from this one decode, largest first
+                        output_images, pyramid_stats = pyramid.render(img, sizes, zero_copy, preserve_mode)
+                        output_image = output_images[0]
+                        output_mode = pyramid_stats["mode"]
+                    else:
+                        # Convert to RGB to ensure compatibility with JPEG (removes Alpha channel if present)
+                        # Under preserve_mode LA stays LA and is saved as PNG
+                        has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+                        if has_alpha and not modes.keeps(img, preserve_mode):
+                            img = img.convert('RGB')
 
-                # Resize using modern PIL syntax (LANCZOS)
-                resized_img = img.resize(
-                    (target_width, target_height), 
-                    resample=Image.Resampling.LANCZOS
-                )
+                        # Resize using modern PIL syntax (LANCZOS)
+                        if rotate is not None:
+                            resized_img, fused_stats = geometry.resize_rotate(
+                                img, (target_width, target_height), rotate
+                            )
+                        elif engine:
+                            resized_img = image_engine.resize(img, (target_width, target_height), engine)
+                        else:
+                            resized_img = img.resize(
+                                (target_width, target_height), 
+                                resample=Image.Resampling.LANCZOS
+                            )
 
-                # Save to Buffer
-                output_buffer = io.BytesIO()
-                resized_img.save(output_buffer, format="JPEG", quality=85)
+                        # Save to Buffer
+                        output_mode = resized_img.mode
+                        output_buffer = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+                        resized_img.save(output_buffer, **modes.save_options(resized_img, quality=85))
                 
-                # Encode
-                output_b64_bytes = base64.b64encode(output_buffer.getvalue())
-                output_image = output_b64_bytes.decode('utf-8')
+                        # Encode
+                        if zero_copy:
+                            output_image = buffers.encode_b64(output_buffer)
+                        else:
+                            output_b64_bytes = base64.b64encode(output_buffer.getvalue())
+                            output_image = output_b64_bytes.decode('utf-8')
 
         except Exception as process_err:
             raise RuntimeError(f"Image processing failed: {str(process_err)}")
@@ -88,5 +160,13 @@ def lambda_handler(event, context):
         "success": success,
         "image": output_image,
         "execution_time_ms": round(execution_time_ms, 4),
+        "engine": engine,
+        "stream": stream_stats,
+        "preflight": preflight_plan,
+        "passthrough": noop,
+        "images": output_images,
+        "pyramid": pyramid_stats,
+        "fused": fused_stats,
+        "mode": output_mode,
         "error": error_message
     }
\ No newline at end of file
@@ -4,7 +4,18 @@ import io
 import time
 import traceback
 from PIL import Image
+from shared import buffers
+from shared import container
+from shared import depth as depth_map
+from shared import engine as image_engine
+from shared import modes
+from shared import preflight
+from shared import profiler
+from shared import streaming
+from shared import stripes
 
+@container.tracked
+@profiler.profiled
 def lambda_handler(event, context):
     """
     AWS Lambda handler to perform CPU-intensive Color Depth Map simulation.
@@ -14,6 +25,12 @@ def lambda_handler(event, context):
     output_image = ""
     execution_time_ms = 0.0
     error_message = None
+    stream_stats = None
+    preflight_plan = None
+    engine = None
+    target_depth = None
+    parallel_stats = None
+    output_mode = None
 
     try:
         # 1. Parse Input Payload
@@ -30,11 +47,56 @@ def lambda_handler(event, context):
         if not payload or 'image' not in payload:
             raise ValueError("Missing 'image' key in input payload.")
 
-        # Extract params (parsing only, as logic is hardcoded per specifications)
+        # Extract params (target_depth / source_depth / gamma / dither)
         params = payload.get('params', {})
         if not isinstance(params, dict):
             params = {}
-        target_depth = params.get('target_depth', 8)
+        depth_options = depth_map.parse_options(params)
+        target_depth = depth_options["target_depth"]
+
+        # Optional alternative engine (None keeps the default Pillow path below)
+        engine = image_engine.resolve_engine(params)
+        # Optional stripe parallelism across all vCPUs (error diffusion stays serial)
+        parallel = bool(params.get('parallel', False))
+        parallel_stats = {} if parallel else None
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get('zero_copy', False))
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get('stream', False))
+        # Optional colour-mode contract: LA input keeps its alpha band
+        preserve_mode = modes.preserve(params)
+
+        def map_pixels(img):
+            if depth_map.needs_true_depth(img, depth_options):
+                # 16-bit sources / non-8-bit targets: LUT-based quantization (stays uint16)
+                return depth_map.map_depth(img, depth_options)
+            if engine:
+                # Steps 2-5 as one vectorized mapping
+                return image_engine.color_depth(img, engine)
+
+            # Step 2: Force Upscaling to Mode "I" (32-bit signed integer)
+            # This ensures we don't overflow 8-bit channels during math
+            work_img = img.convert("I")
+
+            # Step 3: Simulate 10-bit Sensor Data (0-255 -> 0-1020)
+            # Guard against Pillow's internal type check
+            work_img = work_img.point(
+                lambda p: p * 4 if isinstance(p, (int, float)) else 0
+            )
+
+            # Step 4: CPU-Heavy Gamma Correction (Gamma = 2.2)
+            # Formula: NewPixel = 255 * ((OldPixel / 1023.0) ** (1 / 2.2))
+            inv_gamma = 1.0 / 2.2
+            
+            # We perform floating point math per pixel.
+            # Must check isinstance to prevent crash when Pillow passes ImagePointTransform
+            work_img = work_img.point(
+                lambda p: int(255.0 * ((p / 1023.0) ** inv_gamma)) 
+                if isinstance(p, (int, float)) else 0
+            )
+
+            # Step 5: Downsampling to Grayscale (Mode "L")
+            return work_img.convert("L")
 
         # 2. Start Timer (Base64 Decode -> Processing -> Base64 Encode)
         start_time = time.perf_counter()
@@ -43,41 +105,51 @@ def lambda_handler(event, context):
         try:
             # Step 1: Base64 Decode
             input_b64 = payload['image']
-            image_data = base64.b64decode(input_b64)
+            # Optional header-only pre-flight: routes the request before the full decode
+            preflight_plan = preflight.plan(input_b64, params, stage=3) if params.get('preflight') else None
+            if stream:
+                # Oversized images are rejected at the header, before the rest is decoded
+                source_img, stream_stats = streaming.open_b64(input_b64, params, preflight_plan)
+            else:
+                if zero_copy:
+                    image_source = buffers.decode_b64(input_b64)
+                else:
+                    image_source = io.BytesIO(base64.b64decode(input_b64))
+                source_img = Image.open(image_source)
+                if preflight_plan:
+                    preflight.apply_draft(source_img, preflight_plan)
             
-            with Image.open(io.BytesIO(image_data)) as img:
-                # Step 2: Force Upscaling to Mode "I" (32-bit signed integer)
-                # This ensures we don't overflow 8-bit channels during math
-                work_img = img.convert("I")
-
-                # Step 3: Simulate 10-bit Sensor Data (0-255 -> 0-1020)
-                # Guard against Pillow's internal type check
-                work_img = work_img.point(
-                    lambda p: p * 4 if isinstance(p, (int, float)) else 0
-                )
-
-                # Step 4: CPU-Heavy Gamma Correction (Gamma = 2.2)
-                # Formula: NewPixel = 255 * ((OldPixel / 1023.0) ** (1 / 2.2))
-                inv_gamma = 1.0 / 2.2
-                
-                # We perform floating point math per pixel.
-                # Must check isinstance to prevent crash when Pillow passes ImagePointTransform
-                work_img = work_img.point(
-                    lambda p: int(255.0 * ((p / 1023.0) ** inv_gamma)) 
-                    if isinstance(p, (int, float)) else 0
-                )
-
-                # Step 5: Downsampling to Grayscale (Mode "L")
-                final_img = work_img.convert("L")
-
-                # Step 6: Save to Buffer as JPEG
-                output_buffer = io.BytesIO()
-                final_img.save(output_buffer, format="JPEG", quality=85)
+            with source_img as img:
+                # Under preserve_mode the mapping runs on the L band and the alpha is put back after
+                img, alpha = modes.split_alpha(img, preserve_mode)
+
+                # Steps 2-5 (optionally in parallel stripes)
+                tiles = preflight.tile_count(preflight_plan)
+                if (parallel or tiles) and depth_map.is_pixelwise(depth_options):
+                    # Parallel stripes, or memory-bounded tiles one after another
+                    final_img, pixel_stats = stripes.map_stripes(
+                        img, map_pixels, workers=None if parallel else 1, stripes=tiles)
+                    if parallel:
+                        parallel_stats["pixels"] = pixel_stats
+                else:
+                    final_img = map_pixels(img)
+                final_img = modes.with_alpha(final_img, alpha)
+                output_mode = final_img.mode
+
+                # Step 6: Save to Buffer as JPEG (PNG when deeper than 8 bits)
+                output_buffer = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+                encode_stats = stripes.save(
+                    final_img, output_buffer, parallel, **depth_map.save_options(final_img))
+                if encode_stats:
+                    parallel_stats["encode"] = encode_stats
                 
                 # Step 7: Base64 Encode
-                output_data = output_buffer.getvalue()
-                output_b64_bytes = base64.b64encode(output_data)
-                output_image = output_b64_bytes.decode('utf-8')
+                if zero_copy:
+                    output_image = buffers.encode_b64(output_buffer)
+                else:
+                    output_data = output_buffer.getvalue()
+                    output_b64_bytes = base64.b64encode(output_data)
+                    output_image = output_b64_bytes.decode('utf-8')
 
         except Exception as process_error:
             # Capture traceback for debugging in the error field
@@ -98,5 +170,11 @@ def lambda_handler(event, context):
         "success": success,
         "image": output_image,
         "execution_time_ms": round(execution_time_ms, 4),
+        "engine": engine,
+        "target_depth": target_depth,
+        "parallel": parallel_stats,
+        "stream": stream_stats,
+        "preflight": preflight_plan,
+        "mode": output_mode,
         "error": error_message
     }
\ No newline at end of file
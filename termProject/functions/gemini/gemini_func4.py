@@ -3,7 +3,17 @@ import base64
 import io
 import time
 from PIL import Image
+from shared import buffers
+from shared import container
+from shared import engine as image_engine
+from shared import modes
+from shared import passthrough
+from shared import preflight
+from shared import profiler
+from shared import streaming
 
+@container.tracked
+@profiler.profiled
 def lambda_handler(event, context):
     """
     AWS Lambda handler to rotate a Base64 encoded image.
@@ -13,6 +23,11 @@ def lambda_handler(event, context):
     output_image = None
     execution_time_ms = 0.0
     error_message = None
+    stream_stats = None
+    preflight_plan = None
+    noop = None
+    engine = None
+    output_mode = None
 
     try:
         # 1. Parse Input Payload
@@ -39,6 +54,15 @@ def lambda_handler(event, context):
         except (ValueError, TypeError):
             angle = 90.0
 
+        # Optional alternative engine (None keeps the default Pillow path below)
+        engine = image_engine.resolve_engine(params)
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get('zero_copy', False))
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get('stream', False))
+        # Optional colour-mode contract: L/LA input is rotated as is instead of widened to RGB
+        preserve_mode = modes.preserve(params)
+
         # 3. Start Timer (Decode -> Rotate -> Encode)
         start_time = time.perf_counter()
 
@@ -46,26 +70,52 @@ def lambda_handler(event, context):
         try:
             # Decode
             input_b64 = payload['image']
-            image_data = base64.b64decode(input_b64)
+            # Optional header-only pre-flight: routes the request before the full decode
+            preflight_plan = preflight.plan(input_b64, params, stage=4) if params.get('preflight') else None
+
+            # Optional no-op detection: rotating by a multiple of 360 degrees returns the input bytes untouched
+            noop = passthrough.check(input_b64, params, stage=4, angle=angle, preflight_plan=preflight_plan)
+            if noop:
+                output_image = passthrough.payload(input_b64)
+            else:
+                if stream:
+                    # Oversized images are rejected at the header, before the rest is decoded
+                    source_img, stream_stats = streaming.open_b64(input_b64, params, preflight_plan)
+                else:
+                    if zero_copy:
+                        image_source = buffers.decode_b64(input_b64)
+                    else:
+                        image_source = io.BytesIO(base64.b64decode(input_b64))
+                    source_img = Image.open(image_source)
+                    if preflight_plan:
+                        preflight.apply_draft(source_img, preflight_plan)
             
-            with Image.open(io.BytesIO(image_data)) as img:
-                # Convert to RGB to ensure compatibility with JPEG (removes Alpha/transparency)
-                # We do this before rotation or saving to prevent "cannot write mode RGBA as JPEG" errors.
-                # Note: Default fill color for rotation on RGB images is black (0, 0, 0).
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
+                with source_img as img:
+                    # Convert to RGB to ensure compatibility with JPEG (removes Alpha/transparency)
+                    # We do this before rotation or saving to prevent "cannot write mode RGBA as JPEG" errors.
+                    # Note: Default fill color for rotation on RGB images is black (0, 0, 0).
+                    # Under preserve_mode L/LA stay single-channel (LA is saved as PNG)
+                    if img.mode != 'RGB' and not modes.keeps(img, preserve_mode):
+                        img = img.convert('RGB')
 
-                # Rotate with expand=True to resize canvas and prevent cropping
-                rotated_img = img.rotate(angle, expand=True)
+                    # Rotate with expand=True to resize canvas and prevent cropping
+                    if engine:
+                        rotated_img = image_engine.rotate(img, angle, engine)
+                    else:
+                        rotated_img = img.rotate(angle, expand=True)
 
-                # Save to Buffer
-                output_buffer = io.BytesIO()
-                rotated_img.save(output_buffer, format="JPEG", quality=85)
+                    # Save to Buffer
+                    output_mode = rotated_img.mode
+                    output_buffer = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+                    rotated_img.save(output_buffer, **modes.save_options(rotated_img, quality=85))
                 
-                # Encode
-                output_data = output_buffer.getvalue()
-                output_b64_bytes = base64.b64encode(output_data)
-                output_image = output_b64_bytes.decode('utf-8')
+                    # Encode
+                    if zero_copy:
+                        output_image = buffers.encode_b64(output_buffer)
+                    else:
+                        output_data = output_buffer.getvalue()
+                        output_b64_bytes = base64.b64encode(output_data)
+                        output_image = output_b64_bytes.decode('utf-8')
 
         except Exception as process_err:
             raise RuntimeError(f"Image processing failed: {str(process_err)}")
@@ -84,5 +134,10 @@ def lambda_handler(event, context):
         "success": success,
         "image": output_image,
         "execution_time_ms": round(execution_time_ms, 4),
+        "engine": engine,
+        "stream": stream_stats,
+        "preflight": preflight_plan,
+        "passthrough": noop,
+        "mode": output_mode,
         "error": error_message
     }
\ No newline at end of file
@@ -4,6 +4,16 @@ import io
 import time
 import boto3
 from PIL import Image
+from shared import buffers
+from shared import container
+from shared import dedup
+from shared import modes
+from shared import passthrough
+from shared import preflight
+from shared import profiler
+from shared import renditions
+from shared import streaming
+from shared import stripes
 from botocore.exceptions import ClientError
 
 # Global initialization to leverage execution context reuse (optimization)
@@ -13,6 +23,8 @@ except Exception as e:
     # If client fails to initialize, the handler will catch the error when trying to use it
     s3_client = None
 
+@container.tracked
+@profiler.profiled(output_keys=("s3_url",))
 def lambda_handler(event, context):
     """
     AWS Lambda handler to convert image format and upload to S3.
@@ -22,6 +34,14 @@ def lambda_handler(event, context):
     s3_url = None
     execution_time_ms = 0.0
     error_message = None
+    stream_stats = None
+    preflight_plan = None
+    noop = None
+    dedup_stats = None
+    s3_urls = None
+    rendition_stats = None
+    parallel_stats = None
+    output_mode = None
 
     # Default Parameters
     DEFAULT_FORMAT = "PNG"
@@ -48,9 +68,21 @@ def lambda_handler(event, context):
         if not isinstance(params, dict):
             params = {}
 
-        target_format = params.get('target_format', DEFAULT_FORMAT).upper()
+        # A target_format list asks for one rendition per format
+        formats = renditions.parse_formats(params.get('target_format'))
+        target_format = formats[0] if formats else params.get('target_format', DEFAULT_FORMAT).upper()
         bucket_name = params.get('bucket_name', DEFAULT_BUCKET)
         s3_key = params.get('s3_key', DEFAULT_KEY)
+        # Optional parallel PNG encoding across all vCPUs
+        parallel = bool(params.get('parallel', False))
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get('zero_copy', False))
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get('stream', False))
+        # Optional content-addressed upload (identical outputs are stored once)
+        dedup_options = dedup.parse_options(params)
+        # Optional colour-mode contract: LA becomes L (not RGB) for JPEG
+        preserve_mode = modes.preserve(params)
 
         # Validate S3 Client availability
         if s3_client is None:
@@ -62,34 +94,71 @@ def lambda_handler(event, context):
         try:
             # 3. Image Processing (Format Conversion)
             input_b64 = payload['image']
-            image_data = base64.b64decode(input_b64)
+            # Optional header-only pre-flight: routes the request before the full decode
+            preflight_plan = preflight.plan(input_b64, params, stage=5) if params.get('preflight') else None
+
+            # Optional no-op detection: a source already in target_format is uploaded as is
+            noop = passthrough.check(input_b64, params, stage=5, target_format=None if formats else target_format,
+                                     preflight_plan=preflight_plan)
+            if noop:
+                output_buffer = passthrough.open_bytes(input_b64, zero_copy)
+            else:
+                if stream:
+                    # Oversized images are rejected at the header, before the rest is decoded
+                    source_img, stream_stats = streaming.open_b64(input_b64, params, preflight_plan)
+                else:
+                    if zero_copy:
+                        image_source = buffers.decode_b64(input_b64)
+                    else:
+                        image_source = io.BytesIO(base64.b64decode(input_b64))
+                    source_img = Image.open(image_source)
+                    if preflight_plan:
+                        preflight.apply_draft(source_img, preflight_plan)
             
-            with Image.open(io.BytesIO(image_data)) as img:
-                # Handle Alpha channel for JPEG (convert to RGB if needed)
-                if target_format in ['JPEG', 'JPG'] and img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
+                with source_img as img:
+                    if formats:
+                        # Multi-format: decoded once, renditions encoded and uploaded concurrently
+                        s3_keys, rendition_stats = renditions.encode_and_upload(
+                            img, formats, s3_client, bucket_name, s3_key, parallel, zero_copy, dedup_options)
+                    else:
+                        # Handle Alpha channel for JPEG (convert to RGB if needed)
+                        if target_format in ['JPEG', 'JPG'] and img.mode in ('RGBA', 'LA', 'P'):
+                            img = img.convert('L' if modes.keeps(img, preserve_mode) else 'RGB')
+                        output_mode = img.mode
                 
-                output_buffer = io.BytesIO()
-                img.save(output_buffer, format=target_format)
-                output_buffer.seek(0) # Rewind buffer for reading
+                        output_buffer = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+                        encode_stats = stripes.save(img, output_buffer, parallel, format=target_format)
+                        if parallel:
+                            parallel_stats = {"encode": encode_stats}
+                        output_buffer.seek(0) # Rewind buffer for reading
                 
+            # A target_format list was uploaded rendition by rendition
+            if not formats:
                 # Determine Content-Type
                 content_type = f"image/{target_format.lower()}"
                 if target_format == 'JPG': 
                     content_type = 'image/jpeg'
 
                 # 4. S3 Upload (I/O Intensive)
-                s3_client.put_object(
-                    Bucket=bucket_name,
-                    Key=s3_key,
-                    Body=output_buffer,
-                    ContentType=content_type
-                )
-                
-                # Construct S3 URL
-                # Attempt to get region, default to us-east-1 if not configured in session
-                region = s3_client.meta.region_name or 'us-east-1'
-                s3_url = f"https://{bucket_name}.s3.{region}.amazonaws.com/{s3_key}"
+                if dedup_options:
+                    s3_key, dedup_stats = dedup.upload(
+                        s3_client, bucket_name, s3_key, output_buffer, content_type, dedup_options)
+                else:
+                    s3_client.put_object(
+                        Bucket=bucket_name,
+                        Key=s3_key,
+                        Body=output_buffer,
+                        ContentType=content_type
+                    )
+            
+            # Construct S3 URL
+            # Attempt to get region, default to us-east-1 if not configured in session
+            region = s3_client.meta.region_name or 'us-east-1'
+            s3_url = f"https://{bucket_name}.s3.{region}.amazonaws.com/{s3_key}"
+            if formats:
+                s3_urls = {fmt: f"https://{bucket_name}.s3.{region}.amazonaws.com/{key}"
+                           for fmt, key in s3_keys.items()}
+                s3_url = s3_urls[formats[0]]
 
         except ClientError as s3_err:
             raise RuntimeError(f"S3 Upload Error: {str(s3_err)}")
@@ -110,6 +179,14 @@ def lambda_handler(event, context):
     return {
         "success": success,
         "s3_url": s3_url,
+        "s3_urls": s3_urls,
         "execution_time_ms": round(execution_time_ms, 4),
+        "parallel": parallel_stats,
+        "stream": stream_stats,
+        "preflight": preflight_plan,
+        "passthrough": noop,
+        "mode": output_mode,
+        "dedup": dedup_stats,
+        "renditions": rendition_stats,
         "error": error_message
     }
\ No newline at end of file
@@ -3,8 +3,18 @@ import base64
 import io
 import time
 from PIL import Image, UnidentifiedImageError
-
-
+from shared import buffers
+from shared import container
+from shared import engine as image_engine
+from shared import passthrough
+from shared import preflight
+from shared import profiler
+from shared import streaming
+from shared import stripes
+
+
+@container.tracked
+@profiler.profiled
 def lambda_handler(event, context):
     """
     AWS Lambda handler - Greyscale converter.
@@ -39,6 +49,20 @@ def lambda_handler(event, context):
         b64_input = parsed.get("image")
         # Accept params if needed in future
         params = parsed.get("params", {}) if isinstance(parsed, dict) else {}
+        # Optional alternative engine (None keeps the default Pillow path below)
+        engine = image_engine.resolve_engine(params)
+        # Optional stripe parallelism across all vCPUs
+        parallel = bool(params.get("parallel", False))
+        parallel_stats = {} if parallel else None
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get("zero_copy", False))
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get("stream", False))
+        stream_stats = None
+        preflight_plan = None
+        noop = None
+        # Mode of the output image, reported for the runner
+        output_mode = None
     except Exception as e:
         # If parsing fails, no timer was started yet per spec
         return {
@@ -77,54 +101,98 @@ def lambda_handler(event, context):
     start_ts = time.time()
 
     try:
-        # Decode base64 (validate=True ensures bad padding raises)
-        try:
-            decoded_bytes = base64.b64decode(b64_input, validate=True)
-        except Exception:
-            # fallback: try lenient decode (some clients omit padding)
-            decoded_bytes = base64.b64decode(b64_input + "===")
-
-        # Open image with PIL
-        try:
-            img = Image.open(io.BytesIO(decoded_bytes))
-            img.load()  # ensure image is fully loaded into memory
-        except UnidentifiedImageError as e:
-            raise ValueError(
-                "Decoded data is not a valid image or unsupported image format.") from e
-
-        # Determine if source suggests PNG (alpha/transparency)
-        bands = img.getbands() if hasattr(img, "getbands") else ()
-        has_alpha = ("A" in bands) or (img.mode in ("RGBA", "LA")) or (
-            "transparency" in getattr(img, "info", {}))
-
-        # Convert to greyscale
-        if has_alpha:
-            # Preserve alpha channel: produce 'LA' (L + Alpha) and save as PNG
-            gray = img.convert("L")
-            # Obtain alpha channel robustly
-            try:
-                alpha = img.convert("RGBA").split()[-1]
-            except Exception:
-                # Fallback: create fully opaque alpha if extraction fails
-                alpha = Image.new("L", img.size, 255)
-            out_img = Image.merge("LA", (gray, alpha))
-            save_format = "PNG"
-            save_kwargs = {"optimize": True}
+        # Optional header-only pre-flight: routes the request before the full decode
+        preflight_plan = preflight.plan(b64_input, params, stage=1) if params.get("preflight") else None
+
+        # Optional no-op detection: an image already in mode L is returned untouched
+        noop = passthrough.check(b64_input, params, stage=1, preflight_plan=preflight_plan)
+        if noop:
+            output_b64 = passthrough.payload(b64_input)
+            output_mode = "L"
         else:
-            # No alpha: convert to single-channel L and save as JPEG
-            out_img = img.convert("L")
-            save_format = "JPEG"
-            save_kwargs = {"quality": 85, "optimize": True}
-
-        # Save processed image to buffer
-        buffer = io.BytesIO()
-        # For JPEG, ensure mode is acceptable (L is okay); for PNG LA is okay
-        out_img.save(buffer, format=save_format, **save_kwargs)
-        buffer.seek(0)
-        result_bytes = buffer.read()
-
-        # Encode buffer back to Base64 string
-        output_b64 = base64.b64encode(result_bytes).decode("ascii")
+            if stream:
+                # Decoded chunk by chunk while the image is parsed (see below)
+                img_source = None
+            elif zero_copy:
+                # Decoded into the container's reusable input buffer
+                img_source = buffers.decode_b64(b64_input)
+            else:
+                # Decode base64 (validate=True ensures bad padding raises)
+                try:
+                    decoded_bytes = base64.b64decode(b64_input, validate=True)
+                except Exception:
+                    # fallback: try lenient decode (some clients omit padding)
+                    decoded_bytes = base64.b64decode(b64_input + "===")
+                img_source = io.BytesIO(decoded_bytes)
+
+            # Open image with PIL
+            try:
+                if stream:
+                    # Oversized images are rejected at the header, before the rest is decoded
+                    img, stream_stats = streaming.open_b64(b64_input, params, preflight_plan)
+                else:
+                    img = Image.open(img_source)
+                    if preflight_plan:
+                        preflight.apply_draft(img, preflight_plan)
+                    img.load()  # ensure image is fully loaded into memory
+            except UnidentifiedImageError as e:
+                raise ValueError(
+                    "Decoded data is not a valid image or unsupported image format.") from e
+
+            # Determine if source suggests PNG (alpha/transparency)
+            bands = img.getbands() if hasattr(img, "getbands") else ()
+            has_alpha = ("A" in bands) or (img.mode in ("RGBA", "LA")) or (
+                "transparency" in getattr(img, "info", {}))
+
+            def to_grey(src):
+                return image_engine.greyscale(src, engine) if engine else src.convert("L")
+
+            def grey_of(src):
+                tiles = preflight.tile_count(preflight_plan)
+                if parallel or tiles:
+                    # Parallel stripes, or memory-bounded tiles one after another
+                    grey_img, pixel_stats = stripes.map_stripes(
+                        src, to_grey, workers=None if parallel else 1, stripes=tiles)
+                    if parallel:
+                        parallel_stats["pixels"] = pixel_stats
+                    return grey_img
+                return to_grey(src)
+
+            # Convert to greyscale
+            if has_alpha:
+                # Preserve alpha channel: produce 'LA' (L + Alpha) and save as PNG
+                gray = grey_of(img)
+                # Obtain alpha channel robustly
+                try:
+                    alpha = img.convert("RGBA").split()[-1]
+                except Exception:
+                    # Fallback: create fully opaque alpha if extraction fails
+                    alpha = Image.new("L", img.size, 255)
+                out_img = Image.merge("LA", (gray, alpha))
+                save_format = "PNG"
+                save_kwargs = {"optimize": True}
+            else:
+                # No alpha: convert to single-channel L and save as JPEG
+                out_img = grey_of(img)
+                save_format = "JPEG"
+                save_kwargs = {"quality": 85, "optimize": True}
+
+            output_mode = out_img.mode
+
+            # Save processed image to buffer
+            buffer = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+            # For JPEG, ensure mode is acceptable (L is okay); for PNG LA is okay
+            encode_stats = stripes.save(out_img, buffer, parallel, format=save_format, **save_kwargs)
+            if encode_stats:
+                parallel_stats["encode"] = encode_stats
+            if zero_copy:
+                output_b64 = buffers.encode_b64(buffer)
+            else:
+                buffer.seek(0)
+                result_bytes = buffer.read()
+
+                # Encode buffer back to Base64 string
+                output_b64 = base64.b64encode(result_bytes).decode("ascii")
 
     except Exception as exc:
         # Capture exception message, but ensure timer still stops after we "define" final output (we set output_b64 to None)
@@ -140,6 +208,12 @@ def lambda_handler(event, context):
         "success": success,
         "image": output_b64 if success else None,
         "execution_time_ms": float(execution_time_ms),
+        "engine": engine,
+        "parallel": parallel_stats,
+        "stream": stream_stats,
+        "preflight": preflight_plan,
+        "passthrough": noop,
+        "mode": output_mode,
         "error": None if success else (error_msg or "Unknown error")
     }
 
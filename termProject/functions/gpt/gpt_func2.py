@@ -2,10 +2,30 @@ import base64
 import time
 import io
 from PIL import Image, UnidentifiedImageError
+from shared import buffers
+from shared import container
+from shared import engine as image_engine
+from shared import geometry
+from shared import modes
+from shared import passthrough
+from shared import preflight
+from shared import profiler
+from shared import pyramid
+from shared import streaming
 
 
+@container.tracked
+@profiler.profiled
 def lambda_handler(event, context):
     start_time = time.time()
+    engine = None
+    stream_stats = None
+    preflight_plan = None
+    noop = None
+    output_images = None
+    pyramid_stats = None
+    fused_stats = None
+    output_mode = None
 
     try:
         # Extract base64 image
@@ -24,26 +44,78 @@ def lambda_handler(event, context):
         if not isinstance(height, int) or height <= 0:
             height = 600
 
-        # Decode base64
-        try:
-            img_bytes = base64.b64decode(img_b64)
-        except Exception:
-            raise ValueError("Base64 decode failed.")
+        # Optional multi-resolution output: sizes=[[w, h], ...] replaces width/height
+        sizes = pyramid.parse_sizes(params)
+        # Optional fused rotation: Step 4's angle applied in the same resampling pass
+        rotate = geometry.parse_angle(params)
 
-        # Load image
-        try:
-            with Image.open(io.BytesIO(img_bytes)) as img:
-                img = img.convert("RGB")
-        except UnidentifiedImageError:
-            raise ValueError("Unsupported or corrupted image format.")
+        # Optional alternative engine (None keeps the default Pillow path below)
+        engine = image_engine.resolve_engine(params)
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get("zero_copy", False))
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get("stream", False))
+        # Optional colour-mode contract: L/LA input is resized as is instead of widened to RGB
+        preserve_mode = modes.preserve(params)
 
-        # Resize
-        img_resized = img.resize((width, height), Image.Resampling.LANCZOS)
+        # Optional header-only pre-flight: routes the request before the full decode
+        preflight_plan = preflight.plan(img_b64, params, stage=2) if params.get("preflight") else None
 
-        # Encode to JPEG
-        output_buffer = io.BytesIO()
-        img_resized.save(output_buffer, format="JPEG", quality=85)
-        output_b64 = base64.b64encode(output_buffer.getvalue()).decode("utf-8")
+        # Optional no-op detection: resizing to the current size returns the input bytes untouched
+        noop = passthrough.check(img_b64, params, stage=2, size=None if sizes or rotate else (width, height),
+                                 preflight_plan=preflight_plan)
+        if noop:
+            output_b64 = passthrough.payload(img_b64)
+        else:
+            # Decode base64 (streaming decodes it while the image is parsed below)
+            if not stream:
+                try:
+                    if zero_copy:
+                        img_source = buffers.decode_b64(img_b64)
+                    else:
+                        img_source = io.BytesIO(base64.b64decode(img_b64))
+                except Exception:
+                    raise ValueError("Base64 decode failed.")
+
+            # Load image
+            try:
+                if stream:
+                    # Oversized images are rejected at the header, before the rest is decoded
+                    source_img, stream_stats = streaming.open_b64(img_b64, params, preflight_plan)
+                else:
+                    source_img = Image.open(img_source)
+                    if preflight_plan:
+                        preflight.apply_draft(source_img, preflight_plan)
+                with source_img as img:
+                    if modes.keeps(img, preserve_mode):
+                        img.load()
+                    else:
+                        img = img.convert("RGB")
+            except UnidentifiedImageError:
+                raise ValueError("Unsupported or corrupted image format.")
+
+            if sizes:
+                # Pyramid: every size from this one decode, largest first
+                output_images, pyramid_stats = pyramid.render(img, sizes, zero_copy, preserve_mode)
+                output_b64 = output_images[0]
+                output_mode = pyramid_stats["mode"]
+            else:
+                # Resize
+                if rotate is not None:
+                    img_resized, fused_stats = geometry.resize_rotate(img, (width, height), rotate)
+                elif engine:
+                    img_resized = image_engine.resize(img, (width, height), engine)
+                else:
+                    img_resized = img.resize((width, height), Image.Resampling.LANCZOS)
+
+                # Encode to JPEG (PNG for LA)
+                output_mode = img_resized.mode
+                output_buffer = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+                img_resized.save(output_buffer, **modes.save_options(img_resized, quality=85))
+                if zero_copy:
+                    output_b64 = buffers.encode_b64(output_buffer)
+                else:
+                    output_b64 = base64.b64encode(output_buffer.getvalue()).decode("utf-8")
 
         exec_time = (time.time() - start_time) * 1000.0
 
@@ -51,6 +123,14 @@ def lambda_handler(event, context):
             "success": True,
             "image": output_b64,
             "execution_time_ms": exec_time,
+            "engine": engine,
+            "stream": stream_stats,
+            "preflight": preflight_plan,
+            "passthrough": noop,
+            "images": output_images,
+            "pyramid": pyramid_stats,
+            "fused": fused_stats,
+            "mode": output_mode,
             "error": None
         }
 
@@ -60,5 +140,13 @@ def lambda_handler(event, context):
             "success": False,
             "image": None,
             "execution_time_ms": exec_time,
+            "engine": engine,
+            "stream": stream_stats,
+            "preflight": preflight_plan,
+            "passthrough": noop,
+            "images": output_images,
+            "pyramid": pyramid_stats,
+            "fused": fused_stats,
+            "mode": output_mode,
             "error": str(e)
         }
@@ -5,13 +5,30 @@ import traceback
 from time import perf_counter
 from typing import Any, Dict
 from PIL import Image
-
-
+from shared import buffers
+from shared import container
+from shared import depth as depth_map
+from shared import engine as image_engine
+from shared import modes
+from shared import preflight
+from shared import profiler
+from shared import streaming
+from shared import stripes
+
+
+@container.tracked
+@profiler.profiled
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     result = {
         "success": False,
         "image": "",
         "execution_time_ms": 0.0,
+        "engine": None,
+        "target_depth": None,
+        "parallel": None,
+        "stream": None,
+        "preflight": None,
+        "mode": None,
         "error": None,
     }
 
@@ -20,47 +37,100 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
         image_b64 = event.get("image")
         params = event.get("params") or {}
-        _ = params.get("target_depth", 8)
+        depth_options = depth_map.parse_options(params)
+        result["target_depth"] = depth_options["target_depth"]
+
+        # Optional alternative engine (None keeps the default Pillow path below)
+        engine = image_engine.resolve_engine(params)
+        result["engine"] = engine
+        # Optional stripe parallelism across all vCPUs (error diffusion stays serial)
+        parallel = bool(params.get("parallel", False))
+        parallel_stats = {} if parallel else None
+        result["parallel"] = parallel_stats
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get("zero_copy", False))
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get("stream", False))
 
         if not image_b64 or not isinstance(image_b64, str):
             raise ValueError("Missing 'image'.")
 
-        # Step 1: Decode Base64
-        image_bytes = base64.b64decode(image_b64)
-        img_stream = io.BytesIO(image_bytes)
+        # Optional header-only pre-flight: routes the request before the full decode
+        preflight_plan = preflight.plan(image_b64, params, stage=3) if params.get("preflight") else None
+        result["preflight"] = preflight_plan
 
-        with Image.open(img_stream) as img:
+        # Step 1: Decode Base64
+        if stream:
+            # Oversized images are rejected at the header, before the rest is decoded
+            source_img, result["stream"] = streaming.open_b64(image_b64, params, preflight_plan)
+        else:
+            if zero_copy:
+                img_stream = buffers.decode_b64(image_b64)
+            else:
+                image_bytes = base64.b64decode(image_b64)
+                img_stream = io.BytesIO(image_bytes)
+            source_img = Image.open(img_stream)
+            if preflight_plan:
+                preflight.apply_draft(source_img, preflight_plan)
+
+        with source_img as img:
             img.load()
-
-            # *** FIX: convert to grayscale BEFORE mode "I"
-            img_gray = img.convert("L")      # now guaranteed 0–255
-            img_i = img_gray.convert("I")    # safe 32-bit integer
-
-            # Step 3: Simulate 10-bit (0–255 → 0–1020)
-            img_10bit = img_i.point(
-                lambda p: p * 4 if isinstance(p, (int, float)) else 0
-            )
-
-            # Step 4: Gamma mapping
-            gamma = 2.2
-            inv_gamma = 1.0 / gamma
-
-            img_gamma = img_10bit.point(
-                lambda p, _inv=inv_gamma:
-                    255.0 * ((p / 1023.0) ** _inv)
-                    if isinstance(p, (int, float)) else 0
-            )
-
-            # Step 5: Downsample to 8-bit grayscale
-            img_out = img_gamma.convert("L")
-
-            # Step 6: Save JPEG
-            out_buf = io.BytesIO()
-            img_out.save(out_buf, format="JPEG", quality=85)
-            out_bytes = out_buf.getvalue()
+            # Optional colour-mode contract: LA keeps its alpha, the mapping runs on the L band
+            img, alpha = modes.split_alpha(img, modes.preserve(params))
+
+            def map_pixels(src):
+                if depth_map.needs_true_depth(src, depth_options):
+                    # 16-bit sources / non-8-bit targets: LUT-based quantization (stays uint16)
+                    return depth_map.map_depth(src, depth_options)
+                if engine:
+                    # Steps 2-5 as one vectorized mapping
+                    return image_engine.color_depth(src, engine)
+
+                # *** FIX: convert to grayscale BEFORE mode "I"
+                img_gray = src.convert("L")      # now guaranteed 0–255
+                img_i = img_gray.convert("I")    # safe 32-bit integer
+
+                # Step 3: Simulate 10-bit (0–255 → 0–1020)
+                img_10bit = img_i.point(
+                    lambda p: p * 4 if isinstance(p, (int, float)) else 0
+                )
+
+                # Step 4: Gamma mapping
+                gamma = 2.2
+                inv_gamma = 1.0 / gamma
+
+                img_gamma = img_10bit.point(
+                    lambda p, _inv=inv_gamma:
+                        255.0 * ((p / 1023.0) ** _inv)
+                        if isinstance(p, (int, float)) else 0
+                )
+
+                # Step 5: Downsample to 8-bit grayscale
+                return img_gamma.convert("L")
+
+            tiles = preflight.tile_count(preflight_plan)
+            if (parallel or tiles) and depth_map.is_pixelwise(depth_options):
+                # Parallel stripes, or memory-bounded tiles one after another
+                img_out, pixel_stats = stripes.map_stripes(
+                    img, map_pixels, workers=None if parallel else 1, stripes=tiles)
+                if parallel:
+                    parallel_stats["pixels"] = pixel_stats
+            else:
+                img_out = map_pixels(img)
+            img_out = modes.with_alpha(img_out, alpha)
+            result["mode"] = img_out.mode
+
+            # Step 6: Save JPEG (PNG when deeper than 8 bits)
+            out_buf = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+            encode_stats = stripes.save(img_out, out_buf, parallel, **depth_map.save_options(img_out))
+            if encode_stats:
+                parallel_stats["encode"] = encode_stats
 
         # Step 7: Encode
-        out_b64 = base64.b64encode(out_bytes).decode("utf-8")
+        if zero_copy:
+            out_b64 = buffers.encode_b64(out_buf)
+        else:
+            out_b64 = base64.b64encode(out_buf.getvalue()).decode("utf-8")
 
         result["success"] = True
         result["image"] = out_b64
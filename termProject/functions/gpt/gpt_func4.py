@@ -3,10 +3,25 @@ import io
 import json
 import time
 from PIL import Image
+from shared import buffers
+from shared import container
+from shared import engine as image_engine
+from shared import modes
+from shared import passthrough
+from shared import preflight
+from shared import profiler
+from shared import streaming
 
 
+@container.tracked
+@profiler.profiled
 def lambda_handler(event, context):
     start = time.perf_counter()
+    engine = None
+    stream_stats = None
+    preflight_plan = None
+    noop = None
+    output_mode = None
     try:
         # Validate input
         if "image" not in event:
@@ -16,29 +31,66 @@ def lambda_handler(event, context):
         params = event.get("params", {})
         angle = params.get("angle", 90)
 
-        # Decode Base64 → Image
-        try:
-            img_bytes = base64.b64decode(b64_data)
-        except Exception as e:
-            raise ValueError(f"Invalid base64 data: {e}")
+        # Optional alternative engine (None keeps the default Pillow path below)
+        engine = image_engine.resolve_engine(params)
+        # Optional copy-free payload I/O on reusable buffers
+        zero_copy = bool(params.get("zero_copy", False))
+        # Optional streaming decode (base64 chunks feed the image parser directly)
+        stream = bool(params.get("stream", False))
 
-        with Image.open(io.BytesIO(img_bytes)) as img:
-            # Rotate
-            rotated = img.rotate(angle, expand=True)
+        # Optional header-only pre-flight: routes the request before the full decode
+        preflight_plan = preflight.plan(b64_data, params, stage=4) if params.get("preflight") else None
 
-            # Save to buffer as JPEG
-            buffer = io.BytesIO()
-            rotated.save(buffer, format="JPEG", quality=85)
-            buffer.seek(0)
+        # Optional no-op detection: rotating by a multiple of 360 degrees returns the input bytes untouched
+        noop = passthrough.check(b64_data, params, stage=4, angle=angle, preflight_plan=preflight_plan)
+        if noop:
+            out_b64 = passthrough.payload(b64_data)
+        else:
+            # Decode Base64 → Image
+            if stream:
+                # Oversized images are rejected at the header, before the rest is decoded
+                source_img, stream_stats = streaming.open_b64(b64_data, params, preflight_plan)
+            else:
+                try:
+                    if zero_copy:
+                        img_source = buffers.decode_b64(b64_data)
+                    else:
+                        img_source = io.BytesIO(base64.b64decode(b64_data))
+                except Exception as e:
+                    raise ValueError(f"Invalid base64 data: {e}")
+                source_img = Image.open(img_source)
+                if preflight_plan:
+                    preflight.apply_draft(source_img, preflight_plan)
 
-        # Encode back to Base64
-        out_b64 = base64.b64encode(buffer.read()).decode("utf-8")
+            with source_img as img:
+                # Rotate
+                if engine:
+                    rotated = image_engine.rotate(img, angle, engine)
+                else:
+                    rotated = img.rotate(angle, expand=True)
+
+                # Save to buffer as JPEG (PNG for LA)
+                output_mode = rotated.mode
+                buffer = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+                rotated.save(buffer, **modes.save_options(rotated, quality=85))
+                buffer.seek(0)
+
+            # Encode back to Base64
+            if zero_copy:
+                out_b64 = buffers.encode_b64(buffer)
+            else:
+                out_b64 = base64.b64encode(buffer.read()).decode("utf-8")
 
         end = time.perf_counter()
         return {
             "success": True,
             "image": out_b64,
             "execution_time_ms": round((end - start) * 1000, 4),
+            "engine": engine,
+            "stream": stream_stats,
+            "preflight": preflight_plan,
+            "passthrough": noop,
+            "mode": output_mode,
             "error": None,
         }
 
@@ -48,5 +100,10 @@ def lambda_handler(event, context):
             "success": False,
             "image": None,
             "execution_time_ms": round((end - start) * 1000, 4),
+            "engine": engine,
+            "stream": stream_stats,
+            "preflight": preflight_plan,
+            "passthrough": noop,
+            "mode": output_mode,
             "error": str(err),
         }
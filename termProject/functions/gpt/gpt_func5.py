@@ -4,6 +4,16 @@ import time
 import boto3
 from botocore.exceptions import ClientError
 from PIL import Image, UnidentifiedImageError
+from shared import buffers
+from shared import container
+from shared import dedup
+from shared import modes
+from shared import passthrough
+from shared import preflight
+from shared import profiler
+from shared import renditions
+from shared import streaming
+from shared import stripes
 
 # Global S3 client to leverage execution context reuse
 s3_client = boto3.client("s3")
@@ -31,19 +41,40 @@ def _normalize_base64(b64_str: str) -> str:
     return b64_str
 
 
+@container.tracked
+@profiler.profiled(output_keys=("s3_url",))
 def lambda_handler(event, context):
     result = {
         "success": False,
         "s3_url": None,
         "execution_time_ms": 0.0,
+        "parallel": None,
+        "stream": None,
+        "preflight": None,
+        "passthrough": None,
+        "dedup": None,
+        "s3_urls": None,
+        "renditions": None,
+        "mode": None,
         "error": None,
     }
 
     # Defaults
     params = event.get("params", {}) or {}
-    target_format = (params.get("target_format") or "PNG").strip().upper()
+    target_format = params.get("target_format") or "PNG"
+    # A list asks for one rendition per format (validated below)
+    if isinstance(target_format, str):
+        target_format = target_format.strip().upper()
     bucket_name = params.get("bucket_name") or "test-bucket"
     s3_key = params.get("s3_key") or "output/test.png"
+    # Optional parallel PNG encoding across all vCPUs
+    parallel = bool(params.get("parallel", False))
+    # Optional copy-free payload I/O on reusable buffers
+    zero_copy = bool(params.get("zero_copy", False))
+    # Optional streaming decode (base64 chunks feed the image parser directly)
+    stream = bool(params.get("stream", False))
+    # Optional colour-mode contract: LA flattens to L (not RGB) for JPEG
+    preserve_mode = modes.preserve(params)
 
     b64_image = event.get("image")
     if not b64_image:
@@ -53,62 +84,109 @@ def lambda_handler(event, context):
     try:
         start = time.perf_counter()
 
-        # Decode base64
-        b64_norm = _normalize_base64(b64_image)
-        try:
-            image_bytes = base64.b64decode(b64_norm, validate=True)
-        except Exception:
-            # fallback to permissive decode (some payloads may not be strictly padded)
-            image_bytes = base64.b64decode(b64_norm + "===")
-
-        # Open image with Pillow
-        buf_in = io.BytesIO(image_bytes)
-        try:
-            img = Image.open(buf_in)
-            img.load()
-        except UnidentifiedImageError as e:
-            raise UnidentifiedImageError(f"Unable to identify image file: {e}")
-
-        # Convert mode if necessary (e.g., to RGB for JPEG)
-        if target_format in ("JPEG", "JPG") and img.mode in ("RGBA", "LA", "P"):
-            # Convert with white background to avoid black where alpha existed
-            background = Image.new("RGB", img.size, (255, 255, 255))
-            if img.mode == "P":
-                img = img.convert("RGBA")
-            background.paste(img.convert("RGBA"),
-                             mask=img.convert("RGBA").split()[-1])
-            img = background
-        elif target_format == "PNG" and img.mode == "P":
-            img = img.convert("RGBA")
-        elif img.mode == "CMYK" and target_format in ("PNG", "JPEG", "WEBP"):
-            img = img.convert("RGB")
-
-        # Save converted image to memory buffer
-        buf_out = io.BytesIO()
-        save_kwargs = {}
-        # For JPEG, set quality to a value to influence size (we intentionally increase processing)
-        if target_format in ("JPEG", "JPG"):
-            save_kwargs["quality"] = 95
-            save_kwargs["optimize"] = True
-            save_kwargs["progressive"] = True
-
-        # Pillow expects format names like "PNG", "JPEG"
-        try:
-            img.save(buf_out, format=target_format, **save_kwargs)
-        except ValueError:
-            # Some user-supplied format strings might be lowercase or synonyms; try common mapping
-            alt_format = {"JPG": "JPEG"}.get(target_format, target_format)
-            img.save(buf_out, format=alt_format, **save_kwargs)
-
-        buf_out.seek(0)
+        formats = renditions.parse_formats(target_format)
+        if formats:
+            target_format = formats[0]
 
-        # Upload to S3
-        content_type = _guess_content_type(target_format)
-        # Collect bytes for put_object
-        body = buf_out.getvalue()
+        # Optional content-addressed upload (identical outputs are stored once)
+        dedup_options = dedup.parse_options(params)
 
-        s3_client.put_object(Bucket=bucket_name, Key=s3_key,
-                             Body=body, ContentType=content_type)
+        # Decode base64
+        b64_norm = _normalize_base64(b64_image)
+        # Optional header-only pre-flight: routes the request before the full decode
+        preflight_plan = preflight.plan(b64_norm, params, stage=5) if params.get("preflight") else None
+        result["preflight"] = preflight_plan
+        # Optional no-op detection: a source already in target_format is uploaded as is
+        noop = passthrough.check(b64_norm, params, stage=5, target_format=None if formats else target_format,
+                                 preflight_plan=preflight_plan)
+        result["passthrough"] = noop
+        if noop:
+            buf_out = passthrough.open_bytes(b64_norm, zero_copy)
+        else:
+            if stream:
+                # Decoded chunk by chunk while the image is parsed (see below)
+                buf_in = None
+            elif zero_copy:
+                buf_in = buffers.decode_b64(b64_norm)
+            else:
+                try:
+                    image_bytes = base64.b64decode(b64_norm, validate=True)
+                except Exception:
+                    # fallback to permissive decode (some payloads may not be strictly padded)
+                    image_bytes = base64.b64decode(b64_norm + "===")
+                buf_in = io.BytesIO(image_bytes)
+
+            # Open image with Pillow
+            try:
+                if stream:
+                    # Oversized images are rejected at the header, before the rest is decoded
+                    img, result["stream"] = streaming.open_b64(b64_norm, params, preflight_plan)
+                else:
+                    img = Image.open(buf_in)
+                    if preflight_plan:
+                        preflight.apply_draft(img, preflight_plan)
+                    img.load()
+            except UnidentifiedImageError as e:
+                raise UnidentifiedImageError(f"Unable to identify image file: {e}")
+
+            if formats:
+                # Multi-format: decoded once, renditions encoded and uploaded concurrently
+                s3_keys, result["renditions"] = renditions.encode_and_upload(
+                    img, formats, s3_client, bucket_name, s3_key, parallel, zero_copy, dedup_options)
+            else:
+                # Convert mode if necessary (e.g., to RGB for JPEG)
+                if target_format in ("JPEG", "JPG") and modes.keeps(img, preserve_mode):
+                    # Greyscale stays one channel; alpha is composited onto white like below
+                    if img.mode == "LA":
+                        img = modes.flatten(img)
+                elif target_format in ("JPEG", "JPG") and img.mode in ("RGBA", "LA", "P"):
+                    # Convert with white background to avoid black where alpha existed
+                    background = Image.new("RGB", img.size, (255, 255, 255))
+                    if img.mode == "P":
+                        img = img.convert("RGBA")
+                    background.paste(img.convert("RGBA"),
+                                     mask=img.convert("RGBA").split()[-1])
+                    img = background
+                elif target_format == "PNG" and img.mode == "P":
+                    img = img.convert("RGBA")
+                elif img.mode == "CMYK" and target_format in ("PNG", "JPEG", "WEBP"):
+                    img = img.convert("RGB")
+
+                result["mode"] = img.mode
+
+                # Save converted image to memory buffer
+                buf_out = buffers.get_buffer("output") if zero_copy else io.BytesIO()
+                save_kwargs = {}
+                # For JPEG, set quality to a value to influence size (we intentionally increase processing)
+                if target_format in ("JPEG", "JPG"):
+                    save_kwargs["quality"] = 95
+                    save_kwargs["optimize"] = True
+                    save_kwargs["progressive"] = True
+
+                # Pillow expects format names like "PNG", "JPEG"
+                try:
+                    encode_stats = stripes.save(img, buf_out, parallel, format=target_format, **save_kwargs)
+                except ValueError:
+                    # Some user-supplied format strings might be lowercase or synonyms; try common mapping
+                    alt_format = {"JPG": "JPEG"}.get(target_format, target_format)
+                    encode_stats = stripes.save(img, buf_out, parallel, format=alt_format, **save_kwargs)
+                if parallel:
+                    result["parallel"] = {"encode": encode_stats}
+
+                buf_out.seek(0)
+
+        # Upload to S3 (a target_format list was uploaded rendition by rendition)
+        if not formats:
+            content_type = _guess_content_type(target_format)
+            # Collect bytes for put_object (the reusable buffer is streamed as a file)
+            body = buf_out if zero_copy else buf_out.getvalue()
+
+            if dedup_options:
+                s3_key, result["dedup"] = dedup.upload(
+                    s3_client, bucket_name, s3_key, body, content_type, dedup_options)
+            else:
+                s3_client.put_object(Bucket=bucket_name, Key=s3_key,
+                                     Body=body, ContentType=content_type)
 
         end = time.perf_counter()
 
@@ -130,6 +208,11 @@ def lambda_handler(event, context):
             s3_url = f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
         else:
             s3_url = f"https://{bucket_name}.s3.{region}.amazonaws.com/{s3_key}"
+        # One URL per format for a target_format list
+        if formats:
+            host = s3_url[:len(s3_url) - len(s3_key)]
+            result["s3_urls"] = {fmt: host + key for fmt, key in s3_keys.items()}
+            s3_url = result["s3_urls"][formats[0]]
 
         result["success"] = True
         result["s3_url"] = s3_url
@@ -0,0 +1,72 @@
+import base64
+import binascii
+import io
+import time
+import boto3
+from PIL import Image, UnidentifiedImageError
+from shared import container
+from shared import pipeline
+from shared import profiler
+
+# Global S3 client to leverage execution context reuse (used by a convert op with a bucket)
+s3_client = boto3.client("s3")
+
+
+@container.tracked
+@profiler.profiled(output_keys=("image", "s3_url"))
+def lambda_handler(event, context):
+    """
+    Generic handler: runs a declarative pipeline spec in one invocation.
+
+    Input:  {"image": "base64...", "pipeline": [{"op": "resize", ...}, ...],
+             "params": {"reorder": "safe" | "approx" | "off"}}
+    The ops are reordered by the cost-based planner (shared/pipeline.py) before they run.
+    """
+    start_time = time.perf_counter()
+    plan = None
+
+    try:
+        img_b64 = event.get("image")
+        if not img_b64 or not isinstance(img_b64, str):
+            raise ValueError("Invalid or missing 'image' field.")
+
+        ops = pipeline.parse_spec(event.get("pipeline"))
+        params = event.get("params") or {}
+        policy = pipeline.parse_policy(params)
+
+        try:
+            img_source = io.BytesIO(base64.b64decode(img_b64))
+        except (binascii.Error, ValueError):
+            raise ValueError("Base64 decode failed.")
+
+        try:
+            source_img = Image.open(img_source)
+        except UnidentifiedImageError:
+            raise ValueError("Unsupported or corrupted image format.")
+
+        with source_img as img:
+            # Planned from the header alone; the pixels are decoded in execute()
+            plan = pipeline.plan(ops, pipeline.working_shape(img), policy)
+            result_img, plan = pipeline.execute(img, plan)
+
+        convert_op = ops[-1] if ops[-1]["op"] == "convert" else None
+        output_b64, s3_url = pipeline.encode(result_img, convert_op, s3_client)
+
+        return {
+            "success": True,
+            "image": output_b64,
+            "s3_url": s3_url,
+            "execution_time_ms": (time.perf_counter() - start_time) * 1000.0,
+            "plan": plan,
+            "error": None
+        }
+
+    except Exception as e:
+        return {
+            "success": False,
+            "image": None,
+            "s3_url": None,
+            "execution_time_ms": (time.perf_counter() - start_time) * 1000.0,
+            "plan": plan,
+            "error": str(e)
+        }
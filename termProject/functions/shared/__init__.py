@@ -0,0 +1,6 @@
+"""
+Helpers shared by the pipeline handlers.
+
+The deploy script copies this package next to `lambda_function.py`, so every
+handler can `from shared import ...` exactly like it runs locally.
+"""
@@ -0,0 +1,60 @@
+"""
+Container identity for cold/warm classification.
+
+Lambda imports the handler module once per execution environment (container)
+and reuses it for every warm invocation, so module-level state here lives
+exactly as long as the container. `tracked` wraps a `lambda_handler` and adds
+a `container` field to every response:
+
+- `id`: random per container, fixed for its lifetime.
+- `invocation`: 1 for the first request this container serves, then 2, 3...
+- `cold`: True only for invocation 1, i.e. the request that paid for init.
+- `uptime_ms`: time since this module was imported (init included).
+- `memory_mb`: the function's configured memory (from the Lambda context),
+  None when invoked without one (local runs).
+"""
+import functools
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+CONTAINER_ID = uuid.uuid4().hex[:12]
+_LOADED_AT = time.perf_counter()
+_invocations = 0
+
+
+def identity(context: Any = None) -> Dict[str, Any]:
+    """
+    Counts this invocation and returns the container fields for the response.
+    """
+    global _invocations
+    _invocations += 1
+    return {
+        "id": CONTAINER_ID,
+        "invocation": _invocations,
+        "cold": _invocations == 1,
+        "uptime_ms": round((time.perf_counter() - _LOADED_AT) * 1000, 2),
+        "memory_mb": _memory_mb(context),
+    }
+
+
+def _memory_mb(context: Any) -> Optional[int]:
+    try:
+        return int(getattr(context, "memory_limit_in_mb"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def tracked(handler: Callable) -> Callable:
+    """
+    Decorator for a lambda_handler. Adds `container` to the response.
+    """
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        container = identity(context)
+        response = handler(event, context)
+        if isinstance(response, dict):
+            response["container"] = container
+        return response
+
+    return wrapper
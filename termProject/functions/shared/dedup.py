@@ -0,0 +1,150 @@
+"""
+Content-addressed upload dedup for Function 5 (`params.dedup`).
+
+The encoded output is hashed (SHA-256) and stored under
+`<dedup_prefix><digest><ext>`. Before the PUT, the key is looked up in a
+per-container index of keys already known to exist, then (on a miss) with a
+HEAD request. An existing object means the PUT is skipped. The caller's
+`s3_key` can still be served as an alias: a server-side copy of the content
+object, so the bytes never leave S3 again.
+
+The index can't see objects deleted after it learned of them (a lifecycle
+rule on the prefix, a manual cleanup), so its entries expire after
+INDEX_TTL_S: "head" re-checks an expired key with a HEAD, "index" PUTs it
+again. Within the TTL a deleted object is still reported as uploaded, and
+s3_url points at nothing; use "head" (the runner's --dedup) when objects
+under the prefix can expire.
+
+Saved time is estimated from this container's own PUT throughput, less the
+lookup cost. There is no estimate before the first real PUT.
+"""
+import hashlib
+import io
+import time
+from pathlib import PurePosixPath
+from typing import Any, Dict, Optional, Tuple, Union
+
+from botocore.exceptions import ClientError
+
+DEFAULT_PREFIX = "cas/"
+# "head": local index, then HEAD on a miss. "index": local index only (another
+# container's upload is missed and re-PUT, never wrongly skipped)
+LOOKUP_MODES = ("head", "index")
+
+HASH_CHUNK = 1 << 20
+# Seconds an index entry is trusted without asking S3 again
+INDEX_TTL_S = 300.0
+
+# Per-container state, kept across warm invocations; index: key -> when it was last known to exist
+_INDEX: Dict[str, float] = {}
+_PUT_RATE = {"bytes": 0, "ms": 0.0}
+
+
+def parse_options(params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Validates dedup / dedup_prefix / alias. Returns None when dedup is off.
+    """
+    lookup = params.get("dedup")
+    if not lookup:
+        return None
+    lookup = "head" if lookup is True else str(lookup).strip().lower()
+    if lookup not in LOOKUP_MODES:
+        raise ValueError(f"Unsupported dedup '{lookup}'. Expected true or one of {LOOKUP_MODES}.")
+    return {
+        "lookup": lookup,
+        "prefix": str(params.get("dedup_prefix", DEFAULT_PREFIX)),
+        "alias": bool(params.get("alias", False)),
+    }
+
+
+def _digest(body: Union[bytes, bytearray, io.IOBase]) -> Tuple[str, int]:
+    hasher = hashlib.sha256()
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        hasher.update(body)
+        return hasher.hexdigest(), len(body)
+
+    # File-like bodies (BytesIO, the reusable ByteBuffer) are hashed in place
+    getbuffer = getattr(body, "getbuffer", None)
+    if getbuffer is not None:
+        with getbuffer() as view:
+            hasher.update(view)
+            return hasher.hexdigest(), view.nbytes
+
+    body.seek(0)
+    size = 0
+    for chunk in iter(lambda: body.read(HASH_CHUNK), b""):
+        hasher.update(chunk)
+        size += len(chunk)
+    body.seek(0)
+    return hasher.hexdigest(), size
+
+
+def _exists(s3_client: Any, bucket: str, key: str, lookup: str) -> Optional[str]:
+    """
+    Where the object was found ("index" / "head"), or None when it wasn't.
+    """
+    confirmed = _INDEX.get(f"{bucket}/{key}")
+    if confirmed is not None and time.monotonic() - confirmed < INDEX_TTL_S:
+        return "index"
+    if lookup != "head":
+        return None
+    try:
+        s3_client.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    _INDEX[f"{bucket}/{key}"] = time.monotonic()
+    return "head"
+
+
+def upload(s3_client: Any, bucket: str, key: str, body: Any, content_type: str,
+           options: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """
+    PUTs the body under its content key unless it already exists, then writes
+    the alias if requested. Returns the key to report (alias or content key) and stats.
+    """
+    start = time.perf_counter()
+    digest, size = _digest(body)
+    content_key = f"{options['prefix']}{digest}{PurePosixPath(key).suffix}"
+    hash_ms = (time.perf_counter() - start) * 1000
+
+    lookup_start = time.perf_counter()
+    found = _exists(s3_client, bucket, content_key, options["lookup"])
+    lookup_ms = (time.perf_counter() - lookup_start) * 1000
+
+    put_ms = None
+    saved_ms = None
+    if found:
+        if _PUT_RATE["bytes"]:
+            saved_ms = size * _PUT_RATE["ms"] / _PUT_RATE["bytes"] - lookup_ms
+    else:
+        if hasattr(body, "seek"):
+            body.seek(0)
+        put_start = time.perf_counter()
+        s3_client.put_object(Bucket=bucket, Key=content_key, Body=body, ContentType=content_type)
+        put_ms = (time.perf_counter() - put_start) * 1000
+        _PUT_RATE["bytes"] += size
+        _PUT_RATE["ms"] += put_ms
+        _INDEX[f"{bucket}/{content_key}"] = time.monotonic()
+
+    alias = None
+    if options["alias"] and key != content_key:
+        # Server-side copy: no object bytes are sent from the function
+        s3_client.copy_object(Bucket=bucket, Key=key, ContentType=content_type,
+                              CopySource={"Bucket": bucket, "Key": content_key},
+                              MetadataDirective="REPLACE")
+        alias = key
+
+    return alias or content_key, {
+        "key": content_key,
+        "sha256": digest,
+        "hit": bool(found),
+        "found_by": found,
+        "skipped_bytes": size if found else 0,
+        "hash_ms": round(hash_ms, 3),
+        "lookup_ms": round(lookup_ms, 3),
+        "put_ms": round(put_ms, 3) if put_ms is not None else None,
+        "saved_ms": round(saved_ms, 3) if saved_ms is not None else None,
+        "alias": alias,
+    }
@@ -0,0 +1,207 @@
+"""
+True bit-depth mapping for Function 3 (`target_depth`).
+
+Accepts 8-bit and 16-bit greyscale sources (PNG/TIFF `I;16`) and quantizes
+the gamma-mapped signal to any depth from 1 to 16 bits. The uint16 data is
+never widened to Pillow's 32-bit mode "I": tone mapping goes through a lookup
+table indexed by the raw sample, and dithering works on row blocks.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional in the Lambda layer
+    np = None
+
+DEFAULT_TARGET_DEPTH = 8
+DEFAULT_GAMMA = 2.2
+DITHER_MODES = ("none", "ordered", "floyd-steinberg")
+
+# Modes Pillow decodes from 16-bit greyscale PNG/TIFF
+HIGH_DEPTH_MODES = ("I;16", "I;16L", "I;16B", "I;16N", "I")
+
+# Rows per block for the ordered-dither path (bounds the float32 scratch buffer)
+BLOCK_ROWS = 256
+
+# 8x8 Bayer matrix, normalized to thresholds in [0, 1)
+_BAYER_8 = (
+    (0, 32, 8, 40, 2, 34, 10, 42),
+    (48, 16, 56, 24, 50, 18, 58, 26),
+    (12, 44, 4, 36, 14, 46, 6, 38),
+    (60, 28, 52, 20, 62, 30, 54, 22),
+    (3, 35, 11, 43, 1, 33, 9, 41),
+    (51, 19, 59, 27, 49, 17, 57, 25),
+    (15, 47, 7, 39, 13, 45, 5, 37),
+    (63, 31, 55, 23, 61, 29, 53, 21),
+)
+
+
+def parse_options(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validates target_depth / source_depth / gamma / dither from the request params.
+    """
+    target_depth = int(params.get("target_depth", DEFAULT_TARGET_DEPTH))
+    if not 1 <= target_depth <= 16:
+        raise ValueError(f"target_depth must be between 1 and 16, got {target_depth}.")
+
+    source_depth = params.get("source_depth")
+    if source_depth is not None:
+        source_depth = int(source_depth)
+        if not 1 <= source_depth <= 16:
+            raise ValueError(f"source_depth must be between 1 and 16, got {source_depth}.")
+
+    dither = str(params.get("dither") or "none").strip().lower()
+    if dither not in DITHER_MODES:
+        raise ValueError(f"Unsupported dither '{dither}'. Expected one of {DITHER_MODES}.")
+
+    return {
+        "target_depth": target_depth,
+        "source_depth": source_depth,
+        "gamma": float(params.get("gamma", DEFAULT_GAMMA)),
+        "dither": dither,
+    }
+
+
+def needs_true_depth(img: Image.Image, options: Dict[str, Any]) -> bool:
+    """
+    True when the request can't be served by the fixed 8-bit simulation:
+    a 16-bit source, a non-8-bit target, an explicit source depth, or dithering.
+    """
+    return (
+        img.mode in HIGH_DEPTH_MODES
+        or options["target_depth"] != DEFAULT_TARGET_DEPTH
+        or options["source_depth"] is not None
+        or options["dither"] != "none"
+    )
+
+
+def is_pixelwise(options: Dict[str, Any]) -> bool:
+    """
+    Error diffusion carries state across rows, so it can't be split into stripes.
+    """
+    return options["dither"] != "floyd-steinberg"
+
+
+def _read_samples(img: Image.Image, source_depth: Optional[int]) -> Tuple["np.ndarray", int]:
+    """
+    Returns native-endian uint8/uint16 samples and the effective source depth.
+    """
+    if img.mode in ("I;16", "I;16L", "I;16B", "I;16N"):
+        samples = np.asarray(img).astype(np.uint16, copy=False)
+        return samples, source_depth or 16
+    if img.mode == "I":
+        # Already 32-bit after decode; clamp back into a uint16 container
+        samples = np.clip(np.asarray(img), 0, 65535).astype(np.uint16)
+        return samples, source_depth or 16
+    if img.mode != "L":
+        img = img.convert("L")
+    return np.asarray(img), source_depth or 8
+
+
+def _tone_lut(container_levels: int, source_depth: int, gamma: float) -> "np.ndarray":
+    """
+    Normalized, gamma-mapped value for every possible raw sample (values above the
+    source range clamp to white).
+    """
+    max_in = float((1 << source_depth) - 1)
+    raw = np.minimum(np.arange(container_levels, dtype=np.float64), max_in) / max_in
+    return raw ** (1.0 / gamma)
+
+
+def _code_to_container(codes: "np.ndarray", target_depth: int) -> "np.ndarray":
+    """
+    Stretches quantized codes (0 .. 2**depth - 1) to the full 8- or 16-bit container.
+    """
+    max_code = (1 << target_depth) - 1
+    if target_depth <= 8:
+        scale = np.rint(np.arange(max_code + 1) * (255.0 / max_code)).astype(np.uint8)
+    else:
+        scale = np.rint(np.arange(max_code + 1) * (65535.0 / max_code)).astype(np.uint16)
+    return scale[codes]
+
+
+def _ordered_dither(samples: "np.ndarray", tone: "np.ndarray", max_code: int) -> "np.ndarray":
+    bayer = (np.array(_BAYER_8, dtype=np.float32) + 0.5) / 64.0
+    height, width = samples.shape
+    tile = np.tile(bayer, (BLOCK_ROWS // 8 + 1, width // 8 + 1))
+    codes = np.empty(samples.shape, dtype=np.uint16)
+    scaled_tone = (tone * max_code).astype(np.float32)
+
+    for top in range(0, height, BLOCK_ROWS):
+        block = scaled_tone[samples[top:top + BLOCK_ROWS]]
+        block += tile[:block.shape[0], :width]
+        np.floor(block, out=block)
+        np.clip(block, 0, max_code, out=block)
+        codes[top:top + BLOCK_ROWS] = block
+    return codes
+
+
+def _floyd_steinberg(samples: "np.ndarray", tone: "np.ndarray", max_code: int) -> "np.ndarray":
+    """
+    Error diffusion processed in anti-diagonal wavefronts (all pixels with equal
+    2*y + x are independent), so each step is one vectorized update.
+    """
+    work = (tone * max_code).astype(np.float32)[samples]
+    height, width = work.shape
+    codes = np.empty(work.shape, dtype=np.uint16)
+
+    for t in range(2 * (height - 1) + width):
+        y_start = max(0, -(-(t - width + 1) // 2))
+        y_stop = min(height - 1, t // 2)
+        if y_start > y_stop:
+            continue
+        ys = np.arange(y_start, y_stop + 1)
+        xs = t - 2 * ys
+
+        values = work[ys, xs]
+        quantized = np.clip(np.rint(values), 0, max_code)
+        codes[ys, xs] = quantized
+        error = values - quantized
+
+        right = xs + 1 < width
+        work[ys[right], xs[right] + 1] += error[right] * (7 / 16)
+        below = ys + 1 < height
+        left = below & (xs > 0)
+        work[ys[left] + 1, xs[left] - 1] += error[left] * (3 / 16)
+        work[ys[below] + 1, xs[below]] += error[below] * (5 / 16)
+        below_right = below & right
+        work[ys[below_right] + 1, xs[below_right] + 1] += error[below_right] * (1 / 16)
+    return codes
+
+
+def map_depth(img: Image.Image, options: Dict[str, Any]) -> Image.Image:
+    """
+    Gamma-maps and quantizes a greyscale image to options["target_depth"] bits.
+    Returns mode "L" for depths <= 8, otherwise "I;16" (scaled to the full 16-bit range).
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for target_depth / high bit-depth input.")
+
+    samples, source_depth = _read_samples(img, options["source_depth"])
+    target_depth = options["target_depth"]
+    max_code = (1 << target_depth) - 1
+    container_levels = 65536 if samples.dtype == np.uint16 else 256
+    tone = _tone_lut(container_levels, source_depth, options["gamma"])
+
+    if options["dither"] == "ordered":
+        codes = _ordered_dither(samples, tone, max_code)
+    elif options["dither"] == "floyd-steinberg":
+        codes = _floyd_steinberg(samples, tone, max_code)
+    else:
+        # Single gather through a precomputed LUT; no per-pixel float scratch
+        lut = _code_to_container(np.rint(tone * max_code).astype(np.uint16), target_depth)
+        return Image.fromarray(lut[samples])
+
+    return Image.fromarray(_code_to_container(codes, target_depth))
+
+
+def save_options(img: Image.Image) -> Dict[str, Any]:
+    """
+    JPEG keeps the 8-bit contract; 16-bit results need a lossless 16-bit container,
+    and alpha (LA under preserve_mode, LA/RGBA from the pipeline handler) needs PNG too.
+    """
+    if img.mode.startswith("I;16") or img.mode in ("LA", "RGBA"):
+        return {"format": "PNG"}
+    return {"format": "JPEG", "quality": 85}
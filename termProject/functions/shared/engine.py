@@ -0,0 +1,189 @@
+"""
+Alternative image engines selected per request with `params.engine`.
+
+- "pillow": Pillow C primitives (LUT-based `point`, `transpose`, `resize`).
+- "numpy":  NumPy array kernels (channel dot, vectorized gamma, `rot90`,
+            separable Lanczos resampling).
+
+Handlers keep their own (LLM-generated) code path when no engine is requested.
+"""
+import math
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional in the Lambda layer
+    np = None
+
+ENGINES = ("pillow", "numpy")
+
+# ITU-R 601-2 luma weights in Pillow's 16-bit fixed point (matches convert("L") exactly)
+LUMA_WEIGHTS_FIXED = (19595, 38470, 7471)
+
+# Prompt-defined color depth mapping: 8-bit -> simulated 10-bit -> gamma 2.2 -> 8-bit
+TEN_BIT_SCALE = 4
+TEN_BIT_MAX = 1023.0
+GAMMA = 2.2
+
+LANCZOS_SUPPORT = 3.0
+# 8-bit modes the numpy resampler rebuilds as-is; anything else (16-bit, palette, CMYK) uses Pillow
+NUMPY_RESIZE_MODES = ("L", "LA", "RGB", "RGBA")
+
+
+def resolve_engine(params: Dict[str, Any]) -> Optional[str]:
+    """
+    Returns the requested engine, or None to keep the handler's own implementation.
+    Falls back to "pillow" when numpy is not installed in the layer.
+    """
+    engine = params.get("engine") if isinstance(params, dict) else None
+    if not engine:
+        return None
+    engine = str(engine).strip().lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Unsupported engine '{engine}'. Expected one of {ENGINES}.")
+    if engine == "numpy" and np is None:
+        return "pillow"
+    return engine
+
+
+# --- Pillow <-> NumPy buffers ---
+
+def to_array(img: Image.Image) -> "np.ndarray":
+    """
+    Exposes the pixels as an ndarray (one copy: Pillow keeps its own block storage).
+    """
+    return np.asarray(img)
+
+
+def from_array(arr: "np.ndarray") -> Image.Image:
+    """
+    Image over the array's pixels. Non-contiguous views (e.g. rot90) are copied
+    to C order first; Pillow then shares the buffer for L, RGBA and I;16 and
+    copies LA and RGB into its own storage.
+    """
+    return Image.fromarray(np.ascontiguousarray(arr))
+
+
+# --- Greyscale ---
+
+def greyscale(img: Image.Image, engine: str) -> Image.Image:
+    if engine == "pillow" or img.mode == "L":
+        return img.convert("L")
+
+    if img.mode not in ("RGB", "RGBA", "RGBX"):
+        img = img.convert("RGB")
+    rgb = to_array(img)[..., :3].astype(np.float32)
+    # Integer-valued float32 sums stay below 2**24, so the fixed-point result is exact
+    luma = rgb @ np.array(LUMA_WEIGHTS_FIXED, dtype=np.float32)
+    luma += 0x8000
+    luma *= 1.0 / 65536
+    np.floor(luma, out=luma)
+    return from_array(luma.astype(np.uint8))
+
+
+# --- Color depth mapping ---
+
+def _gamma_lut() -> Tuple[int, ...]:
+    inv_gamma = 1.0 / GAMMA
+    return tuple(
+        min(255, int(round(255.0 * ((p * TEN_BIT_SCALE / TEN_BIT_MAX) ** inv_gamma))))
+        for p in range(256)
+    )
+
+
+def color_depth(img: Image.Image, engine: str) -> Image.Image:
+    """
+    Greyscale -> simulated 10-bit -> gamma 2.2 -> 8-bit, without the Python callback per pixel.
+    """
+    grey = img if img.mode == "L" else img.convert("L")
+    if engine == "pillow":
+        return grey.point(_gamma_lut())
+
+    # float32 keeps the per-pixel math vectorized at half the memory of float64
+    work = to_array(grey).astype(np.float32)
+    work *= TEN_BIT_SCALE / TEN_BIT_MAX
+    np.power(work, 1.0 / GAMMA, out=work)
+    work *= 255.0
+    np.rint(work, out=work)
+    np.clip(work, 0, 255, out=work)
+    return from_array(work.astype(np.uint8))
+
+
+# --- Rotation ---
+
+def rotate(img: Image.Image, angle: float, engine: str) -> Image.Image:
+    """
+    Counter-clockwise rotation with expand=True. Right angles are exact transposes;
+    other angles fall back to Pillow's affine rotate for both engines.
+    """
+    quarter_turns = int(angle // 90) % 4 if float(angle) % 90 == 0 else None
+    if quarter_turns is None:
+        return img.rotate(angle, expand=True)
+    if quarter_turns == 0:
+        return img.copy()
+
+    if engine == "pillow":
+        method = {1: Image.Transpose.ROTATE_90, 2: Image.Transpose.ROTATE_180,
+                  3: Image.Transpose.ROTATE_270}[quarter_turns]
+        return img.transpose(method)
+
+    if img.mode not in ("L", "LA", "RGB", "RGBA", "I;16"):
+        img = img.convert("RGB")
+    return from_array(np.rot90(to_array(img), k=quarter_turns))
+
+
+# --- Resize ---
+
+def _lanczos(x: "np.ndarray") -> "np.ndarray":
+    out = np.sinc(x) * np.sinc(x / LANCZOS_SUPPORT)
+    out[np.abs(x) >= LANCZOS_SUPPORT] = 0.0
+    return out
+
+
+def _resample_weights(in_size: int, out_size: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Per-output tap indices and normalized weights, following Pillow's antialiased
+    filter placement (support widens by the downscale factor).
+    """
+    scale = in_size / out_size
+    filter_scale = max(scale, 1.0)
+    support = LANCZOS_SUPPORT * filter_scale
+    taps = int(math.ceil(support)) * 2 + 1
+
+    centers = (np.arange(out_size, dtype=np.float64) + 0.5) * scale
+    first = np.floor(centers - support + 0.5).astype(np.int64)
+    index = first[:, None] + np.arange(taps)[None, :]
+    weights = _lanczos((index + 0.5 - centers[:, None]) / filter_scale)
+    weights[(index < 0) | (index >= in_size)] = 0.0
+    weights /= weights.sum(axis=1, keepdims=True)
+    return np.clip(index, 0, in_size - 1), weights.astype(np.float32)
+
+
+def _resample_axis(arr: "np.ndarray", out_size: int, axis: int) -> "np.ndarray":
+    index, weights = _resample_weights(arr.shape[axis], out_size)
+    out_shape = list(arr.shape)
+    out_shape[axis] = out_size
+    out = np.zeros(out_shape, dtype=np.float32)
+    # Loop over filter taps only; each iteration is a full-image vectorized gather
+    for tap in range(index.shape[1]):
+        gathered = np.take(arr, index[:, tap], axis=axis)
+        w = weights[:, tap].reshape([-1 if a == axis else 1 for a in range(arr.ndim)])
+        out += gathered * w
+    return out
+
+
+def resize(img: Image.Image, size: Tuple[int, int], engine: str) -> Image.Image:
+    width, height = size
+    # Converting would drop alpha (LA) or clip 16-bit samples, and every stage keeps its input mode
+    if engine == "pillow" or img.mode not in NUMPY_RESIZE_MODES:
+        return img.resize((width, height), Image.Resampling.LANCZOS)
+
+    # LA resamples as two channels; fromarray rebuilds it from the (h, w, 2) shape
+    work = to_array(img).astype(np.float32)
+    work = _resample_axis(work, height, axis=0)
+    work = _resample_axis(work, width, axis=1)
+    np.rint(work, out=work)
+    np.clip(work, 0, 255, out=work)
+    return from_array(work.astype(np.uint8))
@@ -0,0 +1,106 @@
+"""
+Fused resize + rotate for Function 2 (`params.rotate`).
+
+Run as two steps, Function 2 resamples the image, JPEG-encodes it, and
+Function 4 decodes it again to rotate it. Here both transforms are applied
+in one pass from the decoded source:
+
+* multiples of 90 degrees: the LANCZOS resize, then a transpose of the
+  (already small) result, which moves pixels without interpolating;
+* any other angle: a single affine `Image.transform` whose matrix composes
+  the scale with the rotation. The canvas and black corners match
+  `resize(size).rotate(angle, expand=True)`. transform() samples without an
+  antialiasing filter, so a large reduction first goes through an integer
+  `reduce()` per axis (a plain block average), which leaves the affine pass
+  less than 2x to cover. That pass is bilinear: for a residual reduction
+  between 1x and 2x it aliases less than bicubic (measured ~2 dB closer to
+  the reference in test/fusion_report.py) and runs in about a third of the time.
+"""
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+# Counter-clockwise, like Image.rotate and Function 4
+TRANSPOSE = {90: Image.Transpose.ROTATE_90,
+             180: Image.Transpose.ROTATE_180,
+             270: Image.Transpose.ROTATE_270}
+
+
+def parse_angle(params: Dict[str, Any]) -> Optional[float]:
+    """
+    params.rotate in degrees (counter-clockwise), or None when no rotation was requested.
+    """
+    angle = params.get("rotate")
+    if angle is None:
+        return None
+    if isinstance(angle, bool):
+        raise ValueError("rotate must be a number of degrees.")
+    try:
+        angle = float(angle)
+    except (TypeError, ValueError):
+        raise ValueError(f"rotate must be a number of degrees, got {angle!r}.")
+    if not math.isfinite(angle):
+        raise ValueError("rotate must be finite.")
+    if params.get("sizes"):
+        raise ValueError("rotate can't be combined with sizes.")
+    return angle
+
+
+def rotation_matrix(size: Tuple[int, int], angle: float) -> Tuple[List[float], Tuple[int, int]]:
+    """
+    The inverse affine matrix (output -> input coordinates) and the canvas size
+    of rotate(angle, expand=True) on an image of `size`, computed as Pillow does.
+    """
+    width, height = size
+    theta = -math.radians(angle)
+    a, b = round(math.cos(theta), 15), round(math.sin(theta), 15)
+    d, e = -b, a
+    # Rotation about the centre
+    cx, cy = width / 2, height / 2
+    c = -a * cx - b * cy + cx
+    f = -d * cx - e * cy + cy
+
+    xs = [a * x + b * y + c for x, y in ((0, 0), (width, 0), (width, height), (0, height))]
+    ys = [d * x + e * y + f for x, y in ((0, 0), (width, 0), (width, height), (0, height))]
+    canvas = (math.ceil(max(xs)) - math.floor(min(xs)), math.ceil(max(ys)) - math.floor(min(ys)))
+
+    # Shift so the expanded canvas stays centred on the image
+    ox, oy = -(canvas[0] - width) / 2, -(canvas[1] - height) / 2
+    return [a, b, a * ox + b * oy + c, d, e, d * ox + e * oy + f], canvas
+
+
+def resize_rotate(img: Image.Image, size: Tuple[int, int], angle: float) -> Tuple[Image.Image, Dict[str, Any]]:
+    """
+    resize(size) followed by rotate(angle, expand=True), in one resampling pass.
+    Returns the image and stats.
+    """
+    start = time.perf_counter()
+    quarter = angle % 360
+    factor = (1, 1)
+    if quarter % 90 == 0:
+        method = "transpose"
+        out = img if img.size == tuple(size) else img.resize(size, Image.Resampling.LANCZOS)
+        if quarter:
+            out = out.transpose(TRANSPOSE[int(quarter)])
+    else:
+        method = "affine"
+        if img.mode in ("1", "P"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        factor = (max(img.width // size[0], 1), max(img.height // size[1], 1))
+        if factor != (1, 1):
+            img = img.reduce(factor)
+        matrix, canvas = rotation_matrix(size, quarter)
+        # Compose with the scale: output-size coordinates -> source coordinates
+        sx, sy = img.width / size[0], img.height / size[1]
+        matrix = [value * sx for value in matrix[:3]] + [value * sy for value in matrix[3:]]
+        out = img.transform(canvas, Image.Transform.AFFINE, matrix, resample=Image.Resampling.BILINEAR)
+
+    return out, {
+        "angle": angle,
+        "method": method,
+        "reduce": list(factor),
+        "size": list(out.size),
+        "transform_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
@@ -0,0 +1,77 @@
+"""
+Colour-mode contract (`params.preserve_mode`).
+
+Step 1 emits single-channel greyscale ("L", or "LA" when the source has
+alpha). Some later stages widen every input to RGB, and then resample,
+rotate and encode three identical channels. With preserve_mode, every stage
+keeps "L"/"LA" input in that mode end to end. JPEG can't store alpha, so a
+stage that writes JPEG writes PNG for "LA" instead.
+
+Every stage reports the mode of its output image (response field `mode`),
+so the runner can carry it along the pipeline and log channels per stage.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+GREY_MODES = ("L", "LA")
+
+
+def preserve(params: Dict[str, Any]) -> bool:
+    return bool(params.get("preserve_mode", False))
+
+
+def keeps(img: Image.Image, preserve_mode: bool) -> bool:
+    """
+    True when the image should stay in its own greyscale mode.
+    """
+    return preserve_mode and img.mode in GREY_MODES
+
+
+def save_options(img: Image.Image, **jpeg_options: Any) -> Dict[str, Any]:
+    """
+    The stage's own JPEG settings, or PNG when the image has an alpha band.
+    """
+    if img.mode == "LA":
+        return {"format": "PNG"}
+    return {"format": "JPEG", **jpeg_options}
+
+
+def split_alpha(img: Image.Image, preserve_mode: bool) -> Tuple[Image.Image, Optional[Image.Image]]:
+    """
+    (L image, alpha) for "LA" input under preserve_mode, so a stage that only
+    understands "L" can run and hand the alpha back to with_alpha().
+    """
+    if preserve_mode and img.mode == "LA":
+        luma, alpha = img.split()
+        return luma, alpha
+    return img, None
+
+
+def with_alpha(img: Image.Image, alpha: Optional[Image.Image]) -> Image.Image:
+    """
+    img with the alpha band put back ("LA"). 16-bit results have no LA mode and stay as they are.
+    """
+    if alpha is None or img.mode != "L":
+        return img
+    return Image.merge("LA", (img, alpha))
+
+
+def flatten(img: Image.Image) -> Image.Image:
+    """
+    "LA" composited onto white, still single-channel, for formats without alpha.
+    """
+    background = Image.new("L", img.size, 255)
+    background.paste(img.getchannel("L"), mask=img.getchannel("A"))
+    return background
+
+
+def source_alpha(img: Image.Image) -> Optional[Image.Image]:
+    """
+    The alpha band of any source mode (transparency included), or None.
+    """
+    if "A" in img.getbands():
+        return img.getchannel("A")
+    if "transparency" in img.info:
+        return img.convert("RGBA").getchannel("A")
+    return None
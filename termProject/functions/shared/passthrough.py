@@ -0,0 +1,81 @@
+"""
+No-op detection and byte passthrough (`params.passthrough`).
+
+Some requests don't change the image: rotating by a multiple of 360 degrees,
+resizing to the current size, greyscale of an image that is already "L", or
+converting to the format the source already has. These are detected from the
+header alone (see shared/preflight.py) and the handler returns, or uploads,
+the input bytes untouched instead of decoding and re-encoding them.
+"""
+import base64
+import io
+from typing import Any, Dict, Optional, Tuple, Union
+
+from shared import buffers
+from shared import preflight
+
+# Format aliases: user spellings and JPEG containers Pillow reports separately
+FORMAT_ALIASES = {"JPG": "JPEG", "TIF": "TIFF", "MPO": "JPEG"}
+
+# Step 5 converts other modes (alpha, palette, CMYK) on the way, so only these
+# sources come out of the re-encode unchanged
+FORMAT_PASSTHROUGH_MODES = ("1", "L", "RGB")
+
+
+def _normalize_format(name: Optional[str]) -> str:
+    name = str(name or "").strip().upper()
+    return FORMAT_ALIASES.get(name, name)
+
+
+def _header_info(data: Union[str, bytes], preflight_plan: Optional[Dict[str, Any]]) -> Tuple[str, Tuple[int, int], str]:
+    if preflight_plan:
+        return preflight_plan["format"], tuple(preflight_plan["size"]), preflight_plan["mode"]
+    header, _ = preflight.read_header(data)
+    return header.format, header.size, header.mode
+
+
+def check(data: Union[str, bytes], params: Dict[str, Any], stage: int, *,
+          size: Optional[Tuple[int, int]] = None, angle: Optional[float] = None,
+          target_format: Optional[str] = None,
+          preflight_plan: Optional[Dict[str, Any]] = None) -> Optional[bool]:
+    """
+    True when the stage is a no-op for this input, False when it isn't, None
+    when params.passthrough wasn't requested. The handler passes its own
+    resolved parameters (size, angle, target_format); a pre-flight plan, if
+    any, saves parsing the header twice.
+    """
+    if not params.get("passthrough"):
+        return None
+    if stage == 4 and float(angle) % 360 != 0:
+        return False  # nothing to learn from the header
+
+    img_format, img_size, img_mode = _header_info(data, preflight_plan)
+    if stage == 1:
+        return img_mode == "L"
+    if stage == 2:
+        return size is not None and tuple(img_size) == tuple(size)
+    if stage == 5:
+        return (_normalize_format(img_format) == _normalize_format(target_format)
+                and img_mode in FORMAT_PASSTHROUGH_MODES)
+    # Rotation by a multiple of 360 degrees (the header read validates the input)
+    return stage == 4
+
+
+def payload(data: Union[str, bytes]) -> str:
+    """
+    The input base64 as the response image (data URI prefix dropped, nothing decoded).
+    """
+    if isinstance(data, bytes):
+        data = data.decode("ascii")
+    if data.startswith("data:"):
+        data = data.split(",", 1)[1]
+    return data
+
+
+def open_bytes(data: Union[str, bytes], zero_copy: bool = False) -> Union[buffers.ByteBuffer, io.BytesIO]:
+    """
+    The decoded input as an upload body for Step 5 (the reusable buffer with zero_copy).
+    """
+    if zero_copy:
+        return buffers.decode_b64(data)
+    return io.BytesIO(base64.b64decode(payload(data)))
@@ -0,0 +1,335 @@
+"""
+Declarative pipeline spec and cost-based planner for the generic handler
+(functions/pipeline/pipeline_func.py).
+
+A spec is a list of ops, each a dict with an "op" name and its parameters:
+
+    [{"op": "greyscale"},
+     {"op": "resize", "width": 800, "height": 600},
+     {"op": "depth", "target_depth": 8},
+     {"op": "rotate", "angle": 90},
+     {"op": "convert", "target_format": "PNG", "bucket_name": "...", "s3_key": "..."}]
+
+The planner only swaps neighbouring ops that commute, and enumerates every
+order reachable that way. Each order is costed with a per-sample model:
+pixels in/out x channels x a nanosecond cost per op. The cheapest order runs.
+So greyscale moves in front of rotate (1 channel instead of 3), or of resize
+under "approx", and a right-angle rotate moves after a shrinking resize (with
+the size swapped). The response reports the estimated cost next to the measured time
+of every op.
+"""
+import base64
+import io
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from shared import depth
+from shared import engine as image_engine
+from shared import geometry
+from shared import modes
+from shared import renditions
+
+OPS = ("greyscale", "resize", "depth", "rotate", "convert")
+MAX_OPS = 8
+# Modes the ops run on as they are; anything else (palette, CMYK, ...) becomes RGB/RGBA first
+KEEP_MODES = ("L", "LA", "RGB", "RGBA")
+KEEP_ALPHA_MODES = ("LA", "RGBA")
+
+# "safe": only swaps that give the same pixels (up to rounding). "approx" also
+# swaps greyscale and resize (LANCZOS overshoot is clipped per RGB channel before
+# the luma mix: ~55 dB PSNR against the spec order, up to 7 levels off, and the
+# output JPEG turns that into ~41 dB) and moves a resize in front of
+# an 8-bit+, undithered depth mapping (the tone curve is then applied after
+# filtering rather than before). "off" runs the spec as written.
+REORDER_POLICIES = ("safe", "approx", "off")
+
+# Nanoseconds per sample, measured with Pillow 12 on a 1920x1080 JPEG (single
+# core). Only their ratios decide the plan; the absolute values let the
+# estimate be compared with the measured time.
+COST_NS = {
+    "greyscale": 0.4,         # per input sample
+    "resize": 6.0,            # per input + output sample (LANCZOS)
+    "transpose": 1.0,         # per sample (right-angle rotate)
+    "rotate": 3.0,            # per output sample (nearest, expanded canvas)
+    "depth": 0.6,             # per pixel, 8-bit LUT path
+    "depth_true": 3.3,        # per pixel, target_depth / source_depth path
+    "depth_ordered": 11.0,    # per pixel
+    "depth_floyd-steinberg": 300.0,
+}
+
+
+# --- Spec ---
+
+def parse_spec(spec: Any) -> List[Dict[str, Any]]:
+    """
+    Validates the op list and fills in defaults (resize 800x600, rotate 90,
+    depth 8-bit, convert to PNG). A convert op may only come last.
+    """
+    if not isinstance(spec, (list, tuple)) or not 1 <= len(spec) <= MAX_OPS:
+        raise ValueError(f"pipeline must be a list of 1 to {MAX_OPS} ops.")
+
+    ops = []
+    for index, entry in enumerate(spec):
+        if isinstance(entry, str):
+            entry = {"op": entry}
+        if not isinstance(entry, dict):
+            raise ValueError(f"pipeline[{index}] must be an object with an 'op' field.")
+        name = str(entry.get("op", "")).strip().lower()
+        if name not in OPS:
+            raise ValueError(f"Unsupported op '{entry.get('op')}' at pipeline[{index}]. Expected one of {OPS}.")
+
+        if name == "resize":
+            op = {"op": name, "width": int(entry.get("width", 800)), "height": int(entry.get("height", 600))}
+            if op["width"] <= 0 or op["height"] <= 0:
+                raise ValueError(f"resize at pipeline[{index}] needs a positive width and height.")
+        elif name == "rotate":
+            op = {"op": name, "angle": float(entry.get("angle", 90))}
+            if not math.isfinite(op["angle"]):
+                raise ValueError(f"rotate at pipeline[{index}] needs a finite angle.")
+        elif name == "depth":
+            op = {"op": name, **depth.parse_options(entry)}
+        elif name == "convert":
+            if index != len(spec) - 1:
+                raise ValueError("convert must be the last op.")
+            op = {"op": name,
+                  "target_format": renditions.normalize_format(entry.get("target_format", "PNG")),
+                  "bucket_name": entry.get("bucket_name"),
+                  "s3_key": entry.get("s3_key")}
+            Image.init()
+            if op["target_format"] not in Image.SAVE:
+                raise ValueError(f"Cannot encode target_format '{op['target_format']}'.")
+            if bool(op["bucket_name"]) != bool(op["s3_key"]):
+                raise ValueError("convert needs both bucket_name and s3_key to upload.")
+        else:
+            op = {"op": name}
+        ops.append(op)
+    return ops
+
+
+def parse_policy(params: Dict[str, Any]) -> str:
+    policy = params.get("reorder", "safe")
+    if policy is False:
+        return "off"
+    if policy is True:
+        return "safe"
+    policy = str(policy).strip().lower()
+    if policy not in REORDER_POLICIES:
+        raise ValueError(f"Unsupported reorder '{policy}'. Expected one of {REORDER_POLICIES}.")
+    return policy
+
+
+# --- Cost model ---
+
+def _depth_cost(op: Dict[str, Any]) -> float:
+    if op["dither"] != "none":
+        return COST_NS[f"depth_{op['dither']}"]
+    if op["target_depth"] != depth.DEFAULT_TARGET_DEPTH or op["source_depth"] is not None:
+        return COST_NS["depth_true"]
+    return COST_NS["depth"]
+
+
+def estimate(op: Dict[str, Any], shape: Tuple[int, int, int]) -> Tuple[float, Tuple[int, int, int]]:
+    """
+    Estimated cost in ms of one op on an image of (width, height, channels), and the output shape.
+    """
+    width, height, channels = shape
+    pixels = width * height
+    name = op["op"]
+    if name == "greyscale":
+        # Single-channel input is passed through
+        cost = COST_NS["greyscale"] * pixels * channels if channels > 1 else 0.0
+        return cost / 1e6, (width, height, 1)
+    if name == "resize":
+        cost = COST_NS["resize"] * (pixels + op["width"] * op["height"]) * channels
+        return cost / 1e6, (op["width"], op["height"], channels)
+    if name == "rotate":
+        angle = op["angle"] % 360
+        if angle == 0:
+            return COST_NS["transpose"] * pixels * channels / 1e6, shape
+        if angle % 90 == 0:
+            out = (height, width) if angle % 180 else (width, height)
+            return COST_NS["transpose"] * pixels * channels / 1e6, (*out, channels)
+        _, canvas = geometry.rotation_matrix((width, height), angle)
+        return COST_NS["rotate"] * canvas[0] * canvas[1] * channels / 1e6, (*canvas, channels)
+    if name == "depth":
+        cost = _depth_cost(op) * pixels
+        if channels > 1:
+            cost += COST_NS["greyscale"] * pixels * channels
+        return cost / 1e6, (width, height, 1)
+    # convert: encoding is the same whatever the order, so it isn't part of the plan
+    return 0.0, shape
+
+
+def estimate_plan(ops: List[Dict[str, Any]], shape: Tuple[int, int, int]) -> float:
+    total = 0.0
+    for op in ops:
+        cost, shape = estimate(op, shape)
+        total += cost
+    return total
+
+
+# --- Planner ---
+
+def _swap(first: Dict[str, Any], second: Dict[str, Any],
+          policy: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    (second, first) when running them the other way round gives the same
+    result (parameters adjusted), None when the two don't commute.
+    """
+    names = {first["op"], second["op"]}
+    if "convert" in names or len(names) == 1:
+        return None
+    if names == {"greyscale", "resize"}:
+        # Luma is linear, but LANCZOS output is clipped to 0-255 per channel before the mix
+        return (second, first) if policy == "approx" else None
+    if "greyscale" in names:
+        # Luma is a fixed mix of each pixel's channels: it commutes with moving pixels,
+        # and depth mapping converts to greyscale first anyway
+        return second, first
+    if names == {"resize", "rotate"}:
+        rotate, resize = (first, second) if first["op"] == "rotate" else (second, first)
+        if rotate["angle"] % 90:
+            return None  # the expanded canvas depends on the size it's rotating
+        if rotate["angle"] % 180:
+            resize = {**resize, "width": resize["height"], "height": resize["width"]}
+        return (resize, rotate) if first is rotate else (rotate, resize)
+    if names == {"depth", "rotate"}:
+        # Rotation only moves pixels (transpose or nearest) and fills with black, which maps to black.
+        # Dithering depends on where a pixel is (Bayer) or the scan order (Floyd-Steinberg)
+        options = first if first["op"] == "depth" else second
+        return (second, first) if options["dither"] == "none" else None
+    if names == {"depth", "resize"} and policy == "approx":
+        options = first if first["op"] == "depth" else second
+        if options["dither"] == "none" and options["target_depth"] >= depth.DEFAULT_TARGET_DEPTH:
+            return second, first
+    return None
+
+
+def _key(ops: Tuple[Dict[str, Any], ...]) -> Tuple[Tuple[Tuple[str, Any], ...], ...]:
+    return tuple(tuple(sorted(op.items())) for op in ops)
+
+
+def plan(ops: List[Dict[str, Any]], shape: Tuple[int, int, int], policy: str = "safe") -> Dict[str, Any]:
+    """
+    Picks the cheapest order reachable by swapping commuting neighbours.
+    Ties keep the order closest to the spec (the spec itself is costed first).
+    """
+    spec_cost = estimate_plan(ops, shape)
+    best, best_cost = tuple(ops), spec_cost
+    candidates = 1
+    if policy != "off":
+        seen = {_key(best)}
+        queue = [best]
+        while queue:
+            state = queue.pop(0)
+            for i in range(len(state) - 1):
+                swapped = _swap(state[i], state[i + 1], policy)
+                if swapped is None:
+                    continue
+                order = state[:i] + swapped + state[i + 2:]
+                if _key(order) in seen:
+                    continue
+                seen.add(_key(order))
+                queue.append(order)
+                cost = estimate_plan(list(order), shape)
+                if cost < best_cost:
+                    best, best_cost = order, cost
+        candidates = len(seen)
+
+    return {
+        "policy": policy,
+        "spec": [op["op"] for op in ops],
+        "order": [op["op"] for op in best],
+        "ops": list(best),
+        "reordered": _key(best) != _key(tuple(ops)),
+        "candidates": candidates,
+        "spec_estimated_ms": round(spec_cost, 3),
+        "estimated_ms": round(best_cost, 3),
+    }
+
+
+# --- Execution ---
+
+def working_shape(img: Image.Image) -> Tuple[int, int, int]:
+    """
+    (width, height, channels) the ops will see; known from the header, before decoding.
+    """
+    # Colour channels only: alpha is carried along whatever the order, so it isn't costed
+    channels = 1 if img.mode in modes.GREY_MODES or img.mode in depth.HIGH_DEPTH_MODES else 3
+    return img.width, img.height, channels
+
+
+def _apply(img: Image.Image, op: Dict[str, Any]) -> Image.Image:
+    name = op["op"]
+    if name == "greyscale":
+        if img.mode in modes.GREY_MODES or img.mode in depth.HIGH_DEPTH_MODES:
+            return img
+        return img.convert("LA" if img.mode == "RGBA" else "L")
+    if name == "resize":
+        return img.resize((op["width"], op["height"]), Image.Resampling.LANCZOS)
+    if name == "rotate":
+        # Same rotation as Step 4: exact transposes, nearest otherwise
+        return image_engine.rotate(img, op["angle"], "pillow")
+    if name == "depth":
+        # Maps the luma; alpha is put back afterwards (16-bit results have no alpha mode)
+        alpha = img.getchannel("A") if img.mode in KEEP_ALPHA_MODES else None
+        if alpha is not None:
+            img = img.convert("L")
+        if depth.needs_true_depth(img, op):
+            return modes.with_alpha(depth.map_depth(img, op), alpha)
+        return modes.with_alpha(image_engine.color_depth(img, "pillow"), alpha)
+    return img
+
+
+def execute(img: Image.Image, steps: Dict[str, Any]) -> Tuple[Image.Image, Dict[str, Any]]:
+    """
+    Decodes the image and runs the planned ops, timing each against its estimate.
+    """
+    decode_start = time.perf_counter()
+    img.load()
+    # Every op keeps its input mode (alpha included), like Steps 1-5 under preserve_mode
+    if img.mode not in KEEP_MODES and img.mode not in depth.HIGH_DEPTH_MODES:
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    decode_ms = (time.perf_counter() - decode_start) * 1000
+
+    shape = working_shape(img)
+    stats = []
+    measured_ms = 0.0
+    for op in steps["ops"]:
+        estimated_ms, shape = estimate(op, shape)
+        start = time.perf_counter()
+        img = _apply(img, op)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        measured_ms += elapsed_ms
+        stats.append({**op, "size": list(img.size),
+                      "estimated_ms": round(estimated_ms, 3), "measured_ms": round(elapsed_ms, 3)})
+
+    return img, {**steps, "ops": stats,
+                 "measured_ms": round(measured_ms, 3),
+                 "decode_ms": round(decode_ms, 3)}
+
+
+def encode(img: Image.Image, op: Optional[Dict[str, Any]], s3_client: Any) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Encodes the result: to the convert op's format (uploaded when it names a
+    bucket and key), otherwise like Step 3 (JPEG quality 85, PNG for 16-bit).
+    Returns (base64 image, None) or (None, S3 URL).
+    """
+    buffer = io.BytesIO()
+    if op is None:
+        img.save(buffer, **depth.save_options(img))
+        return base64.b64encode(buffer.getvalue()).decode("utf-8"), None
+
+    fmt = op["target_format"]
+    renditions.prepare(img, fmt).save(buffer, format=fmt, **renditions.SAVE_OPTIONS.get(fmt, {}))
+    if not op["bucket_name"]:
+        return base64.b64encode(buffer.getvalue()).decode("utf-8"), None
+
+    buffer.seek(0)
+    s3_client.put_object(Bucket=op["bucket_name"], Key=op["s3_key"], Body=buffer,
+                         ContentType=renditions.CONTENT_TYPES.get(fmt, f"image/{fmt.lower()}"))
+    region = s3_client.meta.region_name or "us-east-1"
+    return None, f"https://{op['bucket_name']}.s3.{region}.amazonaws.com/{op['s3_key']}"
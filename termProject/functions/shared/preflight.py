@@ -0,0 +1,169 @@
+"""
+Header-only pre-flight and routing (`params.preflight`).
+
+Before the full decode, the first base64 chunks are decoded and parsed for the
+header only (format, size, mode, progressive/interlaced). The request is then
+routed:
+
+- "reject": unsupported format, no header, or more than max_pixels. Fails
+  before anything else is decoded.
+- "draft":  large JPEGs decode through libjpeg's reduced paths. Greyscale
+  stages (1, 3) decode luma only, skipping chroma upsampling and colour
+  conversion. Resize (2) uses DCT-domain downscaling to the smallest 1/2, 1/4
+  or 1/8 scale that still covers the target.
+- "tiled":  huge images in pixelwise stages (1, 3) are mapped in row stripes
+  of at most TILE_PIXELS each, bounding the stage's intermediate buffers.
+- "full":   everything else (the handler's normal path).
+
+Draft and tiling can combine ("draft+tiled").
+"""
+import binascii
+import io
+import math
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+from PIL import Image, UnidentifiedImageError
+
+from shared import pyramid
+from shared import streaming
+
+# Formats the pipeline accepts as input
+SUPPORTED_FORMATS = ("JPEG", "MPO", "PNG", "WEBP", "GIF", "BMP", "TIFF")
+
+# Base64 characters in the first probe (doubled until the header parses), and the
+# most header bytes worth probing
+PROBE_CHARS = 1 << 16
+MAX_PROBE_BYTES = 1 << 20
+
+# JPEGs at least this large are decoded in draft mode when the stage allows it
+DRAFT_MIN_PIXELS = 2_000_000
+# Images at least this large are tiled in pixelwise stages, TILE_PIXELS per stripe
+TILE_MIN_PIXELS = 16_000_000
+TILE_PIXELS = 4_000_000
+
+GREYSCALE_STAGES = (1, 3)
+PIXELWISE_STAGES = (1, 3)
+RESIZE_STAGE = 2
+FORMAT_STAGE = 5
+
+
+def _decode_prefix(data: Union[str, bytes], chars: int) -> bytes:
+    # Only the prefix is sliced and scanned, never the whole payload
+    prefix = data[:chars]
+    if isinstance(prefix, bytes):
+        prefix = prefix.decode("ascii", "ignore")
+    if prefix.startswith("data:"):
+        prefix = prefix.split(",", 1)[-1]
+    prefix = "".join(prefix.split())
+    return binascii.a2b_base64(prefix[:len(prefix) // 4 * 4])
+
+
+def read_header(data: Union[str, bytes]) -> Tuple[Image.Image, int]:
+    """
+    Decodes just enough of the payload for Image.open to parse the header.
+    Returns the lazily opened image (no pixel data) and the bytes decoded.
+    """
+    chars = PROBE_CHARS
+    while True:
+        probe = _decode_prefix(data, chars)
+        try:
+            with io.BytesIO(probe) as fp:
+                return Image.open(fp), len(probe)
+        except (OSError, EOFError):
+            if chars >= len(data) or len(probe) >= MAX_PROBE_BYTES:
+                break
+            chars *= 2
+    raise UnidentifiedImageError(
+        f"No supported image header in the first {len(probe)} bytes of the payload.")
+
+
+def _draft_request(header: Image.Image, stage: int, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    width, height = header.size
+    if header.format != "JPEG" or width * height < DRAFT_MIN_PIXELS:
+        return None
+    if stage in GREYSCALE_STAGES and header.mode == "RGB":
+        return {"mode": "L", "size": None}
+    if stage == RESIZE_STAGE:
+        # A pyramid is drafted for its largest level
+        sizes = pyramid.parse_sizes(params)
+        target = sizes[0] if sizes else (int(params.get("width", 800)), int(params.get("height", 600)))
+        if target[0] > 0 and target[1] > 0 and min(width // target[0], height // target[1]) >= 2:
+            return {"mode": header.mode, "size": list(target)}
+    return None
+
+
+def plan(data: Union[str, bytes], params: Dict[str, Any], stage: int) -> Dict[str, Any]:
+    """
+    Reads the header and decides the route. Raises ValueError for rejected inputs
+    (the handlers' usual error path), so nothing else is decoded.
+    """
+    start = time.perf_counter()
+    header, header_bytes = read_header(data)
+    width, height = header.size
+    info = header.info
+
+    result: Dict[str, Any] = {
+        "format": header.format,
+        "size": [width, height],
+        "mode": header.mode,
+        "progressive": bool(info.get("progressive") or info.get("progression") or info.get("interlace")),
+        "header_bytes": header_bytes,
+        "route": "full",
+        "reason": None,
+        "draft": None,
+        "tiles": None,
+    }
+
+    max_pixels = streaming.parse_limits(params)["max_pixels"]
+    if header.format not in SUPPORTED_FORMATS:
+        result.update(route="reject", reason=f"unsupported format {header.format}")
+    elif max_pixels is not None and width * height > max_pixels:
+        result.update(route="reject", reason=f"{width * height} px above max_pixels={max_pixels}")
+    elif stage == FORMAT_STAGE:
+        # A single format, or a list of them (multi-format output)
+        requested = params.get("target_format") or "PNG"
+        if not isinstance(requested, (list, tuple)):
+            requested = [requested]
+        Image.init()
+        unknown = []
+        for target_format in requested:
+            target_format = str(target_format).strip().upper()
+            target_format = {"JPG": "JPEG", "TIF": "TIFF"}.get(target_format, target_format)
+            if target_format not in Image.SAVE:
+                unknown.append(target_format)
+        if unknown:
+            result.update(route="reject", reason=f"cannot encode target_format {', '.join(unknown)}")
+
+    if result["route"] == "reject":
+        result["preflight_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        raise ValueError(f"Pre-flight rejected the input: {result['reason']}.")
+
+    routes = []
+    result["draft"] = _draft_request(header, stage, params)
+    if result["draft"]:
+        routes.append("draft")
+    if stage in PIXELWISE_STAGES and width * height >= TILE_MIN_PIXELS:
+        result["tiles"] = math.ceil(width * height / TILE_PIXELS)
+        routes.append("tiled")
+    if routes:
+        result["route"] = "+".join(routes)
+        result["reason"] = f"{result['format']} {width}x{height}"
+
+    result["preflight_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+def apply_draft(img: Image.Image, preflight_plan: Optional[Dict[str, Any]]) -> Image.Image:
+    """
+    Configures the lazily opened image for the planned draft decode (before load()).
+    """
+    draft = preflight_plan and preflight_plan.get("draft")
+    if draft and img.format == "JPEG":
+        size = tuple(draft["size"]) if draft["size"] else None
+        img.draft(draft["mode"], size)
+    return img
+
+
+def tile_count(preflight_plan: Optional[Dict[str, Any]]) -> Optional[int]:
+    return preflight_plan.get("tiles") if preflight_plan else None
@@ -0,0 +1,201 @@
+"""
+In-handler profiling (`params.profile`).
+
+`profiled` wraps a `lambda_handler`. When the request asks for it, the
+handler runs under one of two profilers and the response gains a `profile`
+field:
+
+- "sample" (or `true`): a daemon thread wakes every `profile_interval_ms`
+  and records the handler thread's Python stack from `sys._current_frames()`.
+  Nothing is hooked into the interpreter, so the handler runs at full speed
+  between samples. Time spent in C code (Pillow, NumPy) is attributed to the
+  Python frame that called it. Only the handler's own thread is sampled;
+  stripe and rendition pool workers show up as the caller waiting on them.
+- "cprofile": deterministic `cProfile` tracing, for when exact call counts
+  matter more than overhead (every Python call pays for the hook).
+
+Both report the top frames by self time. The sampler also returns collapsed
+stacks ("outer;inner;leaf" -> samples), the input format of flamegraph.pl and
+speedscope, which the benchmark runner merges across runs into .folded files.
+"""
+import cProfile
+import functools
+import json
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PROFILERS = ("sample", "cprofile")
+DEFAULT_TOP = 20
+DEFAULT_INTERVAL_MS = 2.0
+MIN_INTERVAL_MS = 0.5
+# Most frequent collapsed stacks kept in the response (they are the bulk of its size)
+MAX_STACKS = 500
+
+
+def parse_profile(params: Dict[str, Any]) -> Optional[str]:
+    profile = params.get("profile")
+    if profile is None or profile is False:
+        return None
+    if profile is True:
+        return "sample"
+    if profile not in PROFILERS:
+        raise ValueError(f"profile must be one of {', '.join(PROFILERS)} or true, got {profile!r}.")
+    return profile
+
+
+def _event_params(event: Any) -> Dict[str, Any]:
+    """
+    params of a direct invocation or of an API Gateway body (string or dict).
+    """
+    if not isinstance(event, dict):
+        return {}
+    payload = event
+    if "body" in event:
+        payload = event["body"]
+        if isinstance(payload, str):
+            try:
+                payload = json.loads(payload)
+            except ValueError:
+                return {}
+    params = payload.get("params") if isinstance(payload, dict) else None
+    return params if isinstance(params, dict) else {}
+
+
+def _label(code: CodeType) -> str:
+    # co_qualname is Python 3.11+; older runtimes label frames by plain function name
+    return f"{Path(code.co_filename).stem}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class _Sampler(threading.Thread):
+    """
+    Samples one thread's stack, from `root` (the handler) down, until stopped.
+    """
+
+    def __init__(self, thread_id: int, root: CodeType, interval_s: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.root = root
+        self.interval_s = interval_s
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval_s):
+            frame: Optional[FrameType] = sys._current_frames().get(self.thread_id)
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_label(frame.f_code))
+                if frame.f_code is self.root:
+                    break
+                frame = frame.f_back
+            else:
+                # Not inside the handler yet (or any more)
+                continue
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _sample_report(sampler: _Sampler, interval_ms: float, top: int) -> Dict[str, Any]:
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    for stack, count in sampler.stacks.items():
+        frames = stack.split(";")
+        self_counts[frames[-1]] += count
+        for frame in set(frames):
+            total_counts[frame] += count
+
+    samples = sampler.samples or 1
+    return {
+        "profiler": "sample",
+        "interval_ms": interval_ms,
+        "samples": sampler.samples,
+        "top": [{
+            "frame": frame,
+            "self": count,
+            "total": total_counts[frame],
+            "self_pct": round(100.0 * count / samples, 1),
+            "total_pct": round(100.0 * total_counts[frame] / samples, 1),
+        } for frame, count in self_counts.most_common(top)],
+        "stacks": dict(sampler.stacks.most_common(MAX_STACKS)),
+    }
+
+
+def _cprofile_report(profile: cProfile.Profile, top: int) -> Dict[str, Any]:
+    stats = pstats.Stats(profile).stats
+    # (file, line, name) -> (primitive calls, calls, self s, cumulative s, callers)
+    rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+    return {
+        "profiler": "cprofile",
+        "interval_ms": None,
+        "samples": None,
+        "top": [{
+            "frame": name if file == "~" else f"{Path(file).stem}.{name}",
+            "calls": calls,
+            "self_ms": round(self_s * 1000, 3),
+            "total_ms": round(total_s * 1000, 3),
+        } for (file, _, name), (_, calls, self_s, total_s, _) in rows],
+        "stacks": None,
+    }
+
+
+def profiled(handler: Optional[Callable] = None, *, output_keys: Tuple[str, ...] = ("image",)) -> Callable:
+    """
+    Decorator for a lambda_handler. Adds `profile` to the response: None unless
+    `params.profile` asks for a profiler. An invalid `profile` value is reported
+    the way the handler reports any bad parameter, with its output field(s)
+    (`output_keys`: "image", or "s3_url" for Function 5) set to None:
+
+        @profiler.profiled(output_keys=("s3_url",))
+    """
+    if handler is None:
+        return functools.partial(profiled, output_keys=output_keys)
+    root = handler.__code__
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        params = _event_params(event)
+        try:
+            mode = parse_profile(params)
+            top = int(params.get("profile_top", DEFAULT_TOP))
+            interval_ms = max(float(params.get("profile_interval_ms", DEFAULT_INTERVAL_MS)), MIN_INTERVAL_MS)
+        except (TypeError, ValueError) as e:
+            return {"success": False, **dict.fromkeys(output_keys), "execution_time_ms": 0.0,
+                    "profile": None, "error": str(e)}
+
+        if mode is None:
+            response = handler(event, context)
+            report = None
+        elif mode == "cprofile":
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            response = profile.runcall(handler, event, context)
+            wall_ms = (time.perf_counter() - start) * 1000
+            report = {**_cprofile_report(profile, top), "wall_ms": round(wall_ms, 2)}
+        else:
+            sampler = _Sampler(threading.get_ident(), root, interval_ms / 1000)
+            sampler.start()
+            start = time.perf_counter()
+            try:
+                response = handler(event, context)
+            finally:
+                wall_ms = (time.perf_counter() - start) * 1000
+                sampler.stop()
+            report = {**_sample_report(sampler, interval_ms, top), "wall_ms": round(wall_ms, 2)}
+
+        if isinstance(response, dict):
+            response["profile"] = report
+        return response
+
+    return wrapper
+
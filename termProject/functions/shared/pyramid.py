@@ -0,0 +1,98 @@
+"""
+Multi-resolution pyramid for Function 2 (`params.sizes`).
+
+The input is decoded once and the sizes are built in a cascade, largest
+first. Each level is derived from the previous (already smaller) level
+rather than from the full-resolution source: an integer `reduce()` (box
+filter over whole blocks, no weights to compute) brings it close to the
+target, and a LANCZOS `resize` covers the remaining fractional step. So
+every level after the first reads only a fraction of the source pixels.
+"""
+import base64
+import io
+import time
+from typing import Any, Dict, List, Tuple
+
+from PIL import Image
+
+from shared import buffers
+from shared import modes
+
+MAX_LEVELS = 8
+
+# reduce() only when the level is at least this many times smaller; LANCZOS
+# then has at least this much margin left, which keeps the result sharp
+REDUCE_MARGIN = 2
+
+
+def parse_sizes(params: Dict[str, Any]) -> List[Tuple[int, int]]:
+    """
+    Validates params.sizes ([[w, h], ...]). Returns them largest first, without
+    duplicates; an empty list when no pyramid was requested.
+    """
+    sizes = params.get("sizes")
+    if not sizes:
+        return []
+    if not isinstance(sizes, (list, tuple)) or len(sizes) > MAX_LEVELS:
+        raise ValueError(f"sizes must be a list of up to {MAX_LEVELS} [width, height] pairs.")
+
+    levels = []
+    for size in sizes:
+        width, height = (int(value) for value in size)
+        if width <= 0 or height <= 0:
+            raise ValueError(f"sizes entries must be positive, got {width}x{height}.")
+        levels.append((width, height))
+    return sorted(set(levels), key=lambda size: size[0] * size[1], reverse=True)
+
+
+def _next_level(src: Image.Image, size: Tuple[int, int]) -> Tuple[Image.Image, int]:
+    factor = min(src.width // size[0], src.height // size[1]) // REDUCE_MARGIN
+    if factor >= 2:
+        src = src.reduce(factor)
+    else:
+        factor = 1
+    if src.size != size:
+        src = src.resize(size, Image.Resampling.LANCZOS)
+    return src, factor
+
+
+def render(img: Image.Image, sizes: List[Tuple[int, int]],
+           zero_copy: bool = False, preserve_mode: bool = False) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Builds and JPEG-encodes every level (quality 85, like the single-size path);
+    LA input (kept under preserve_mode) is encoded as PNG. Returns the base64 images, largest first, and per-level stats.
+    """
+    start = time.perf_counter()
+    keep = img.mode in ("L", "RGB") or modes.keeps(img, preserve_mode)
+    level = img if keep else img.convert("RGB")
+    images: List[str] = []
+    stats: List[Dict[str, Any]] = []
+    for index, size in enumerate(sizes):
+        level_start = time.perf_counter()
+        source_size = level.size
+        level, factor = _next_level(level, size)
+        resize_ms = (time.perf_counter() - level_start) * 1000
+
+        encode_start = time.perf_counter()
+        buffer = buffers.get_buffer(f"output_{index}") if zero_copy else io.BytesIO()
+        level.save(buffer, **modes.save_options(level, quality=85))
+        size_bytes = buffer.tell()
+        if zero_copy:
+            images.append(buffers.encode_b64(buffer))
+        else:
+            images.append(base64.b64encode(buffer.getvalue()).decode("utf-8"))
+
+        stats.append({
+            "size": list(size),
+            "source_size": list(source_size),
+            "reduce": factor,
+            "bytes": size_bytes,
+            "resize_ms": round(resize_ms, 2),
+            "encode_ms": round((time.perf_counter() - encode_start) * 1000, 2),
+        })
+
+    return images, {
+        "mode": level.mode,
+        "levels": stats,
+        "total_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
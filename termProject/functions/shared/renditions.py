@@ -0,0 +1,155 @@
+"""
+Multi-format output for Function 5 (`target_format` as a list).
+
+The input is decoded once. Every rendition is encoded on a thread pool and
+uploaded as soon as its own encode finishes, so uploads overlap the encodes
+still running. boto3 clients are thread-safe and keep one urllib3 connection
+pool (10 connections by default), so the concurrent PUTs share warm
+connections. Rendition keys swap the extension of `s3_key`.
+"""
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from shared import buffers
+from shared import dedup
+from shared import stripes
+
+FORMAT_ALIASES = {"JPG": "JPEG", "TIF": "TIFF"}
+EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "GIF": ".gif", "BMP": ".bmp", "TIFF": ".tiff"}
+CONTENT_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp", "GIF": "image/gif",
+                 "BMP": "image/bmp", "TIFF": "image/tiff"}
+# Encoder settings per format (anything else uses Pillow's defaults)
+SAVE_OPTIONS = {"JPEG": {"quality": 85}, "WEBP": {"quality": 80}}
+
+MAX_FORMATS = 8
+
+# Module-level pool, reused across warm invocations
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor(workers: int) -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None or _executor._max_workers < workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rendition")
+    return _executor
+
+
+def normalize_format(name: Any) -> str:
+    name = str(name or "").strip().upper()
+    return FORMAT_ALIASES.get(name, name)
+
+
+def parse_formats(target_format: Any) -> Optional[List[str]]:
+    """
+    Returns the requested formats when target_format is a list, None for a single format.
+    """
+    if not isinstance(target_format, (list, tuple)):
+        return None
+    # Duplicates would upload to the same key twice
+    formats = list(dict.fromkeys(normalize_format(fmt) for fmt in target_format))
+    if not formats or len(formats) > MAX_FORMATS:
+        raise ValueError(f"target_format list must have 1 to {MAX_FORMATS} formats, got {len(formats)}.")
+    Image.init()
+    unknown = [fmt for fmt in formats if fmt not in Image.SAVE]
+    if unknown:
+        raise ValueError(f"Cannot encode target_format {unknown}.")
+    return formats
+
+
+def rendition_key(s3_key: str, fmt: str) -> str:
+    """
+    s3_key with its extension replaced by the format's ("output/test.png" -> "output/test.webp").
+    """
+    name = s3_key.rsplit("/", 1)[-1]
+    stem = s3_key[:len(s3_key) - len(name)] + (name.rsplit(".", 1)[0] if "." in name else name)
+    return stem + EXTENSIONS.get(fmt, "." + fmt.lower())
+
+
+def prepare(img: Image.Image, fmt: str) -> Image.Image:
+    """
+    A separate Image object in a mode the format can store. Pillow's save() keeps
+    per-call state on the image, so threads never save the same object.
+    """
+    if fmt == "JPEG" and (img.mode in ("RGBA", "LA", "P") or "transparency" in img.info):
+        # Flatten onto white so transparent areas don't turn black
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.split()[-1])
+        return background
+    if fmt == "JPEG" and img.mode not in ("L", "RGB", "CMYK"):
+        return img.convert("RGB")
+    if img.mode == "CMYK" and fmt not in ("JPEG", "TIFF"):
+        return img.convert("RGB")
+    # save() sets encoderinfo/encoderconfig on the Image it is called on, so each
+    # concurrent encode needs its own object; copy() is the public way to get one
+    return img.copy()
+
+
+def _encode(img: Image.Image, fmt: str, parallel: bool,
+            zero_copy: bool) -> Tuple[Any, int, float, Optional[Dict[str, Any]]]:
+    start = time.perf_counter()
+    out = prepare(img, fmt)
+    # One reusable buffer per format, so concurrent encodes never share storage
+    buffer = buffers.get_buffer(f"output_{fmt.lower()}") if zero_copy else io.BytesIO()
+    encode_stats = stripes.save(out, buffer, parallel, format=fmt, **SAVE_OPTIONS.get(fmt, {}))
+    size = buffer.tell()
+    buffer.seek(0)
+    return buffer, size, (time.perf_counter() - start) * 1000, encode_stats
+
+
+def _upload(s3_client: Any, bucket: str, key: str, body: Any, fmt: str,
+            dedup_options: Optional[Dict[str, Any]]) -> Tuple[str, float, Optional[Dict[str, Any]]]:
+    start = time.perf_counter()
+    content_type = CONTENT_TYPES.get(fmt, f"image/{fmt.lower()}")
+    dedup_stats = None
+    if dedup_options:
+        key, dedup_stats = dedup.upload(s3_client, bucket, key, body, content_type, dedup_options)
+    else:
+        s3_client.put_object(Bucket=bucket, Key=key, Body=body, ContentType=content_type)
+    return key, (time.perf_counter() - start) * 1000, dedup_stats
+
+
+def encode_and_upload(img: Image.Image, formats: List[str], s3_client: Any, bucket: str, s3_key: str,
+                      parallel: bool = False, zero_copy: bool = False,
+                      dedup_options: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """
+    Encodes every format concurrently and uploads each one as soon as it is ready.
+    Returns the uploaded key per format and per-format timings.
+    """
+    # Decode once up front; lazy loads from several threads would race
+    img.load()
+    start = time.perf_counter()
+    executor = _get_executor(2 * len(formats))
+
+    encodes = {executor.submit(_encode, img, fmt, parallel, zero_copy): fmt for fmt in formats}
+    uploads = {}
+    renditions: Dict[str, Dict[str, Any]] = {}
+    for future in as_completed(encodes):
+        fmt = encodes[future]
+        buffer, size, encode_ms, encode_stats = future.result()
+        renditions[fmt] = {"bytes": size,
+                           "encode_ms": round(encode_ms, 2),
+                           "parallel": encode_stats}
+        uploads[fmt] = executor.submit(_upload, s3_client, bucket, rendition_key(s3_key, fmt),
+                                       buffer, fmt, dedup_options)
+
+    keys: Dict[str, str] = {}
+    serial_ms = 0.0
+    for fmt in formats:
+        keys[fmt], upload_ms, dedup_stats = uploads[fmt].result()
+        renditions[fmt].update(key=keys[fmt], upload_ms=round(upload_ms, 2), dedup=dedup_stats)
+        serial_ms += renditions[fmt]["encode_ms"] + upload_ms
+
+    return keys, {
+        "formats": formats,
+        "wall_ms": round((time.perf_counter() - start) * 1000, 2),
+        # What the same encodes and uploads take back to back
+        "serial_ms": round(serial_ms, 2),
+        "renditions": {fmt: renditions[fmt] for fmt in formats},
+    }
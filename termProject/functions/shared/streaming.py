@@ -0,0 +1,175 @@
+"""
+Streaming base64 -> image decoding (`params.stream`).
+
+Base64 is decoded chunk by chunk and each chunk goes straight to the image
+parser, so the header (and the image size) is known after the first chunk.
+Oversized inputs are rejected before the rest of the payload is decoded.
+Baseline/progressive JPEG is decoded incrementally as the chunks arrive.
+Other formats (PNG's chunked IDAT stream, multi-tile TIFF) can't be fed to a
+raw decoder, so once their header is validated the remaining chunks are
+collected in the reusable input buffer and decoded in one pass.
+"""
+import io
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+from PIL import Image, UnidentifiedImageError
+
+from shared import buffers
+
+# Formats whose single tile can be fed to Pillow's decoder as bytes arrive.
+# JpegImageFile.load_read only pads truncated files, so the raw decoder is safe here
+# (ImageFile.Parser refuses any plugin with load_read and would buffer everything).
+INCREMENTAL_FORMATS = ("JPEG",)
+
+
+def parse_limits(params: Dict[str, Any]) -> Dict[str, Optional[int]]:
+    """
+    Validates max_pixels / max_bytes. max_pixels defaults to Pillow's decompression-bomb limit.
+    """
+    max_pixels = params.get("max_pixels", Image.MAX_IMAGE_PIXELS)
+    max_bytes = params.get("max_bytes")
+    limits = {
+        "max_pixels": int(max_pixels) if max_pixels is not None else None,
+        "max_bytes": int(max_bytes) if max_bytes is not None else None,
+    }
+    for name, value in limits.items():
+        if value is not None and value <= 0:
+            raise ValueError(f"{name} must be positive, got {value}.")
+    return limits
+
+
+class StreamDecoder:
+    """
+    Feed/close consumer like ImageFile.Parser, minus the full-payload accumulation.
+    """
+
+    def __init__(self, max_pixels: Optional[int] = None, buffer_name: str = "input",
+                 draft: Optional[Dict[str, Any]] = None) -> None:
+        self.max_pixels = max_pixels
+        self.draft = draft
+        self.buffer_name = buffer_name
+        self.image: Optional[Image.Image] = None
+        self.decoder = None
+        self.buffer: Optional[buffers.ByteBuffer] = None
+        self.pending = b""
+        self.offset = 0
+        self.finished = False
+        self.fed_bytes = 0
+        self.header_bytes = 0
+
+    def feed(self, data: bytes) -> None:
+        self.fed_bytes += len(data)
+        if self.finished:
+            return
+        if self.buffer is not None:
+            self.buffer.write(data)
+            return
+
+        self.pending = self.pending + data if self.pending else data
+        if self.image is None:
+            self._open_header()
+            if self.image is None:
+                return
+        if self.decoder is not None:
+            self._decode()
+
+    def _open_header(self) -> None:
+        try:
+            with io.BytesIO(self.pending) as fp:
+                img = Image.open(fp)
+        except (OSError, EOFError):
+            return  # header not complete yet
+
+        self.header_bytes = self.fed_bytes
+        width, height = img.size
+        if self.max_pixels is not None and width * height > self.max_pixels:
+            raise ValueError(f"Image is {width}x{height} ({width * height} px), "
+                             f"above max_pixels={self.max_pixels}.")
+
+        if self.draft and img.format == "JPEG":
+            # Reduced decode planned by the pre-flight (see shared/preflight.py)
+            img.draft(self.draft["mode"], tuple(self.draft["size"]) if self.draft["size"] else None)
+
+        if img.format in INCREMENTAL_FORMATS and len(img.tile) == 1:
+            img.load_prepare()
+            decoder_name, extents, self.offset, args = img.tile[0]
+            img.tile = []
+            # Same private hook ImageFile.Parser uses to drive a decoder by hand
+            self.decoder = Image._getdecoder(img.mode, decoder_name, args, img.decoderconfig)
+            self.decoder.setimage(img.im, extents)
+        else:
+            self.buffer = buffers.get_buffer(self.buffer_name)
+            self.buffer.write(self.pending)
+            self.pending = b""
+        self.image = img
+
+    def _decode(self) -> None:
+        if self.offset:
+            skip = min(len(self.pending), self.offset)
+            self.pending = self.pending[skip:]
+            self.offset -= skip
+            if self.offset or not self.pending:
+                return
+
+        consumed, error = self.decoder.decode(self.pending)
+        if consumed < 0:
+            self.pending = b""
+            self.finished = True
+            if error < 0:
+                raise OSError(f"Image decoding failed (error {error}).")
+            return
+        self.pending = self.pending[consumed:]
+
+    def close(self) -> Image.Image:
+        if self.image is None:
+            raise UnidentifiedImageError("Decoded data is not a valid image or unsupported image format.")
+
+        if self.decoder is not None:
+            if not self.finished:
+                # Flush what the decoder is still holding
+                self._decode()
+            self.decoder = None
+            if not self.finished:
+                raise OSError("Image data is truncated.")
+            return self.image
+
+        self.buffer.seek(0)
+        img = Image.open(self.buffer)
+        img.load()
+        self.image = img
+        return img
+
+
+def open_b64(data: Union[str, bytes], params: Dict[str, Any],
+             preflight_plan: Optional[Dict[str, Any]] = None) -> Tuple[Image.Image, Dict[str, Any]]:
+    """
+    Decodes a base64 payload straight into a loaded image, honouring a pre-flight draft.
+    Returns the image and stats (header offset/time, incremental or buffered).
+    """
+    limits = parse_limits(params)
+    start = time.perf_counter()
+
+    size_bound = buffers.decoded_size(data)
+    if limits["max_bytes"] is not None and size_bound > limits["max_bytes"]:
+        # Rejected from the base64 length alone, before anything is decoded
+        raise ValueError(f"Payload decodes to ~{size_bound} bytes, above max_bytes={limits['max_bytes']}.")
+
+    draft = preflight_plan.get("draft") if preflight_plan else None
+    stream = StreamDecoder(max_pixels=limits["max_pixels"], draft=draft)
+    header_ms = None
+    for chunk in buffers.iter_b64_chunks(data):
+        stream.feed(chunk)
+        if header_ms is None and stream.image is not None:
+            header_ms = (time.perf_counter() - start) * 1000
+    incremental = stream.decoder is not None
+    img = stream.close()
+
+    return img, {
+        "incremental": incremental,
+        "size": list(img.size),
+        "header_bytes": stream.header_bytes,
+        "decoded_bytes": stream.fed_bytes,
+        "header_ms": round(header_ms or 0.0, 3),
+        "total_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
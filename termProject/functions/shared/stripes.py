@@ -0,0 +1,215 @@
+"""
+Horizontal stripe parallelism for pixelwise stages and the PNG encoder.
+
+Lambda allocates more than one vCPU above ~1.8 GB of memory. Pillow's C
+operations, NumPy kernels and zlib all release the GIL, so a thread pool
+sized to os.cpu_count() runs stripes truly in parallel. Pixel results are
+identical to the single-threaded path because every stripe is processed
+by the same pixelwise function.
+"""
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional in the Lambda layer
+    np = None
+
+# Stripe heights are multiples of this (JPEG MCU rows / 8x8 dither tiles stay aligned)
+STRIPE_ALIGN = 16
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# mode -> (bit depth, PNG color type)
+PNG_MODES = {"L": (8, 0), "LA": (8, 4), "RGB": (8, 2), "RGBA": (8, 6), "I;16": (16, 0)}
+
+# save() options the stripe encoder honours; anything else goes to Pillow
+PARALLEL_PNG_OPTIONS = {"format", "compress_level"}
+
+# Module-level pool, reused across warm invocations
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def worker_count() -> int:
+    return os.cpu_count() or 1
+
+
+def _get_executor(workers: int) -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None or _executor._max_workers != workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stripe")
+    return _executor
+
+
+def stripe_bounds(height: int, stripes: int) -> List[Tuple[int, int]]:
+    rows = -(-height // stripes)
+    rows = -(-rows // STRIPE_ALIGN) * STRIPE_ALIGN
+    return [(top, min(top + rows, height)) for top in range(0, height, rows)]
+
+
+def _timed(fn: Callable, *args: Any) -> Tuple[Any, float]:
+    # Thread CPU time, so stripes preempted on a single vCPU don't inflate the speedup
+    start = time.thread_time()
+    result = fn(*args)
+    return result, (time.thread_time() - start) * 1000
+
+
+def _run(tasks: List[Tuple[Callable, tuple]], workers: int) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Runs the tasks on the shared pool and reports wall time vs summed stripe CPU time.
+    The ratio is the speedup over running the same stripes back to back.
+    """
+    start = time.perf_counter()
+    if workers > 1 and len(tasks) > 1:
+        futures = [_get_executor(workers).submit(_timed, fn, *args) for fn, args in tasks]
+        outcomes = [f.result() for f in futures]
+    else:
+        outcomes = [_timed(fn, *args) for fn, args in tasks]
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    work_ms = sum(ms for _, ms in outcomes)
+    stats = {
+        "threads": workers,
+        "stripes": len(tasks),
+        "wall_ms": round(wall_ms, 2),
+        "work_ms": round(work_ms, 2),
+        "speedup": round(work_ms / wall_ms, 2) if wall_ms > 0 else 1.0,
+    }
+    return [result for result, _ in outcomes], stats
+
+
+def map_stripes(img: Image.Image, fn: Callable[[Image.Image], Image.Image],
+                workers: Optional[int] = None,
+                stripes: Optional[int] = None) -> Tuple[Image.Image, Dict[str, Any]]:
+    """
+    Applies a pixelwise fn to horizontal stripes in parallel and reassembles the image.
+    `stripes` asks for at least that many stripes (memory-bounded tiling); with
+    workers=1 they run one after another.
+    """
+    workers = workers or worker_count()
+    bounds = stripe_bounds(img.height, max(workers, stripes or 0))
+    width = img.width
+    # Decode once up front; lazy loads from several threads would race
+    img.load()
+
+    def process(top: int, bottom: int) -> Image.Image:
+        return fn(img.crop((0, top, width, bottom)))
+
+    results, stats = _run([(process, bounds_pair) for bounds_pair in bounds], workers)
+    if len(results) == 1:
+        return results[0], stats
+
+    out = Image.new(results[0].mode, (results[0].width, img.height))
+    for (top, _), part in zip(bounds, results):
+        out.paste(part, (0, top))
+    return out, stats
+
+
+# --- Parallel PNG encoder ---
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + \
+        struct.pack(">I", zlib.crc32(data, zlib.crc32(tag)))
+
+
+def _filtered_rows(arr: "np.ndarray", top: int, bottom: int) -> bytes:
+    """
+    PNG 'Up' filter (type 2) for rows [top, bottom); depends only on raw pixels,
+    so every stripe can be filtered independently.
+    """
+    rows = arr[top:bottom].reshape(bottom - top, -1)
+    if top > 0:
+        prev = arr[top - 1:bottom - 1].reshape(bottom - top, -1)
+    else:
+        # The first row is filtered against zeros (also covers a 1-row image)
+        prev = np.zeros_like(rows)
+        prev[1:] = rows[:-1]
+    filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    filtered[:, 0] = 2
+    np.subtract(rows, prev, out=filtered[:, 1:], casting="unsafe")
+    return filtered.tobytes()
+
+
+def _deflate_stripe(arr: "np.ndarray", top: int, bottom: int,
+                    level: int, last: bool) -> Tuple[bytes, int, int]:
+    raw = _filtered_rows(arr, top, bottom)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    body = compressor.compress(raw) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return body, zlib.adler32(raw), len(raw)
+
+
+def _adler32_combine(adler1: int, adler2: int, len2: int) -> int:
+    # Port of zlib's adler32_combine (not exposed by Python's zlib module)
+    base = 65521
+    rem = len2 % base
+    sum1 = adler1 & 0xFFFF
+    sum2 = (rem * sum1) % base
+    sum1 += (adler2 & 0xFFFF) + base - 1
+    sum2 += ((adler1 >> 16) & 0xFFFF) + ((adler2 >> 16) & 0xFFFF) + base - rem
+    if sum1 >= base:
+        sum1 -= base
+    if sum1 >= base:
+        sum1 -= base
+    if sum2 >= base << 1:
+        sum2 -= base << 1
+    if sum2 >= base:
+        sum2 -= base
+    return sum1 | (sum2 << 16)
+
+
+def encode_png(img: Image.Image, level: int = 6,
+               workers: Optional[int] = None) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Encodes a PNG whose IDAT is built from independently deflated stripes
+    (sync-flushed raw deflate blocks, pigz-style). Decodes to the same pixels
+    as Pillow's encoder; the byte stream itself differs.
+    """
+    if np is None or img.mode not in PNG_MODES:
+        raise ValueError(f"Parallel PNG encoding does not support mode {img.mode}.")
+
+    workers = workers or worker_count()
+    bit_depth, color_type = PNG_MODES[img.mode]
+    arr = np.asarray(img)
+    if img.mode == "I;16":
+        arr = arr.astype(">u2").view(np.uint8).reshape(img.height, -1)
+
+    bounds = stripe_bounds(img.height, workers)
+    tasks = [(_deflate_stripe, (arr, top, bottom, level, i == len(bounds) - 1))
+             for i, (top, bottom) in enumerate(bounds)]
+    parts, stats = _run(tasks, workers)
+
+    adler = 1
+    for _, part_adler, length in parts:
+        adler = _adler32_combine(adler, part_adler, length)
+    idat = b"\x78\x9c" + b"".join(body for body, _, _ in parts) + struct.pack(">I", adler)
+
+    ihdr = struct.pack(">IIBBBBB", img.width, img.height, bit_depth, color_type, 0, 0, 0)
+    data = PNG_SIGNATURE + _png_chunk(b"IHDR", ihdr) + _png_chunk(b"IDAT", idat) + \
+        _png_chunk(b"IEND", b"")
+    return data, stats
+
+
+def save(img: Image.Image, fp: Any, parallel: bool, **options: Any) -> Optional[Dict[str, Any]]:
+    """
+    Drop-in for img.save(fp, **options): PNG output is encoded in parallel stripes when
+    requested and supported. The file decodes to the same pixels as Pillow's, but the
+    bytes differ (fixed Up filter, stripe-wise deflate). Options the stripe encoder
+    can't honour (optimize, PNG metadata) and JPEG, whose entropy coding is sequential,
+    use Pillow. Returns the encoder stats, or None when Pillow's encoder was used.
+    """
+    fmt = str(options.get("format", "")).upper()
+    if (parallel and fmt == "PNG" and np is not None and img.mode in PNG_MODES
+            and set(options) <= PARALLEL_PNG_OPTIONS):
+        level = options.get("compress_level", 6)
+        data, stats = encode_png(img, level=level)
+        fp.write(data)
+        return stats
+    img.save(fp, **options)
+    return None
@@ -5,14 +5,24 @@ import time
 import argparse
 import csv
 import statistics
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+import composite
+import fixtures
+import sampling
+import steady_state
+
 # === Configuration Area ===
 # Default configuration, can be overridden by command line arguments
 # TODO: Teammates should update this default value with the actual bucket name
 DEFAULT_BUCKET = ""
 REGION = "us-east-2"
+# Bands per PIL mode, for the per-stage channel count
+MODE_CHANNELS = {"1": 1, "L": 1, "P": 1, "I;16": 1, "I": 1, "F": 1,
+                 "LA": 2, "RGB": 3, "YCbCr": 3, "RGBA": 4, "CMYK": 4}
 
 # Initialize Boto3
 lambda_client = boto3.client('lambda', region_name=REGION)
@@ -27,21 +37,46 @@ def encode_image(image_path):
     return base64.b64encode(path.read_bytes()).decode('utf-8')
 
 
+def transfer_rate(request_bytes, response_bytes, round_trip_ms, logic_ms):
+    """
+    Effective payload rate in MB/s: both payloads over the part of the round
+    trip the function did not spend on its own logic. A lower bound, since that
+    gap also holds the fixed invoke overhead.
+    """
+    gap_ms = round_trip_ms - logic_ms
+    if gap_ms <= 0:
+        return None
+    return (request_bytes + response_bytes) / 1e6 / (gap_ms / 1000)
+
+
 def invoke_function(func_name, payload):
     """
-    Invoke Lambda and return detailed performance metrics
+    Invoke Lambda and return detailed performance metrics.
+
+    The round trip covers the invoke call and reading the response body; the
+    client's own JSON encode and decode are timed separately around it.
     """
+    metrics = {"request_bytes": 0, "response_bytes": 0, "serialize_ms": 0, "parse_ms": 0, "transfer_mbps": None}
     try:
+        serialize_start = time.perf_counter()
+        request_body = json.dumps(payload).encode('utf-8')
+        metrics["serialize_ms"] = (time.perf_counter() - serialize_start) * 1000
+        metrics["request_bytes"] = len(request_body)
+
         start_time = time.time()
         response = lambda_client.invoke(
             FunctionName=func_name,
             InvocationType='RequestResponse',
-            Payload=json.dumps(payload)
+            Payload=request_body
         )
+        response_body = response['Payload'].read()
         end_time = time.time()
+        metrics["response_bytes"] = len(response_body)
 
         # Parse response
-        response_payload = json.loads(response['Payload'].read())
+        parse_start = time.perf_counter()
+        response_payload = json.loads(response_body)
+        metrics["parse_ms"] = (time.perf_counter() - parse_start) * 1000
         round_trip_latency = (end_time - start_time) * 1000
 
         if not response_payload.get("success"):
@@ -49,16 +84,22 @@ def invoke_function(func_name, payload):
                 "success": False,
                 "error": response_payload.get("error", "Unknown Error"),
                 "latency": round_trip_latency,
-                "logic_time": 0
+                "logic_time": 0,
+                "payload": response_payload,
+                **metrics
             }
 
+        logic_time = response_payload.get("execution_time_ms", 0)
+        metrics["transfer_mbps"] = transfer_rate(
+            metrics["request_bytes"], metrics["response_bytes"], round_trip_latency, logic_time)
         return {
             "success": True,
             "error": None,
             "latency": round_trip_latency,  # Client-side latency
             # Server-side logic time
-            "logic_time": response_payload.get("execution_time_ms", 0),
-            "payload": response_payload  # Return full data to extract output image or url
+            "logic_time": logic_time,
+            "payload": response_payload,  # Return full data to extract output image or url
+            **metrics
         }
 
     except Exception as e:
@@ -66,103 +107,361 @@ def invoke_function(func_name, payload):
             "success": False,
             "error": str(e),
             "latency": 0,
-            "logic_time": 0
+            "logic_time": 0,
+            **metrics
         }
 
 
-def run_benchmark(args):
-    print(
-        f"\n🚀 Starting Benchmark for Model: [{args.model.upper()}] | Arch: [{args.arch.upper()}]")
-    print(f"🔄 Runs: {args.runs} | Warmup: {args.warmup} | Mode: {args.mode}")
+def transfer_columns(result):
+    """
+    Payload size and client-side JSON columns of one invocation's CSV row.
+    """
+    return {
+        'Request_Bytes': result['request_bytes'],
+        'Response_Bytes': result['response_bytes'],
+        'Serialize_ms': result['serialize_ms'],
+        'Parse_ms': result['parse_ms'],
+        'Transfer_MBps': result['transfer_mbps'],
+    }
+
+
+def container_columns(result):
+    """
+    Container identity columns: which execution environment served the request,
+    its invocation count, whether this was its first (cold) request, and the
+    memory it was configured with.
+    """
+    container = result.get('payload', {}).get('container') or {}
+    return {
+        'Container_ID': container.get('id'),
+        'Invocation': container.get('invocation'),
+        'Cold': container.get('cold'),
+        'Memory_MB': container.get('memory_mb'),
+    }
+
+
+def new_profile():
+    return {"stacks": Counter(), "self": Counter(), "weight": 0.0}
+
+
+def merge_profile(merged, report):
+    """
+    Adds one response's params.profile report to the merged profile. Sampled
+    frames are weighted by samples, cProfile frames by self time (ms).
+    """
+    if not report:
+        return
+    merged["stacks"].update(report.get("stacks") or {})
+    sampled = report["profiler"] == "sample"
+    merged["weight"] += report["samples"] if sampled else report["wall_ms"]
+    for frame in report["top"]:
+        merged["self"][frame["frame"]] += frame["self"] if sampled else frame["self_ms"]
+
+
+def write_folded(path, merged):
+    """
+    Collapsed stacks, one "frame;frame;frame count" line each (flamegraph.pl / speedscope input).
+    """
+    if not merged["stacks"]:
+        return None
+    lines = [f"{stack} {count}" for stack, count in sorted(merged["stacks"].items())]
+    Path(path).write_text("\n".join(lines) + "\n")
+    return path
+
+
+def print_profile(name, merged, top=5):
+    if not merged["self"] or not merged["weight"]:
+        return
+    print(f"\n🔥 {name} hottest frames (self time, merged across runs):")
+    for frame, weight in merged["self"].most_common(top):
+        print(f"   {100.0 * weight / merged['weight']:5.1f}%  {frame}")
+
+
+def end_warmup(writer, warmup_rows, detectors, step_labels, workload, warmup_runs):
+    """
+    Ends an auto warmup after `warmup_runs` runs: writes the held-back warmup
+    rows (Run_IDs shifted to end at 0) and one STEADY row per step with its
+    detected warmup length. Returns that length per step for the report.
+    """
+    for row in warmup_rows:
+        writer.writerow({**row, 'Run_ID': row['Run_ID'] - warmup_runs})
+    steady = {}
+    for step_id, detector in detectors.items():
+        reason = steady_state.STOP_STEADY if detector.steady else steady_state.STOP_CAP
+        detector.force()
+        steady[step_id] = {"warmup": detector.warmup, "reason": reason, "latency": detector.steady_mean()}
+        if step_id not in step_labels:
+            continue
+        step_label, f_name = step_labels[step_id]
+        writer.writerow({
+            'Run_ID': detector.warmup,
+            'Type': steady_state.STEADY_ROW_TYPE,
+            'Step': step_label,
+            'Function_Name': f_name,
+            **workload,
+            'Round_Trip_ms': steady[step_id]["latency"],
+            'Stop_Reason': reason
+        })
+    return steady
+
+
+def resolve_stages(args):
+    """
+    (model, arch) per step: --model/--arch, overridden by --auto-stages picks,
+    overridden by --stages. Also returns the auto picks for the report.
+    """
+    stage_map = composite.parse_stages([], args.model, args.arch)
+    picks = {}
+    if args.auto_stages:
+        auto_map, picks = composite.auto_stages(
+            Path(args.auto_stages), args.objective, args.workload or Path(args.image).stem)
+        stage_map.update(auto_map)
+    stage_map.update(composite.parse_stages(args.stages or [], None, args.arch))
+    missing = [step for step in composite.STEPS if step not in stage_map]
+    if missing:
+        raise ValueError(f"No model for step(s) {missing}: give --model or map them with --stages")
+    return stage_map, picks
 
-    # Construct function name prefix (Naming convention: gpt_func1-x86, gemini_func1-arm, etc.)
+
+def run_benchmark(args):
+    # Construct function names (Naming convention: gpt_func1-x86, gemini_func1-arm, etc.)
     # Note: Assumes teammates also follow the {model}_func{N}-{arch} naming convention
-    func_prefix = f"{args.model}_func"
+    stage_map, picks = resolve_stages(args)
+    # A composite runs some step on another model or arch; its rows are labelled --composite-name / mixed
+    is_composite = any(stage != (args.model, args.arch) for stage in stage_map.values())
+    model_label = args.composite_name if is_composite else args.model
+    arch_label = composite.arch_label(stage_map) if is_composite else args.arch
+
+    if not args.quiet:
+        print(
+            f"\n🚀 Starting Benchmark for Model: [{model_label.upper()}] | Arch: [{arch_label.upper()}]")
+        if is_composite:
+            print(f"🧬 Stages: {composite.describe(stage_map)}")
+            for step_id, pick in picks.items():
+                print(f"   auto step {step_id}: {pick['model']}@{pick['arch']} {pick['logic_ms']:.2f} ms "
+                      f"over {pick['samples']} runs ({args.objective})")
+        print(f"🔄 Runs: {args.runs} | Warmup: {args.warmup} | Mode: {args.mode} | Engine: {args.engine or 'default'}")
 
     original_image = encode_image(args.image)
 
-    # Prepare CSV file
+    # Optional image engine for steps 1-4 (omitted = each handler's own implementation)
+    engine_params = {"engine": args.engine} if args.engine else {}
+    # Stripe parallelism for steps 1, 3 and 5 (only pays off with >1 vCPU, i.e. >1769 MB)
+    parallel_params = {"parallel": True} if args.parallel else {}
+    # Copy-free payload I/O for every step
+    io_params = {"zero_copy": True} if args.zero_copy else {}
+    if args.stream:
+        io_params["stream"] = True
+    if args.preflight:
+        io_params["preflight"] = True
+    if args.passthrough:
+        io_params["passthrough"] = True
+    # Keep step 1's L/LA output single-channel through every later step
+    if args.preserve_mode:
+        io_params["preserve_mode"] = True
+    # Resize pyramid for step 2 (the largest level is passed down the pipeline)
+    sizes_params = {"sizes": [[int(v) for v in size.lower().split("x")] for size in args.sizes]} if args.sizes else {}
+    # Step 2 rotates in its resize pass; step 4 then has nothing left to do and passes the image through
+    rotate_params = {"rotate": 90} if args.fuse else {}
+    step4_angle = 0 if args.fuse else 90
+    fuse_params = {"passthrough": True} if args.fuse else {}
+    # Content-addressed upload for step 5 (the per-run s3_key becomes a server-side copy)
+    dedup_params = {"dedup": "head", "alias": True} if args.dedup else {}
+    # In-handler profiler for every step; reports are merged per function below
+    profile_params = {"profile": args.profile, "profile_top": args.profile_top} if args.profile else {}
+    io_params.update(profile_params)
+
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    csv_filename = f"results_{args.model}_{args.arch}_{timestamp}.csv"
+
+    # Define steps (run i only changes step 5's S3 key)
+    def pipeline_steps(i):
+        return [
+            {"id": 1, "name": "Greyscale", "params": {
+                **engine_params, **parallel_params, **io_params}},
+            {"id": 2, "name": "Resize",    "params": {
+                "width": 800, "height": 600, **sizes_params, **rotate_params, **engine_params, **io_params}},
+            {"id": 3, "name": "ColorDepth", "params": {
+                "target_depth": args.target_depth, "dither": args.dither,
+                **engine_params, **parallel_params, **io_params}},
+            {"id": 4, "name": "Rotate",    "params": {
+                "angle": step4_angle, **engine_params, **io_params, **fuse_params}},
+            {"id": 5, "name": "Upload",    "params": {
+                # One rendition per format when --formats is given
+                "target_format": args.formats or "PNG",
+                "bucket_name": args.bucket,
+                "s3_key": f"output/{model_label}_{arch_label}_{timestamp}_{i}.png",
+                **parallel_params,
+                **io_params,
+                **dedup_params
+            }}
+        ]
+
+    def function_name(step_id):
+        model, arch = stage_map[step_id]
+        return f"{model}_func{step_id}-{arch}"
+
+    # Standalone stages on their real inputs (cached per image, model and params) instead of the original
+    stage_inputs = None
+    if args.fixtures:
+        stage_inputs = fixtures.load_or_build(
+            invoke_function, function_name, composite.describe(stage_map) if is_composite else args.model,
+            args.image, original_image, pipeline_steps(0),
+            Path(args.fixture_dir), args.rebuild_fixtures)
+        if not args.quiet:
+            print("🧩 Stage inputs: " + ", ".join(
+                f"step {step_id} <- {fixture['source']}" for step_id, fixture in stage_inputs.items()))
+    # Standalone stages do not depend on each other: optionally invoke all five at once
+    stage_pool = ThreadPoolExecutor(max_workers=5) if args.concurrent_stages else None
+
+    # Prepare CSV file
+    workload_tag = f"_{args.workload}" if args.workload else ""
+    csv_filename = args.output or f"results_{model_label}_{arch_label}{workload_tag}_{timestamp}.csv"
+    # Workload metadata written into every row, so a CSV never depends on its name or run order
+    workload = {
+        'Model': model_label,
+        'Architecture': arch_label,
+        'Workload_Type': args.workload or Path(args.image).stem,
+        'Image': Path(args.image).name,
+    }
 
     # CSV Header
-    fieldnames = ['Run_ID', 'Type', 'Step', 'Function_Name',
-                  'Logic_Time_ms', 'Round_Trip_ms', 'Success', 'Error']
+    fieldnames = ['Run_ID', 'Type', 'Step', 'Function_Name', 'Model', 'Architecture', 'Workload_Type', 'Image',
+                  'Logic_Time_ms', 'Round_Trip_ms', 'Request_Bytes', 'Response_Bytes', 'Serialize_ms', 'Parse_ms',
+                  'Transfer_MBps', 'Container_ID', 'Invocation', 'Cold', 'Memory_MB',
+                  'Success', 'Passthrough', 'Mode', 'Channels', 'Error',
+                  'CI_Stat', 'CI_Low', 'CI_High', 'CI_Rel_Width', 'Stop_Reason']
 
     # Store data for final statistics
     stats_data = {
         "pipeline_total": [],
-        "steps": {1: [], 2: [], 3: [], 4: [], 5: []}
+        "steps": {1: [], 2: [], 3: [], 4: [], 5: []},
+        # Benchmark requests served by a fresh container
+        "cold": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
+        # No-op requests answered with the input bytes (params.passthrough)
+        "passthrough": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
+        # Output channels per step (from the response's image mode)
+        "channels": {1: [], 2: [], 3: [], 4: [], 5: []},
+        # Step 5 upload bytes skipped by params.dedup
+        "dedup_skipped_bytes": 0,
+        # Per-invocation payload sizes and client JSON times
+        "transfer": {1: [], 2: [], 3: [], 4: [], 5: []},
+        # params.profile reports merged across runs
+        "profiles": {1: new_profile(), 2: new_profile(), 3: new_profile(), 4: new_profile(), 5: new_profile()},
+        # Sequential sampling (--ci-target): stop reason and final CI per step
+        "ci": None,
+        # --warmup auto: detected warmup length per step
+        "steady": None
     }
+    # Step label and function name per step id, for the CI rows
+    step_labels = {}
 
     # Using standard open() for CSV writing is fine, but we could also use Path(csv_filename).open(...)
     with open(csv_filename, mode='w', newline='') as csv_file:
         writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
         writer.writeheader()
 
-        total_iterations = args.warmup + args.runs
+        # --warmup auto: warm up until every step's latency is steady (at most --max-warmup runs)
+        auto_warmup = args.warmup == "auto"
+        detectors = {step_id: steady_state.SteadyStateDetector(args.steady_window) for step_id in range(1, 6)}
+        # Warmup runs, once known; auto warmup rows are held back until then so their Run_IDs can end at 0
+        warmup_runs = None if auto_warmup else args.warmup
+        warmup_rows = []
+        total_iterations = (args.max_warmup if auto_warmup else args.warmup) + args.runs
 
         for i in range(1, total_iterations + 1):
-            is_warmup = i <= args.warmup
+            is_warmup = warmup_runs is None or i <= warmup_runs
             run_type = "WARMUP" if is_warmup else "BENCHMARK"
             run_display_id = f"{i}/{total_iterations}"
+            # Warmup runs are <= 0; --run-offset continues the numbering of an earlier batch
+            if is_warmup:
+                run_id = i if auto_warmup else i - args.warmup
+            else:
+                run_id = args.run_offset + i - warmup_runs
+            write_row = warmup_rows.append if auto_warmup and is_warmup else writer.writerow
 
-            print(f"Running {run_type} [{run_display_id}]...", end='\r')
+            if not args.quiet:
+                print(f"Running {run_type} [{run_display_id}]...", end='\r')
 
             # Initialize state
             current_image = original_image
+            # Mode of current_image; unknown for the source until a step reports it
+            current_mode = None
             run_failed = False
             step_metrics = {}
             pipeline_start_time = time.time()
 
-            # Define steps
-            steps = [
-                {"id": 1, "name": "Greyscale", "params": {}},
-                {"id": 2, "name": "Resize",    "params": {
-                    "width": 800, "height": 600}},
-                {"id": 3, "name": "ColorDepth", "params": {"target_depth": 8}},
-                {"id": 4, "name": "Rotate",    "params": {"angle": 90}},
-                {"id": 5, "name": "Upload",    "params": {
-                    "target_format": "PNG",
-                    "bucket_name": args.bucket,
-                    "s3_key": f"output/{args.model}_{args.arch}_{timestamp}_{i}.png"
-                }}
-            ]
+            steps = pipeline_steps(i)
+
+            def stage_input(step_id):
+                return stage_inputs[step_id]['image'] if stage_inputs else original_image
+
+            # --concurrent-stages: every standalone input is known up front
+            prefetched = {}
+            if stage_pool:
+                prefetched = dict(zip([step['id'] for step in steps], stage_pool.map(
+                    lambda step: invoke_function(
+                        function_name(step['id']), {"image": stage_input(step['id']), "params": step['params']}),
+                    steps)))
 
             for step in steps:
-                f_name = f"{func_prefix}{step['id']}-{args.arch}"
+                f_name = function_name(step['id'])
+                step_labels[step['id']] = (f"Step {step['id']} ({step['name']})", f_name)
 
                 # Mode logic
-                payload_image = current_image if args.mode == 'pipeline' else original_image
+                payload_image = current_image if args.mode == 'pipeline' else stage_input(step['id'])
 
-                result = invoke_function(
+                result = prefetched.get(step['id']) or invoke_function(
                     f_name, {"image": payload_image, "params": step['params']})
-
-                # Record data (Write to CSV)
-                if not is_warmup:
-                    writer.writerow({
-                        'Run_ID': i - args.warmup,
-                        'Type': run_type,
-                        'Step': f"Step {step['id']} ({step['name']})",
-                        'Function_Name': f_name,
-                        'Logic_Time_ms': result['logic_time'],
-                        'Round_Trip_ms': result['latency'],
-                        'Success': result['success'],
-                        'Error': result['error']
-                    })
+                passthrough = bool(result.get('payload', {}).get('passthrough'))
+                # A pass-through step reports no mode: its output is its input
+                mode = result.get('payload', {}).get('mode')
+                if mode is None and args.mode == 'pipeline':
+                    mode = current_mode
+                channels = MODE_CHANNELS.get(mode)
+
+                # Record data (Write to CSV); warmup rows too, since that is where most cold starts are
+                write_row({
+                    'Run_ID': run_id,
+                    'Type': run_type,
+                    'Step': f"Step {step['id']} ({step['name']})",
+                    'Function_Name': f_name,
+                    **workload,
+                    'Logic_Time_ms': result['logic_time'],
+                    'Round_Trip_ms': result['latency'],
+                    **transfer_columns(result),
+                    **container_columns(result),
+                    'Success': result['success'],
+                    'Passthrough': passthrough,
+                    'Mode': mode,
+                    'Channels': channels,
+                    'Error': result['error']
+                })
 
                 if not result['success']:
                     run_failed = True
                     break  # Pipeline broken
 
+                if auto_warmup and is_warmup:
+                    detectors[step['id']].add(result['latency'])
+
                 # Collect statistics (Non-Warmup only)
                 if not is_warmup:
                     stats_data['steps'][step['id']].append(
                         result['logic_time'])
+                    stats_data['passthrough'][step['id']] += passthrough
+                    stats_data['cold'][step['id']] += bool(result['payload'].get('container', {}).get('cold'))
+                    if channels:
+                        stats_data['channels'][step['id']].append(channels)
+                    dedup_stats = result['payload'].get('dedup') or {}
+                    stats_data['dedup_skipped_bytes'] += dedup_stats.get('skipped_bytes', 0)
+                    merge_profile(stats_data['profiles'][step['id']], result['payload'].get('profile'))
+                    stats_data['transfer'][step['id']].append(
+                        {key: value for key, value in result.items() if key != 'payload'})
 
                 # Pass data to the next step
                 if args.mode == 'pipeline' and result['payload'].get('image'):
                     current_image = result['payload']['image']
+                    current_mode = mode
 
             # Record Pipeline Total Time (Client Side)
             if not run_failed and not is_warmup and args.mode == 'pipeline':
@@ -171,19 +470,232 @@ def run_benchmark(args):
                 stats_data['pipeline_total'].append(total_pipeline_time)
                 # Write a summary row
                 writer.writerow({
-                    'Run_ID': i - args.warmup,
+                    'Run_ID': run_id,
                     'Type': 'SUMMARY',
                     'Step': 'Pipeline_Total',
                     'Function_Name': 'ALL',
+                    **workload,
                     # Simply accumulate logic time
                     'Logic_Time_ms': sum(stats_data['steps'][s][-1] for s in range(1, 6)),
                     'Round_Trip_ms': total_pipeline_time,
+                    'Request_Bytes': None,
+                    'Response_Bytes': None,
+                    'Serialize_ms': None,
+                    'Parse_ms': None,
+                    'Transfer_MBps': None,
+                    'Container_ID': None,
+                    'Invocation': None,
+                    'Cold': None,
+                    'Memory_MB': None,
                     'Success': True,
+                    'Passthrough': None,
+                    'Mode': None,
+                    'Channels': None,
                     'Error': None
                 })
 
+            # Steady-state detection: the warmup ends once every step is steady
+            if auto_warmup and warmup_runs is None:
+                if all(detector.steady for detector in detectors.values()) or i == args.max_warmup:
+                    warmup_runs = i
+                    stats_data['steady'] = end_warmup(writer, warmup_rows, detectors, step_labels, workload, i)
+
+            # Sequential sampling: stop as soon as every step's CI is within --ci-target
+            if args.ci_target and not is_warmup and i - warmup_runs >= args.min_runs:
+                converged, _ = sampling.check(
+                    stats_data['steps'], args.ci_stat, args.ci_method, args.ci_level, args.ci_target)
+                if converged:
+                    break
+            if not is_warmup and i - warmup_runs >= args.runs:
+                break
+
+        if args.ci_target:
+            converged, intervals = sampling.check(
+                stats_data['steps'], args.ci_stat, args.ci_method, args.ci_level, args.ci_target)
+            reason = sampling.STOP_CI if converged else sampling.STOP_CAP
+            stats_data['ci'] = {"reason": reason, "intervals": intervals}
+            # One CI row per step: runs taken, the estimate and its final CI
+            for step_id, (step_label, f_name) in step_labels.items():
+                ci = intervals.get(step_id)
+                writer.writerow({
+                    'Run_ID': args.run_offset + len(stats_data['steps'][step_id]),
+                    'Type': sampling.CI_ROW_TYPE,
+                    'Step': step_label,
+                    'Function_Name': f_name,
+                    **workload,
+                    'Logic_Time_ms': ci['estimate'] if ci else None,
+                    **sampling.summary_columns(ci, args.ci_stat, args.ci_method, args.ci_level, reason)
+                })
+
+    if stage_pool:
+        stage_pool.shutdown()
+    for step_id, merged in stats_data['profiles'].items():
+        # One flamegraph input per function and architecture
+        folded = write_folded(f"profile_{function_name(step_id)}_{timestamp}.folded", merged)
+        if folded and not args.quiet:
+            print(f"🔥 Step {step_id} collapsed stacks: {folded}")
+    if not args.quiet:
+        print(f"\n\n✅ Benchmark Complete. Data saved to: {csv_filename}")
+        print_statistics(stats_data, args.mode)
+    return csv_filename
+
+
+def run_ladder_benchmark(args):
+    """
+    Sweeps the five stages across the rungs of an image_ladder.py ladder, one
+    standalone benchmark per rung (every stage gets the rung image), and
+    reports input pixels per second of logic time per stage for this variant
+    and architecture. Rungs whose request would exceed the invoke payload
+    limit are skipped.
+    """
+    ladder_path = Path(args.ladder)
+    rungs = json.loads(ladder_path.read_text())["rungs"]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    print(f"\n🪜 Ladder sweep: {len(rungs)} rungs from {ladder_path} | Runs: {args.runs} | Warmup: {args.warmup}")
+
+    rows = []
+    for rung in rungs:
+        if not rung["invocable"]:
+            print(f"   ⏭️  {rung['tag']}: {rung['bytes'] / 1e6:.1f} MB is over the invoke payload limit, skipped")
+            continue
+        # ladder.json paths are relative to where the generator ran; fall back to the ladder's own directory
+        image = Path(rung["path"]) if Path(rung["path"]).exists() else ladder_path.parent / Path(rung["path"]).name
+        rung_args = argparse.Namespace(**{**vars(args), "image": str(image), "workload": rung["tag"],
+                                          "output": None, "quiet": True})
+        csv_filename = run_benchmark(rung_args)
+
+        times = {}
+        with open(csv_filename, newline='') as csv_file:
+            for row in csv.DictReader(csv_file):
+                if row['Type'] == 'BENCHMARK' and row['Success'] == 'True':
+                    times.setdefault((row['Step'], row['Function_Name'], row['Model'], row['Architecture']),
+                                     []).append(float(row['Logic_Time_ms']))
+        for (step, f_name, model, arch), values in sorted(times.items()):
+            logic_ms = statistics.mean(values)
+            rows.append({
+                'Model': model,
+                'Architecture': arch,
+                'Rung': rung["tag"],
+                'Megapixels': rung["megapixels"],
+                'Pixels': rung["pixels"],
+                'Complexity': rung["complexity"],
+                'Bytes': rung["bytes"],
+                'Step': step,
+                'Function_Name': f_name,
+                'Runs': len(values),
+                'Logic_Time_ms': logic_ms,
+                'Pixels_per_s': rung["pixels"] / (logic_ms / 1000) if logic_ms > 0 else None,
+            })
+        print(f"   ✅ {rung['tag']} ({rung['width']}x{rung['height']}) -> {csv_filename}")
+
+    if not rows:
+        print("   No rung could be benchmarked.")
+        return
+    summary_filename = f"ladder_{rows[0]['Model']}_{rows[0]['Architecture']}_{timestamp}.csv"
+    with open(summary_filename, mode='w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print("\n" + "="*50)
+    print("📈 LADDER THROUGHPUT (input megapixels / s of logic time)")
+    print("="*50)
+    steps = sorted({row['Step'] for row in rows})
+    print(f"{'Rung':<12} | {'MP':<6} | " + " | ".join(f"{step.split(' (')[0]:<8}" for step in steps))
+    for tag in dict.fromkeys(row['Rung'] for row in rows):
+        rung_rows = {row['Step']: row for row in rows if row['Rung'] == tag}
+        cells = [f"{rung_rows[step]['Pixels_per_s'] / 1e6:<8.2f}" if rung_rows.get(step, {}).get('Pixels_per_s')
+                 else f"{'-':<8}" for step in steps]
+        print(f"{tag:<12} | {next(iter(rung_rows.values()))['Megapixels']:<6g} | " + " | ".join(cells))
+    print(f"\n✅ Ladder summary saved to: {summary_filename}")
+
+
+def run_spec_benchmark(args):
+    """
+    Runs a declarative pipeline spec (JSON list of ops) on the generic handler:
+    one invocation of pipeline_func-<arch> per run, ops ordered by its planner.
+    """
+    spec = json.loads(Path(args.spec).read_text())
+    f_name = f"pipeline_func-{args.arch}"
+    print(f"\n🚀 Starting Spec Benchmark: [{args.spec}] | Arch: [{args.arch.upper()}] | Reorder: {args.reorder}")
+    print(f"🔄 Runs: {args.runs} | Warmup: {args.warmup}")
+
+    original_image = encode_image(args.image)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_filename = f"results_pipeline_{args.arch}_{timestamp}.csv"
+    fieldnames = ['Run_ID', 'Type', 'Step', 'Function_Name', 'Logic_Time_ms', 'Round_Trip_ms',
+                  'Request_Bytes', 'Response_Bytes', 'Serialize_ms', 'Parse_ms', 'Transfer_MBps',
+                  'Container_ID', 'Invocation', 'Cold', 'Memory_MB', 'Order', 'Estimated_ms', 'Measured_ms', 'Success', 'Error']
+
+    logic_times, round_trips, estimates, measurements = [], [], [], []
+    order = None
+    profile = new_profile()
+    params = {"reorder": args.reorder}
+    if args.profile:
+        params.update(profile=args.profile, profile_top=args.profile_top)
+    with open(csv_filename, mode='w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        writer.writeheader()
+
+        total_iterations = args.warmup + args.runs
+        for i in range(1, total_iterations + 1):
+            is_warmup = i <= args.warmup
+            run_type = "WARMUP" if is_warmup else "BENCHMARK"
+            print(f"Running {run_type} [{i}/{total_iterations}]...", end='\r')
+
+            # A convert op with "upload": true goes to --bucket under a per-run key
+            ops = []
+            for op in spec:
+                op = dict(op)
+                if op.get("op") == "convert" and op.pop("upload", False):
+                    ext = str(op.get("target_format", "PNG")).lower()
+                    op.update(bucket_name=args.bucket, s3_key=f"output/pipeline_{args.arch}_{timestamp}_{i}.{ext}")
+                ops.append(op)
+
+            result = invoke_function(
+                f_name, {"image": original_image, "pipeline": ops, "params": params})
+            plan = result.get('payload', {}).get('plan') or {}
+
+            writer.writerow({
+                'Run_ID': i - args.warmup,
+                'Type': run_type,
+                'Step': 'Pipeline_Spec',
+                'Function_Name': f_name,
+                'Logic_Time_ms': result['logic_time'],
+                'Round_Trip_ms': result['latency'],
+                **transfer_columns(result),
+                **container_columns(result),
+                'Order': ' > '.join(plan.get('order', [])),
+                'Estimated_ms': plan.get('estimated_ms'),
+                'Measured_ms': plan.get('measured_ms'),
+                'Success': result['success'],
+                'Error': result['error']
+            })
+            if result['success'] and not is_warmup:
+                logic_times.append(result['logic_time'])
+                round_trips.append(result['latency'])
+                estimates.append(plan['estimated_ms'])
+                measurements.append(plan['measured_ms'])
+                order = plan['order']
+                merge_profile(profile, result['payload'].get('profile'))
+
     print(f"\n\n✅ Benchmark Complete. Data saved to: {csv_filename}")
-    print_statistics(stats_data, args.mode)
+    folded = write_folded(f"profile_{f_name}_{timestamp}.folded", profile)
+    if folded:
+        print(f"🔥 Collapsed stacks: {folded}")
+    print("\n" + "="*50)
+    print("📊 SPEC PERFORMANCE REPORT")
+    print("="*50)
+    if not logic_times:
+        print("   No successful runs.")
+    else:
+        print(f"   Planned order: {' > '.join(order)}")
+        print(f"   Logic time: {statistics.mean(logic_times):.2f} ms | "
+              f"Round trip: {statistics.mean(round_trips):.2f} ms")
+        print(f"   Ops estimated: {statistics.mean(estimates):.2f} ms | "
+              f"measured: {statistics.mean(measurements):.2f} ms")
+    print_profile(f_name, profile)
+    print("="*50)
 
 
 def print_statistics(data, mode):
@@ -209,20 +721,71 @@ def print_statistics(data, mode):
 
     # 2. Per Function Stats (Logic Time)
     print(f"\n⚡ Per-Function Logic Execution Time (Server-side):")
-    print(f"{'Step':<20} | {'Avg (ms)':<10} | {'StdDev':<10} | {'CV':<10}")
-    print("-" * 60)
+    print(f"{'Step':<20} | {'Avg (ms)':<10} | {'StdDev':<10} | {'CV':<10} | {'Passthrough':<11} | {'Cold':<6} | {'Channels':<8}")
+    print("-" * 94)
 
     for step_id in range(1, 6):
         values = data['steps'][step_id]
         if values:
             mean, sd, cv = calc_stats(values)
             step_name = f"Step {step_id}"
-            print(f"{step_name:<20} | {mean:<10.2f} | {sd:<10.2f} | {cv:<10.4f}")
+            passthrough = f"{data['passthrough'][step_id]}/{len(values)}"
+            channels = data['channels'][step_id]
+            channels = f"{statistics.mean(channels):g}" if channels else "-"
+            cold = f"{data['cold'][step_id]}/{len(values)}"
+            print(f"{step_name:<20} | {mean:<10.2f} | {sd:<10.2f} | {cv:<10.4f} | {passthrough:<11} | {cold:<6} | "
+                  f"{channels:<8}")
+
+    # 3. Payload transfer (what the round trip spends outside the handler)
+    if any(data['transfer'].values()):
+        print(f"\n📦 Payload Transfer (Client-side):")
+        print(f"{'Step':<20} | {'Req (MB)':<9} | {'Resp (MB)':<9} | {'Gap (ms)':<9} | {'MB/s':<8} | {'JSON (ms)':<9}")
+        print("-" * 80)
+        for step_id in range(1, 6):
+            results = data['transfer'][step_id]
+            if not results:
+                continue
+            request_mb = statistics.mean(r['request_bytes'] for r in results) / 1e6
+            response_mb = statistics.mean(r['response_bytes'] for r in results) / 1e6
+            gap = statistics.mean(r['latency'] - r['logic_time'] for r in results)
+            rates = [r['transfer_mbps'] for r in results if r['transfer_mbps']]
+            rate = f"{statistics.mean(rates):.2f}" if rates else "-"
+            json_ms = statistics.mean(r['serialize_ms'] + r['parse_ms'] for r in results)
+            print(f"{'Step ' + str(step_id):<20} | {request_mb:<9.3f} | {response_mb:<9.3f} | {gap:<9.2f} | "
+                  f"{rate:<8} | {json_ms:<9.2f}")
+
+    if data['steady']:
+        print(f"\n🌡️  Detected warmup (round trip steady after N runs):")
+        for step_id, steady in data['steady'].items():
+            latency = f"{steady['latency']:.2f} ms" if steady['latency'] is not None else "-"
+            print(f"   Step {step_id}: {steady['warmup']} runs, steady at {latency} ({steady['reason']})")
+
+    if data['ci']:
+        print(f"\n🎯 Sequential sampling stopped: {data['ci']['reason']}")
+        for step_id, ci in data['ci']['intervals'].items():
+            if ci:
+                print(f"   Step {step_id}: {ci['estimate']:.2f} ms [{ci['low']:.2f}, {ci['high']:.2f}] "
+                      f"(±{ci['rel_half_width']:.1%}) over {len(data['steps'][step_id])} runs")
+
+    for step_id in range(1, 6):
+        print_profile(f"Step {step_id}", data['profiles'][step_id])
+
+    if data['dedup_skipped_bytes']:
+        print(f"\n📦 Upload dedup skipped {data['dedup_skipped_bytes'] / 1e6:.2f} MB of Step 5 PUTs")
 
     print("="*50)
 
 
-if __name__ == "__main__":
+def warmup_count(value):
+    if value == "auto":
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a run count or 'auto', got {value!r}")
+
+
+def build_parser():
     parser = argparse.ArgumentParser(description="TCSS 562 Benchmark Runner")
 
     # Core arguments
@@ -231,19 +794,137 @@ if __name__ == "__main__":
                         help="S3 Bucket name")
 
     # Experiment variable arguments
-    parser.add_argument("--model", required=True, choices=[
-                        'gpt', 'gemini', 'deepseek'], default='gpt', help="Model name (used for function prefix)")
+    parser.add_argument("--model", choices=[
+                        'gpt', 'gemini', 'deepseek'], default=None, help="Model name (used for function prefix)")
     parser.add_argument(
         "--arch", choices=['x86', 'arm'], default='x86', help="Architecture")
     parser.add_argument(
         "--mode", choices=['pipeline', 'standalone'], default='standalone', help="Execution mode")
+    parser.add_argument(
+        "--target-depth", type=int, default=8, help="Output bit depth for step 3 (1-16)")
+    parser.add_argument(
+        "--dither", choices=['none', 'ordered', 'floyd-steinberg'], default='none', help="Dithering for step 3")
+    parser.add_argument(
+        "--parallel", action="store_true", help="Request stripe parallelism (steps 1, 3, 5)")
+    parser.add_argument(
+        "--zero-copy", action="store_true", help="Request copy-free payload I/O (all steps)")
+    parser.add_argument(
+        "--stream", action="store_true", help="Request streaming base64 -> image decoding (all steps)")
+    parser.add_argument(
+        "--preflight", action="store_true", help="Request header-only pre-flight routing (all steps)")
+    parser.add_argument(
+        "--passthrough", action="store_true", help="Return no-op requests untouched (steps 1, 2, 4, 5)")
+    parser.add_argument(
+        "--preserve-mode", action="store_true", help="Keep greyscale L/LA images single-channel in every step")
+    parser.add_argument(
+        "--dedup", action="store_true", help="Content-addressed step 5 upload; run keys become aliases")
+    parser.add_argument(
+        "--sizes", nargs="+", default=None, help="Step 2 pyramid sizes in one invocation, e.g. 800x600 320x240")
+    parser.add_argument(
+        "--fuse", action="store_true", help="Rotate in step 2's resize pass; step 4 passes the image through")
+    parser.add_argument(
+        "--formats", nargs="+", default=None, help="Step 5 renditions in one invocation, e.g. PNG WEBP JPEG")
+    parser.add_argument(
+        "--spec", default=None, help="JSON pipeline spec for the generic handler (replaces the five steps)")
+    parser.add_argument(
+        "--reorder", choices=['safe', 'approx', 'off'], default='safe', help="Planner policy for --spec")
+    parser.add_argument(
+        "--profile", choices=['sample', 'cprofile'], default=None,
+        help="Profile every handler; stacks are merged into one .folded file per function")
+    parser.add_argument(
+        "--profile-top", type=int, default=20, help="Frames per profile report")
+    parser.add_argument(
+        "--ladder", default=None,
+        help="ladder.json from image_ladder.py: benchmark every stage on every rung (standalone)")
+    parser.add_argument(
+        "--stages", nargs="+", default=None,
+        help="Per-step model/arch overrides for a composite pipeline, e.g. 3=gemini@x86 5=gpt@arm")
+    parser.add_argument(
+        "--auto-stages", default=None,
+        help="Pick each step's fastest/cheapest model and arch from earlier runner CSVs (file or directory)")
+    parser.add_argument(
+        "--objective", choices=composite.OBJECTIVES, default="time", help="What --auto-stages minimises")
+    parser.add_argument(
+        "--composite-name", default="composite",
+        help="Model label of a composite pipeline's rows and CSV name (letters and digits)")
+    parser.add_argument(
+        "--fixtures", action="store_true",
+        help="Standalone: give each stage its real pipeline input, cached on disk (see fixtures.py)")
+    parser.add_argument(
+        "--fixture-dir", default=str(fixtures.FIXTURE_DIR), help="Fixture cache directory")
+    parser.add_argument(
+        "--rebuild-fixtures", action="store_true", help="Rebuild the fixtures even if cached")
+    parser.add_argument(
+        "--concurrent-stages", action="store_true",
+        help="Standalone: invoke the five stages of a run at once (they share the client's uplink)")
+    parser.add_argument(
+        "--engine", choices=['pillow', 'numpy'], default=None, help="Image engine for steps 1-4 (default: handler's own code)")
 
     # Statistics arguments
     parser.add_argument("--runs", type=int, default=10,
-                        help="Number of benchmark runs (excluding warmup)")
-    parser.add_argument("--warmup", type=int, default=2,
-                        help="Number of warmup runs")
+                        help="Number of benchmark runs (excluding warmup); the cap with --ci-target")
+    parser.add_argument("--warmup", type=warmup_count, default=2,
+                        help="Number of warmup runs, or 'auto' to warm up until latency is steady")
+    parser.add_argument("--max-warmup", type=int, default=steady_state.DEFAULT_MAX_WARMUP,
+                        help="Cap on warmup runs with --warmup auto")
+    parser.add_argument("--steady-window", type=int, default=steady_state.DEFAULT_WINDOW,
+                        help="Stable runs after the last change point that make a step steady (--warmup auto)")
+    parser.add_argument("--ci-target", type=float, default=None,
+                        help="Stop once every step's CI half-width is within this fraction of its estimate, e.g. 0.05")
+    parser.add_argument("--ci-stat", choices=sampling.CI_STATS, default="mean",
+                        help="Logic-time statistic the CI is for")
+    parser.add_argument("--ci-method", choices=sampling.CI_METHODS, default="t",
+                        help="t interval (mean only) or percentile bootstrap")
+    parser.add_argument("--ci-level", type=float, default=0.95, help="Confidence level")
+    parser.add_argument("--min-runs", type=int, default=10,
+                        help="Runs before the first CI check (with --ci-target)")
+
+    # Output arguments (set per batch by orchestrator.py)
+    parser.add_argument("--workload", default=None,
+                        help="Workload tag written into every row (default: image file stem)")
+    parser.add_argument("--output", default=None,
+                        help="CSV path (default: results_<model>_<arch>_<timestamp>.csv)")
+    parser.add_argument("--run-offset", type=int, default=0,
+                        help="Added to every Run_ID, to continue an earlier batch's numbering")
+    parser.add_argument("--quiet", action="store_true",
+                        help="No progress or report output")
+    return parser
+
 
+if __name__ == "__main__":
+    parser = build_parser()
     args = parser.parse_args()
 
-    run_benchmark(args)
+    if args.ci_target is not None:
+        if args.ci_stat == "p95" and args.ci_method == "t":
+            parser.error("--ci-stat p95 needs --ci-method bootstrap")
+        if args.min_runs < sampling.MIN_RUNS:
+            parser.error(f"--min-runs must be at least {sampling.MIN_RUNS}")
+
+    if (args.fixtures or args.concurrent_stages) and args.mode != 'standalone':
+        parser.error("--fixtures and --concurrent-stages need --mode standalone")
+
+    if args.warmup == "auto":
+        if args.spec:
+            parser.error("--warmup auto is not supported with --spec")
+        if args.max_warmup < args.steady_window:
+            parser.error("--max-warmup must be at least --steady-window")
+
+    if not args.composite_name.isalnum():
+        parser.error("--composite-name may only contain letters and digits")
+    try:
+        composite.parse_stages(args.stages or [], args.model, args.arch)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.ladder and (args.mode != 'standalone' or args.fixtures):
+        parser.error("--ladder needs --mode standalone without --fixtures (every stage gets the rung image)")
+
+    if args.spec:
+        run_spec_benchmark(args)
+    elif not (args.model or args.stages or args.auto_stages):
+        parser.error("--model is required unless --spec, --stages or --auto-stages is given")
+    elif args.ladder:
+        run_ladder_benchmark(args)
+    else:
+        run_benchmark(args)
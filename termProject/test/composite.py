@@ -0,0 +1,115 @@
+"""
+Composite pipelines: a different LLM variant and architecture per stage.
+
+A stage map assigns each step a (model, arch), i.e. the function
+{model}_func{step}-{arch} the runner invokes for it. It comes from
+`--stages` ("3=gemini@x86 5=gpt@arm", unmapped steps use --model/--arch),
+from `--auto-stages`, which picks per step whichever function was fastest or
+cheapest in earlier runner CSVs, or both (explicit stages win).
+
+Cost is Lambda duration cost at equal memory: logic time x the architecture's
+GB-second price, the same first-tier prices process_data.py uses.
+"""
+import csv
+import re
+import statistics
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+MODELS = ("gpt", "gemini", "deepseek")
+ARCHS = ("x86", "arm")
+STEPS = (1, 2, 3, 4, 5)
+OBJECTIVES = ("time", "cost")
+# USD per GB-second (first tier), as in process_data.py
+PRICE_PER_GB_S = {"x86": 0.0000166667, "arm": 0.0000133334}
+# Runs a function needs in the prior CSVs before auto mode considers it
+MIN_SAMPLES = 3
+
+STAGE_SPEC = re.compile(r"([1-5])=([a-z]+)(?:@([a-z0-9]+))?")
+FUNCTION_NAME = re.compile(r"([a-z]+)_func([1-5])-([a-z0-9]+)")
+
+StageMap = Dict[int, Tuple[str, str]]
+
+
+def parse_stages(specs: List[str], model: Optional[str], arch: str) -> StageMap:
+    """
+    "N=model" or "N=model@arch" per overridden step; the rest run on (model, arch).
+    """
+    stage_map = {step: (model, arch) for step in STEPS} if model else {}
+    for spec in specs:
+        match = STAGE_SPEC.fullmatch(spec)
+        if not match:
+            raise ValueError(f"Stage spec must look like 3=gemini or 3=gemini@arm, got {spec!r}")
+        step, stage_model, stage_arch = int(match[1]), match[2], match[3] or arch
+        if stage_model not in MODELS or stage_arch not in ARCHS:
+            raise ValueError(f"Unknown model or arch in {spec!r} (models: {MODELS}, archs: {ARCHS})")
+        stage_map[step] = (stage_model, stage_arch)
+    return stage_map
+
+
+def stage_cost(logic_ms: float, arch: str) -> float:
+    """
+    Relative duration cost of one invocation (per GB of memory).
+    """
+    return logic_ms / 1000 * PRICE_PER_GB_S[arch]
+
+
+def read_logic_times(csv_paths: List[Path], workload: Optional[str] = None) -> Dict[Tuple[int, str, str], List[float]]:
+    """
+    Successful BENCHMARK logic times per (step, model, arch), from Function_Name.
+    With `workload`, only rows of that Workload_Type count when the CSVs have any.
+    """
+    times: Dict[Tuple[int, str, str], List[float]] = {}
+    workload_times: Dict[Tuple[int, str, str], List[float]] = {}
+    for path in csv_paths:
+        with path.open(newline="") as csv_file:
+            for row in csv.DictReader(csv_file):
+                if row.get("Type") != "BENCHMARK" or row.get("Success") != "True":
+                    continue
+                match = FUNCTION_NAME.fullmatch(row.get("Function_Name") or "")
+                if not match:
+                    continue
+                key = (int(match[2]), match[1], match[3])
+                value = float(row["Logic_Time_ms"])
+                times.setdefault(key, []).append(value)
+                if workload and row.get("Workload_Type") == workload:
+                    workload_times.setdefault(key, []).append(value)
+    return workload_times or times
+
+
+def auto_stages(source: Path, objective: str, workload: Optional[str] = None) -> Tuple[StageMap, Dict[int, Dict]]:
+    """
+    Fastest (or cheapest) function per step in the CSVs at `source` (file or
+    directory). Returns the stage map and, per step, the winner's mean logic
+    time and cost.
+    """
+    paths = sorted(source.glob("*.csv")) if source.is_dir() else [source]
+    times = read_logic_times(paths, workload)
+    stage_map: StageMap = {}
+    picks: Dict[int, Dict] = {}
+    for step in STEPS:
+        candidates = []
+        for (candidate_step, model, arch), values in times.items():
+            if candidate_step != step or len(values) < MIN_SAMPLES:
+                continue
+            mean_ms = statistics.mean(values)
+            candidates.append({"model": model, "arch": arch, "logic_ms": mean_ms,
+                               "cost": stage_cost(mean_ms, arch), "samples": len(values)})
+        if not candidates:
+            continue
+        best = min(candidates, key=lambda c: c["logic_ms"] if objective == "time" else c["cost"])
+        stage_map[step] = (best["model"], best["arch"])
+        picks[step] = best
+    return stage_map, picks
+
+
+def arch_label(stage_map: StageMap) -> str:
+    """
+    The one architecture every stage runs on, or "mixed".
+    """
+    archs = {arch for _, arch in stage_map.values()}
+    return archs.pop() if len(archs) == 1 else "mixed"
+
+
+def describe(stage_map: StageMap) -> str:
+    return ", ".join(f"{step}={model}@{arch}" for step, (model, arch) in sorted(stage_map.items()))
@@ -0,0 +1,96 @@
+import argparse
+import base64
+import inspect
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from local_s3 import LocalS3
+from quality_harness import MODELS, load_handler
+
+# --- Configuration ---
+BUCKET = "local-bucket"
+
+# Step 5 parameters of the benchmark runner; every run gets its own s3_key like there
+BASE_PARAMS = {"target_format": "PNG", "bucket_name": BUCKET}
+
+# "off" = plain PUT to s3_key; the others set params.dedup (+ alias)
+DEDUP_MODES = {
+    "off": {},
+    "dedup": {"dedup": True},
+    "dedup+alias": {"dedup": True, "alias": True},
+}
+
+
+def run_mode(handler: Any, image_b64: str, model: str, mode: str, runs: int) -> Dict[str, Any]:
+    """
+    Uploads the same image `runs` times against a fresh local bucket.
+    """
+    local_s3 = LocalS3()
+    # The handler module's globals (lambda_handler is wrapped by shared.profiler)
+    handler_globals = inspect.unwrap(handler).__globals__
+    handler_globals["s3_client"] = local_s3
+    # Start every mode with a cold per-container index
+    dedup_module = handler_globals.get("dedup")
+    if dedup_module is not None:
+        dedup_module._INDEX.clear()
+
+    latencies: List[float] = []
+    skipped = 0
+    for i in range(runs):
+        params = {**BASE_PARAMS, **DEDUP_MODES[mode], "s3_key": f"output/{model}_local_{i}.png"}
+        start = time.perf_counter()
+        response = handler({"image": image_b64, "params": params}, None)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not response.get("success"):
+            return {"Error": response.get("error", "Unknown Error")}
+        skipped += (response.get("dedup") or {}).get("skipped_bytes", 0)
+
+    return {
+        "PUTs": local_s3.calls["put_object"],
+        "HEADs": local_s3.calls["head_object"],
+        "Copies": local_s3.calls["copy_object"],
+        "Bytes_Sent": local_s3.bytes_sent,
+        "Skipped_Bytes": skipped,
+        "Objects": len(local_s3.objects),
+        "Latency_ms": statistics.median(latencies),
+    }
+
+
+def print_report(rows: List[Dict[str, Any]]) -> None:
+    print("\n" + "=" * 96)
+    print("📦 STEP 5 UPLOAD DEDUP (local S3 stand-in)")
+    print("=" * 96)
+    print(f"{'Variant':<16} | {'Mode':<12} | {'PUTs':>5} | {'HEADs':>5} | {'Copies':>6} | "
+          f"{'Sent (MB)':>9} | {'Skipped (MB)':>12} | {'Median (ms)':>11}")
+    print("-" * 96)
+    for row in rows:
+        if row.get("Error"):
+            print(f"{row['Variant']:<16} | {row['Mode']:<12} | ❌ {str(row['Error'])[:56]}")
+            continue
+        print(f"{row['Variant']:<16} | {row['Mode']:<12} | {row['PUTs']:>5} | {row['HEADs']:>5} | "
+              f"{row['Copies']:>6} | {row['Bytes_Sent'] / 1e6:>9.2f} | {row['Skipped_Bytes'] / 1e6:>12.2f} | "
+              f"{row['Latency_ms']:>11.2f}")
+    print("=" * 96)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TCSS 562 Step 5 Upload Dedup Report")
+    parser.add_argument("--image", default="images/std.jpg", help="Input image path")
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=MODELS,
+                        help="Handler variants to measure")
+    parser.add_argument("--runs", type=int, default=10,
+                        help="Uploads of the same image per mode")
+
+    args = parser.parse_args()
+
+    image_b64 = base64.b64encode(Path(args.image).read_bytes()).decode("utf-8")
+    rows: List[Dict[str, Any]] = []
+    for model in args.models:
+        handler, import_error = load_handler(model, 5)
+        for mode in DEDUP_MODES:
+            metrics = ({"Error": import_error} if handler is None
+                       else run_mode(handler, image_b64, model, mode, args.runs))
+            rows.append({"Variant": f"{model}_func5", "Mode": mode, **metrics})
+    print_report(rows)
@@ -0,0 +1,125 @@
+import argparse
+import base64
+import io
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from PIL import Image
+
+from quality_harness import MODELS, load_handler, psnr, ssim
+
+# --- Configuration ---
+# Step 2 size of the benchmark runner
+SIZE = (800, 600)
+# 90 is the runner's Step 4 angle (lossless transpose); the others need interpolation
+ANGLES = [90, 30, 45]
+# Reference: resized to this multiple of SIZE, rotated there, then reduced, so
+# neither resampling error survives at output scale
+REFERENCE_SCALE = 4
+
+
+def reference_resize_rotate(img: Image.Image, angle: float) -> Image.Image:
+    big = img.convert("RGB").resize((SIZE[0] * REFERENCE_SCALE, SIZE[1] * REFERENCE_SCALE),
+                                     Image.Resampling.LANCZOS)
+    return big.rotate(angle, Image.Resampling.BICUBIC, expand=True)
+
+
+def decode_image(image_b64: str) -> Image.Image:
+    img = Image.open(io.BytesIO(base64.b64decode(image_b64)))
+    img.load()
+    return img
+
+
+def run_chain(step2: Callable, step4: Callable, image_b64: str, angle: float) -> Tuple[Dict[str, Any], float]:
+    """
+    The two-step chain as the runner calls it: Step 2's JPEG is Step 4's input.
+    """
+    start = time.perf_counter()
+    resized = step2({"image": image_b64, "params": {"width": SIZE[0], "height": SIZE[1]}}, None)
+    if not resized.get("success"):
+        return resized, 0.0
+    rotated = step4({"image": resized["image"], "params": {"angle": angle}}, None)
+    return rotated, (time.perf_counter() - start) * 1000
+
+
+def run_fused(step2: Callable, step4: Callable, image_b64: str, angle: float) -> Tuple[Dict[str, Any], float]:
+    start = time.perf_counter()
+    response = step2({"image": image_b64, "params": {"width": SIZE[0], "height": SIZE[1], "rotate": angle}}, None)
+    return response, (time.perf_counter() - start) * 1000
+
+
+MODES = {"chain": run_chain, "fused": run_fused}
+
+
+def measure(runner: Callable, step2: Callable, step4: Callable, image_b64: str, angle: float,
+            reference: Image.Image, repeats: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    response: Dict[str, Any] = {}
+    for _ in range(repeats):
+        response, latency = runner(step2, step4, image_b64, angle)
+        if not response.get("success"):
+            return {"Error": response.get("error", "Unknown Error")}
+        latencies.append(latency)
+
+    output = decode_image(response["image"])
+    reference = reference.resize(output.size, Image.Resampling.LANCZOS)
+    return {
+        "Latency_ms": statistics.median(latencies),
+        "Size": f"{output.width}x{output.height}",
+        "PSNR_dB": psnr(output, reference),
+        "SSIM": ssim(output, reference),
+        "Method": (response.get("fused") or {}).get("method", "two steps"),
+    }
+
+
+def print_report(rows: List[Dict[str, Any]]) -> None:
+    print("\n" + "=" * 100)
+    print("🔄 FUSED RESIZE + ROTATE vs STEP 2 -> STEP 4 CHAIN")
+    print("=" * 100)
+    print(f"{'Variant':<10} | {'Angle':>5} | {'Mode':<6} | {'Method':<9} | {'Size':>9} | "
+          f"{'Median (ms)':>11} | {'PSNR (dB)':>9} | {'SSIM':>6} | {'Speedup':>7}")
+    print("-" * 100)
+    chain_latency: Dict[Tuple[str, float], float] = {}
+    for row in rows:
+        if row.get("Error"):
+            print(f"{row['Variant']:<10} | {row['Angle']:>5} | {row['Mode']:<6} | ❌ {str(row['Error'])[:60]}")
+            continue
+        key = (row["Variant"], row["Angle"])
+        if row["Mode"] == "chain":
+            chain_latency[key] = row["Latency_ms"]
+        speedup = chain_latency.get(key, 0.0) / row["Latency_ms"] if row["Latency_ms"] else 0.0
+        print(f"{row['Variant']:<10} | {row['Angle']:>5} | {row['Mode']:<6} | {row['Method']:<9} | "
+              f"{row['Size']:>9} | {row['Latency_ms']:>11.2f} | {row['PSNR_dB']:>9.2f} | "
+              f"{row['SSIM']:>6.4f} | {speedup:>6.2f}x")
+    print("=" * 100)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TCSS 562 Fused Resize + Rotate Report")
+    parser.add_argument("--image", default="images/std.jpg", help="Input image path")
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=MODELS,
+                        help="Handler variants to measure")
+    parser.add_argument("--angles", nargs="+", type=float, default=ANGLES,
+                        help="Rotation angles in degrees")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="Runs per mode; the median latency is reported")
+
+    args = parser.parse_args()
+
+    image_b64 = base64.b64encode(Path(args.image).read_bytes()).decode("utf-8")
+    source = decode_image(image_b64)
+    rows: List[Dict[str, Any]] = []
+    for angle in args.angles:
+        reference = reference_resize_rotate(source, angle)
+        for model in args.models:
+            step2, import_error = load_handler(model, 2)
+            step4, step4_error = load_handler(model, 4)
+            for mode, runner in MODES.items():
+                if step2 is None or step4 is None:
+                    metrics = {"Error": import_error or step4_error}
+                else:
+                    metrics = measure(runner, step2, step4, image_b64, angle, reference, args.repeats)
+                rows.append({"Variant": model, "Angle": f"{angle:g}", "Mode": mode, **metrics})
+    print_report(rows)
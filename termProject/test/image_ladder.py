@@ -0,0 +1,145 @@
+"""
+Synthetic image-size ladder: deterministic test images along a megapixel
+ladder, with controlled content complexity, for scaling benchmarks
+(benchmark_template.py --ladder) beyond the three fixed images.
+
+Every rung is a 4:3 image of the requested megapixels. Content is a smooth
+colour gradient blended with seeded uniform noise: complexity 0 is the pure
+gradient (compresses to almost nothing), 1 is pure noise (incompressible),
+values in between trade the two. The same seed, size, complexity and format
+always produce the same bytes.
+
+The generator writes the images and ladder.json, which lists every rung's tag,
+path, dimensions, pixels, file bytes and whether its base64 request fits the
+6 MB synchronous invoke limit. Tags double as workload tags (orchestrator
+manifests, process_data.py).
+
+    python image_ladder.py --megapixels 0.5 1 2 4 8 12 24 50 --complexity 0.2 0.8
+"""
+import argparse
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+# --- Configuration ---
+OUTPUT_DIR = Path("./images/ladder")
+DEFAULT_MEGAPIXELS = [0.5, 1, 2, 4, 8, 12, 24, 50]
+DEFAULT_COMPLEXITY = [0.5]
+DEFAULT_SEED = 562
+ASPECT = (4, 3)
+JPEG_QUALITY = 90
+# Rows generated at a time, so a 50 MP rung never needs float buffers for the whole image
+BAND_ROWS = 256
+# Synchronous Lambda invoke request limit; the image travels base64-encoded inside JSON
+PAYLOAD_LIMIT_BYTES = 6 * 1024 * 1024
+PAYLOAD_OVERHEAD_BYTES = 4096
+
+
+def rung_size(megapixels: float) -> Tuple[int, int]:
+    """
+    4:3 width and height closest to `megapixels`.
+    """
+    unit = math.sqrt(megapixels * 1e6 / (ASPECT[0] * ASPECT[1]))
+    return round(unit * ASPECT[0]), round(unit * ASPECT[1])
+
+
+def rung_tag(megapixels: float, complexity: float) -> str:
+    """
+    Workload tag, letters, digits and '-' only: mp0p5-c20, mp24-c80.
+    """
+    return f"mp{megapixels:g}".replace(".", "p") + f"-c{round(complexity * 100)}"
+
+
+def synthesize(width: int, height: int, complexity: float, seed: int, mode: str = "RGB") -> Image.Image:
+    """
+    Gradient blended with seeded noise, built band by band.
+    """
+    channels = 1 if mode == "L" else 3
+    # Seeded per image: a rung's content never depends on which other rungs were generated
+    rng = np.random.default_rng([seed, width, height, round(complexity * 1000), channels])
+    x = np.linspace(0.0, 1.0, width, dtype=np.float32)
+    # A different diagonal gradient per channel
+    directions = [(1.0, 0.0), (0.0, 1.0), (0.6, 0.4)][:channels]
+
+    pixels = np.empty((height, width, channels), dtype=np.uint8)
+    for top in range(0, height, BAND_ROWS):
+        rows = min(BAND_ROWS, height - top)
+        y = np.linspace(top / max(height - 1, 1), (top + rows - 1) / max(height - 1, 1), rows,
+                        dtype=np.float32)[:, None]
+        noise = rng.integers(0, 256, size=(rows, width, channels), dtype=np.uint8)
+        for channel, (wx, wy) in enumerate(directions):
+            gradient = (wx * x[None, :] + wy * y) * 255.0
+            blended = (1.0 - complexity) * gradient + complexity * noise[:, :, channel]
+            pixels[top:top + rows, :, channel] = np.clip(blended, 0, 255).astype(np.uint8)
+    return Image.fromarray(pixels[:, :, 0] if channels == 1 else pixels, mode)
+
+
+def payload_bytes(file_bytes: int) -> int:
+    """
+    Request size of a runner invocation carrying the file base64-encoded.
+    """
+    return 4 * math.ceil(file_bytes / 3) + PAYLOAD_OVERHEAD_BYTES
+
+
+def generate(megapixels: List[float], complexities: List[float], seed: int, image_format: str,
+             mode: str, output_dir: Path) -> List[Dict[str, Any]]:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rungs = []
+    for mp in sorted(megapixels):
+        width, height = rung_size(mp)
+        for complexity in complexities:
+            tag = rung_tag(mp, complexity)
+            path = output_dir / f"{tag}.{image_format}"
+            image = synthesize(width, height, complexity, seed, mode)
+            if image_format == "jpg":
+                image.save(path, format="JPEG", quality=JPEG_QUALITY)
+            else:
+                image.save(path, format="PNG")
+            file_bytes = path.stat().st_size
+            rungs.append({
+                "tag": tag,
+                "path": str(path),
+                "megapixels": mp,
+                "width": width,
+                "height": height,
+                "pixels": width * height,
+                "mode": mode,
+                "complexity": complexity,
+                "format": image_format,
+                "bytes": file_bytes,
+                "invocable": payload_bytes(file_bytes) <= PAYLOAD_LIMIT_BYTES,
+            })
+            print(f"    [OK] {tag}: {width}x{height}, {file_bytes / 1e6:.2f} MB"
+                  + ("" if rungs[-1]["invocable"] else " (over the invoke payload limit)"))
+    return rungs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TCSS 562 Image Ladder Generator")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=DEFAULT_MEGAPIXELS,
+                        help="Ladder rungs in megapixels")
+    parser.add_argument("--complexity", type=float, nargs="+", default=DEFAULT_COMPLEXITY,
+                        help="Content complexity per rung, 0 (gradient) to 1 (noise)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Noise seed")
+    parser.add_argument("--format", choices=["jpg", "png"], default="jpg", help="Output format")
+    parser.add_argument("--mode", choices=["RGB", "L"], default="RGB", help="Colour or greyscale images")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR, help="Where images and ladder.json go")
+    args = parser.parse_args()
+
+    if any(not 0 <= c <= 1 for c in args.complexity):
+        parser.error("--complexity values must be within 0..1")
+    if any(mp <= 0 for mp in args.megapixels):
+        parser.error("--megapixels values must be positive")
+
+    print(f"[*] Generating {len(args.megapixels) * len(args.complexity)} images (seed {args.seed}) ...")
+    ladder = {
+        "seed": args.seed,
+        "rungs": generate(args.megapixels, args.complexity, args.seed, args.format, args.mode, args.output_dir),
+    }
+    ladder_path = args.output_dir / "ladder.json"
+    ladder_path.write_text(json.dumps(ladder, indent=2))
+    print(f"[*] Ladder written to {ladder_path}")
@@ -0,0 +1,41 @@
+from typing import Any, Dict
+
+from botocore.exceptions import ClientError
+
+
+class LocalS3:
+    """
+    In-memory stand-in for the Step 5 S3 client (drains the body like botocore does).
+    Stores object sizes and counts the bytes each call would send over the network.
+    """
+
+    class meta:
+        region_name = "us-east-2"
+
+    def __init__(self) -> None:
+        self.objects: Dict[str, int] = {}
+        self.calls: Dict[str, int] = {"put_object": 0, "head_object": 0, "copy_object": 0}
+        self.bytes_sent = 0
+
+    def put_object(self, Bucket: str, Key: str, Body: Any, **kwargs: Any) -> Dict[str, Any]:
+        size = len(Body) if isinstance(Body, (bytes, bytearray)) else sum(
+            len(chunk) for chunk in iter(lambda: Body.read(1 << 20), b""))
+        self.objects[f"{Bucket}/{Key}"] = size
+        self.calls["put_object"] += 1
+        self.bytes_sent += size
+        return {"ETag": "local"}
+
+    def head_object(self, Bucket: str, Key: str, **kwargs: Any) -> Dict[str, Any]:
+        self.calls["head_object"] += 1
+        if f"{Bucket}/{Key}" not in self.objects:
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        return {"ContentLength": self.objects[f"{Bucket}/{Key}"]}
+
+    def copy_object(self, Bucket: str, Key: str, CopySource: Dict[str, str], **kwargs: Any) -> Dict[str, Any]:
+        self.calls["copy_object"] += 1
+        source = f"{CopySource['Bucket']}/{CopySource['Key']}"
+        if source not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "Not Found"}}, "CopyObject")
+        # Server-side copy: nothing is sent from the function
+        self.objects[f"{Bucket}/{Key}"] = self.objects[source]
+        return {"CopyObjectResult": {"ETag": "local"}}
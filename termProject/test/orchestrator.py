@@ -0,0 +1,351 @@
+"""
+Experiment orchestrator: runs every model x arch x image cell of a manifest
+through the benchmark runner, in place of run_full_experiment.sh.
+
+- Interleaved: each cell's runs are split into batches of `batch_runs`, and
+  every round runs one batch per unfinished cell, starting one cell later each
+  round. Drift over the session (time of day, S3 and network load) spreads over
+  all cells instead of landing on whichever cell happened to run last.
+- Concurrent: cells of different (model, arch) pairs call different Lambda
+  functions and run side by side, up to `concurrency` at a time. Cells of the
+  same functions always run one after another, so they never force extra
+  containers. Concurrent cells share the client's uplink; use 1 when the
+  transfer columns matter.
+- Resumable: every finished batch is appended to its cell's CSV and recorded
+  in a checkpoint next to it. Rerunning the same manifest continues from
+  there; a batch that was cut off is dropped and run again.
+- Explicit metadata: every row carries Model, Architecture, Workload_Type (the
+  manifest's image tag) and Image, so process_data.py needs no run order.
+
+Manifest (JSON, see manifests/full_experiment.json):
+    models, archs         lists of runner --model / --arch values
+    images                {workload tag: image path}
+    runs, warmup          benchmark runs per cell; warmup runs before its first batch
+                          (a count, or "auto" for steady-state detection, see steady_state.py)
+    batch_runs            runs per cell per round (default 10)
+    rewarm                warmup runs before every later batch (default 0, may also be "auto")
+    concurrency           cells in flight at once (default 1)
+    pause_s               pause between rounds (default 0)
+    ci                    optional sequential sampling (see sampling.py), checked after every
+                          batch on all of the cell's runs; `runs` becomes the cap:
+                          {"target": 0.05, "stat": "mean", "method": "t", "level": 0.95, "min_runs": 10}
+    composites            optional {name: runner flags} of composite pipelines (see composite.py),
+                          one cell per image each, e.g. {"fastest": {"auto_stages": "csv_results"},
+                          "mix": {"model": "gpt", "stages": ["3=gemini@x86", "5=gpt@arm"]}};
+                          auto_stages is re-read every batch, so point it at an earlier experiment
+    args                  any other runner flags, e.g. {"mode": "pipeline", "dither": "ordered"}
+"""
+import argparse
+import csv
+import importlib
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import sampling
+
+# --- Configuration ---
+OUTPUT_DIR = Path("./csv_results")
+DEFAULTS = {"batch_runs": 10, "rewarm": 0, "concurrency": 1, "pause_s": 0, "ci": None, "composites": {},
+            "args": {}}
+CI_DEFAULTS = {"stat": "mean", "method": "t", "level": 0.95, "min_runs": 10}
+REQUIRED = ("models", "archs", "images", "runs", "warmup")
+
+
+def load_manifest(path: Path) -> Dict[str, Any]:
+    manifest = {**DEFAULTS, "name": path.stem, **json.loads(path.read_text())}
+    missing = [key for key in REQUIRED if key not in manifest]
+    if missing:
+        raise ValueError(f"Manifest {path} is missing {', '.join(missing)}")
+    for tag in manifest["images"]:
+        # The tag ends up in file names and in process_data.py's file name pattern
+        if not re.fullmatch(r"[a-zA-Z0-9-]+", tag):
+            raise ValueError(f"Workload tag {tag!r} may only contain letters, digits and '-'")
+    for name in manifest["composites"]:
+        # The name is the composite's model label: it ends up in file names like a model
+        if not name.isalnum():
+            raise ValueError(f"Composite name {name!r} may only contain letters and digits")
+    if manifest["ci"] is not None:
+        ci = manifest["ci"] = {**CI_DEFAULTS, **manifest["ci"]}
+        if "target" not in ci:
+            raise ValueError("Manifest ci needs a target (relative CI half-width, e.g. 0.05)")
+        if ci["stat"] not in sampling.CI_STATS or ci["method"] not in sampling.CI_METHODS:
+            raise ValueError(f"ci stat must be one of {sampling.CI_STATS}, method one of {sampling.CI_METHODS}")
+        if ci["stat"] == "p95" and ci["method"] == "t":
+            raise ValueError("ci stat p95 needs method bootstrap")
+        if ci["min_runs"] < sampling.MIN_RUNS:
+            raise ValueError(f"ci min_runs must be at least {sampling.MIN_RUNS}")
+    return manifest
+
+
+def build_cells(manifest: Dict[str, Any]) -> List[Dict[str, Any]]:
+    cells = [
+        {"key": f"{model}-{arch}-{tag}", "model": model, "arch": arch, "workload": tag, "image": image}
+        for model, arch, (tag, image) in itertools.product(
+            manifest["models"], manifest["archs"], manifest["images"].items())
+    ]
+    # Composites pick their own arch per stage
+    cells += [
+        {"key": f"{name}-{tag}", "model": name, "arch": "mixed", "workload": tag, "image": image,
+         "composite": flags}
+        for (name, flags), (tag, image) in itertools.product(
+            manifest["composites"].items(), manifest["images"].items())
+    ]
+    return cells
+
+
+def runner_argv(manifest: Dict[str, Any], cell: Dict[str, Any], runs: int, warmup: int,
+                run_offset: int, output: Path) -> List[str]:
+    """
+    The runner command line for one batch: the manifest's args plus the cell and batch.
+    """
+    argv: List[str] = []
+    if "composite" in cell:
+        flags = {**manifest["args"], **cell["composite"]}
+        target = ["--composite-name", cell["model"]]
+    else:
+        flags = manifest["args"]
+        target = ["--model", cell["model"], "--arch", cell["arch"]]
+    for key, value in flags.items():
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            argv.append(flag)
+        elif isinstance(value, list):
+            argv += [flag, *map(str, value)]
+        elif value not in (None, False):
+            argv += [flag, str(value)]
+    return argv + target + [
+        "--image", cell["image"],
+        "--workload", cell["workload"], "--runs", str(runs), "--warmup", str(warmup),
+        "--run-offset", str(run_offset), "--output", str(output), "--quiet",
+    ]
+
+
+class Checkpoint:
+    """
+    Per-cell progress, rewritten atomically after every batch: the cell's CSV,
+    runs done, batches done, and the CSV's length once the last batch was appended.
+    """
+
+    def __init__(self, path: Path, manifest: Dict[str, Any], fresh: bool):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {"manifest": manifest, "cells": {}}
+        if path.exists() and not fresh:
+            state = json.loads(path.read_text())
+            if state["manifest"] != manifest:
+                raise SystemExit(f"[!] {path} was written for a different manifest; "
+                                 f"rerun with --fresh to start over.")
+            self.state = state
+
+    def cell(self, key: str) -> Dict[str, Any]:
+        return self.state["cells"].setdefault(
+            key, {"csv": None, "done": 0, "batches": 0, "bytes": 0, "stop_reason": None})
+
+    def pending(self, key: str, manifest: Dict[str, Any]) -> bool:
+        progress = self.cell(key)
+        if manifest["ci"] is not None:
+            return progress["stop_reason"] is None
+        return progress["done"] < manifest["runs"]
+
+    def save(self) -> None:
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.state, indent=2))
+        os.replace(tmp_path, self.path)
+
+
+def restore_csv(output_dir: Path, progress: Dict[str, Any]) -> None:
+    """
+    Cuts a cell's CSV back to its last checkpointed length (drops a half-appended batch).
+    """
+    if progress["csv"]:
+        csv_path = output_dir / progress["csv"]
+        if csv_path.exists() and csv_path.stat().st_size > progress["bytes"]:
+            with csv_path.open("r+b") as csv_file:
+                csv_file.truncate(progress["bytes"])
+
+
+def append_batch(batch_path: Path, csv_path: Path) -> int:
+    """
+    Appends the batch's rows (and the header, for a new file). Returns the new file length.
+    """
+    lines = batch_path.read_bytes().splitlines(keepends=True)
+    with csv_path.open("ab") as csv_file:
+        if csv_file.tell() > 0:
+            lines = lines[1:]
+        csv_file.writelines(lines)
+        csv_file.flush()
+        os.fsync(csv_file.fileno())
+        size = csv_file.tell()
+    batch_path.unlink()
+    return size
+
+
+def read_samples(csv_path: Path) -> Tuple[Dict[Tuple[str, str], List[float]], Dict[str, str]]:
+    """
+    Logic times of the cell's successful benchmark runs per (step, function),
+    and the workload columns of its rows.
+    """
+    samples: Dict[Tuple[str, str], List[float]] = {}
+    workload: Dict[str, str] = {}
+    with csv_path.open(newline="") as csv_file:
+        for row in csv.DictReader(csv_file):
+            if row["Type"] == "BENCHMARK" and row["Success"] == "True":
+                samples.setdefault((row["Step"], row["Function_Name"]), []).append(float(row["Logic_Time_ms"]))
+                workload = {key: row[key] for key in ("Model", "Architecture", "Workload_Type", "Image")}
+    return samples, workload
+
+
+def stop_check(manifest: Dict[str, Any], progress: Dict[str, Any], csv_path: Path) -> int:
+    """
+    Sequential sampling after a batch: once every step's CI is within target
+    (or `runs` is reached), appends one CI row per step with the stop
+    reason and final CI, and marks the cell done. Returns the CSV length.
+    """
+    ci = manifest["ci"]
+    size = progress["bytes"]
+    if progress["done"] < ci["min_runs"] and progress["done"] < manifest["runs"]:
+        return size
+    samples, workload = read_samples(csv_path)
+    converged, intervals = sampling.check(samples, ci["stat"], ci["method"], ci["level"], ci["target"])
+    if converged:
+        progress["stop_reason"] = sampling.STOP_CI
+    elif progress["done"] >= manifest["runs"]:
+        progress["stop_reason"] = sampling.STOP_CAP
+    else:
+        return size
+
+    with csv_path.open("a", newline="") as csv_file:
+        with csv_path.open(newline="") as header_file:
+            fieldnames = next(csv.reader(header_file))
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        for (step, function_name), values in samples.items():
+            interval = intervals[(step, function_name)]
+            writer.writerow({
+                'Run_ID': len(values),
+                'Type': sampling.CI_ROW_TYPE,
+                'Step': step,
+                'Function_Name': function_name,
+                **workload,
+                'Logic_Time_ms': interval["estimate"] if interval else None,
+                **sampling.summary_columns(interval, ci["stat"], ci["method"], ci["level"], progress["stop_reason"])
+            })
+        csv_file.flush()
+        os.fsync(csv_file.fileno())
+        size = csv_file.tell()
+    return size
+
+
+def run_batch(runner: Any, manifest: Dict[str, Any], cell: Dict[str, Any],
+              checkpoint: Checkpoint, output_dir: Path) -> None:
+    with checkpoint.lock:
+        progress = dict(checkpoint.cell(cell["key"]))
+    if progress["csv"] is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        progress["csv"] = f"results_{cell['model']}_{cell['arch']}_{cell['workload']}_{timestamp}.csv"
+
+    runs = min(manifest["batch_runs"], manifest["runs"] - progress["done"])
+    warmup = manifest["warmup"] if progress["batches"] == 0 else manifest["rewarm"]
+    batch_path = output_dir / f"{cell['key']}.batch.tmp"
+    start = time.time()
+    args = runner.build_parser().parse_args(
+        runner_argv(manifest, cell, runs, warmup, progress["done"], batch_path))
+    runner.run_benchmark(args)
+
+    progress["bytes"] = append_batch(batch_path, output_dir / progress["csv"])
+    progress["done"] += runs
+    progress["batches"] += 1
+    if manifest["ci"] is not None:
+        progress["bytes"] = stop_check(manifest, progress, output_dir / progress["csv"])
+    with checkpoint.lock:
+        checkpoint.state["cells"][cell["key"]] = progress
+        checkpoint.save()
+    stopped = f", stopped: {progress['stop_reason']}" if progress.get("stop_reason") else ""
+    print(f"    ✅ [{cell['key']}] {progress['done']}/{manifest['runs']} runs "
+          f"(+{runs}, warmup {warmup}, {time.time() - start:.0f}s{stopped}) -> {progress['csv']}")
+
+
+def schedule(cells: List[Dict[str, Any]], round_index: int) -> List[List[Dict[str, Any]]]:
+    """
+    This round's cells grouped by (model, arch): groups run concurrently, the
+    cells inside a group one after another. Both orders rotate every round.
+    A composite is a group of its own, so it may overlap cells whose functions
+    it borrows (use concurrency 1 when that matters).
+    """
+    groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for cell in cells:
+        groups.setdefault((cell["model"], cell["arch"]), []).append(cell)
+
+    def rotate(items: List[Any]) -> List[Any]:
+        shift = round_index % len(items)
+        return items[shift:] + items[:shift]
+
+    return rotate([rotate(group) for group in groups.values()])
+
+
+def run_experiment(args: argparse.Namespace) -> None:
+    manifest = load_manifest(args.manifest)
+    output_dir = args.output_dir
+    checkpoint = Checkpoint(output_dir / f"{manifest['name']}.checkpoint.json", manifest, args.fresh)
+    cells = build_cells(manifest)
+    if not args.dry_run:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for cell in cells:
+            restore_csv(output_dir, checkpoint.cell(cell["key"]))
+
+    runner = None if args.dry_run else importlib.import_module(args.runner)
+    print(f"\n🧪 Experiment [{manifest['name']}]: {len(cells)} cells x {manifest['runs']} runs, "
+          f"batches of {manifest['batch_runs']}, concurrency {manifest['concurrency']}")
+
+    round_index = 0
+    while True:
+        pending = [cell for cell in cells if checkpoint.pending(cell["key"], manifest)]
+        if not pending:
+            break
+        groups = schedule(pending, round_index)
+        print(f"\n🔁 Round {round_index + 1}: " + " | ".join(
+            " > ".join(cell["key"] for cell in group) for group in groups))
+        if args.dry_run:
+            # Pretend every pending cell finished a batch
+            for cell in pending:
+                progress = checkpoint.cell(cell["key"])
+                progress["done"] += manifest["batch_runs"]
+                if progress["done"] >= manifest["runs"]:
+                    progress["stop_reason"] = sampling.STOP_CAP
+        else:
+            def run_group(group: List[Dict[str, Any]]) -> None:
+                for cell in group:
+                    run_batch(runner, manifest, cell, checkpoint, output_dir)
+
+            with ThreadPoolExecutor(max_workers=manifest["concurrency"]) as executor:
+                # list() re-raises the first failure; the checkpoint keeps everything before it
+                list(executor.map(run_group, groups))
+            if manifest["pause_s"]:
+                time.sleep(manifest["pause_s"])
+        round_index += 1
+
+    if args.dry_run:
+        print("\n(dry run: nothing was invoked or written)")
+    else:
+        print(f"\n✅ Experiment complete. CSVs in {output_dir} (checkpoint: {checkpoint.path.name})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TCSS 562 Experiment Orchestrator")
+    parser.add_argument("manifest", type=Path, help="Experiment manifest (JSON)")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR,
+                        help="Where cell CSVs and the checkpoint go (process_data.py reads ./csv_results)")
+    parser.add_argument("--runner", default="benchmark_template",
+                        help="Runner module (e.g. 'benchmark' for your filled-in copy)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore an existing checkpoint and start every cell over")
+    parser.add_argument("--dry-run", action="store_true", help="Print the round schedule only")
+
+    run_experiment(parser.parse_args())
@@ -0,0 +1,114 @@
+import argparse
+import base64
+import importlib.util
+import io
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from PIL import Image
+
+from quality_harness import FUNCTIONS_DIR, psnr
+
+# --- Configuration ---
+# Specs to plan; "runner" is the benchmark runner's Step 1-4 chain
+SPECS: Dict[str, List[Dict[str, Any]]] = {
+    "runner": [{"op": "greyscale"}, {"op": "resize", "width": 800, "height": 600},
+               {"op": "depth", "target_depth": 8}, {"op": "rotate", "angle": 90}],
+    "late-greyscale": [{"op": "resize", "width": 800, "height": 600}, {"op": "rotate", "angle": 90},
+                       {"op": "greyscale"}],
+    "rotate-first": [{"op": "rotate", "angle": 90}, {"op": "depth", "target_depth": 8},
+                     {"op": "resize", "width": 600, "height": 800}, {"op": "greyscale"}],
+    "dither-first": [{"op": "depth", "target_depth": 4, "dither": "ordered"},
+                     {"op": "resize", "width": 800, "height": 600}],
+    "depth-first": [{"op": "depth", "target_depth": 8}, {"op": "resize", "width": 800, "height": 600}],
+}
+POLICIES = ["off", "safe", "approx"]
+
+
+def load_pipeline_handler() -> Callable:
+    path = FUNCTIONS_DIR / "pipeline" / "pipeline_func.py"
+    spec = importlib.util.spec_from_file_location("pipeline_func", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.lambda_handler
+
+
+def decode_image(image_b64: str) -> Image.Image:
+    img = Image.open(io.BytesIO(base64.b64decode(image_b64)))
+    img.load()
+    return img
+
+
+def run_spec(handler: Callable, image_b64: str, spec: List[Dict[str, Any]], policy: str,
+             repeats: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    measured: List[float] = []
+    response: Dict[str, Any] = {}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = handler({"image": image_b64, "pipeline": spec, "params": {"reorder": policy}}, None)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not response.get("success"):
+            return {"Error": response.get("error", "Unknown Error")}
+        measured.append(response["plan"]["measured_ms"])
+
+    plan = response["plan"]
+    return {
+        "Order": " > ".join(plan["order"]),
+        "Candidates": plan["candidates"],
+        "Estimated_ms": plan["estimated_ms"],
+        "Measured_ms": statistics.median(measured),
+        "Latency_ms": statistics.median(latencies),
+        "Ops": plan["ops"],
+        "Output": decode_image(response["image"]),
+    }
+
+
+def print_report(rows: List[Dict[str, Any]], show_ops: bool) -> None:
+    print("\n" + "=" * 118)
+    print("🧭 PIPELINE PLANNER: estimated vs measured op cost")
+    print("=" * 118)
+    print(f"{'Spec':<15} | {'Policy':<6} | {'Order':<40} | {'Cand':>4} | {'Est (ms)':>8} | "
+          f"{'Ops (ms)':>8} | {'Total (ms)':>10} | {'PSNR vs off':>11}")
+    print("-" * 118)
+    for row in rows:
+        if row.get("Error"):
+            print(f"{row['Spec']:<15} | {row['Policy']:<6} | ❌ {str(row['Error'])[:80]}")
+            continue
+        fidelity = "identical" if row["PSNR_dB"] == float("inf") else f"{row['PSNR_dB']:.2f} dB"
+        print(f"{row['Spec']:<15} | {row['Policy']:<6} | {row['Order']:<40} | {row['Candidates']:>4} | "
+              f"{row['Estimated_ms']:>8.2f} | {row['Measured_ms']:>8.2f} | {row['Latency_ms']:>10.2f} | "
+              f"{fidelity:>11}")
+        if show_ops:
+            for op in row["Ops"]:
+                print(f"{'':<15} |   {op['op']:<10} {'x'.join(map(str, op['size'])):>10}  "
+                      f"est {op['estimated_ms']:>8.2f} ms   measured {op['measured_ms']:>8.2f} ms")
+    print("=" * 118)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TCSS 562 Pipeline Planner Report")
+    parser.add_argument("--image", default="images/std.jpg", help="Input image path")
+    parser.add_argument("--specs", nargs="+", choices=list(SPECS), default=list(SPECS),
+                        help="Specs to plan and run")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="Runs per spec and policy; medians are reported")
+    parser.add_argument("--ops", action="store_true", help="Print every op's estimate and measurement")
+
+    args = parser.parse_args()
+
+    image_b64 = base64.b64encode(Path(args.image).read_bytes()).decode("utf-8")
+    handler = load_pipeline_handler()
+    rows: List[Dict[str, Any]] = []
+    for name in args.specs:
+        baseline = None
+        for policy in POLICIES:
+            metrics = run_spec(handler, image_b64, SPECS[name], policy, args.repeats)
+            if not metrics.get("Error"):
+                # The spec as written is the reference for what reordering changed
+                baseline = baseline or metrics["Output"]
+                metrics["PSNR_dB"] = psnr(metrics["Output"], baseline)
+            rows.append({"Spec": name, "Policy": policy, **metrics})
+    print_report(rows, args.ops)
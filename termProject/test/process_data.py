@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import csv
 import argparse
@@ -9,6 +10,10 @@ from collections import defaultdict
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 
+from PIL import Image
+
+import sampling
+
 # --- Configuration ---
 # Source directory containing raw CSV files
 SOURCE_DIR = Path("./csv_results")
@@ -16,6 +21,8 @@ SOURCE_DIR = Path("./csv_results")
 TARGET_DIR = Path("./processed_data")
 # Directory to save generated plots
 PLOTS_DIR = Path("./plots")
+# Where the benchmarked images are looked up by file name (scaling analysis)
+IMAGE_DIRS = [Path("./images")]
 
 # Workload tags corresponding to experiment order
 WORKLOAD_ORDER = ["std", "heavy", "light"]
@@ -33,18 +40,67 @@ PRICE_X86 = 0.0000166667
 PRICE_ARM = 0.0000133334
 # Calculated Price Ratio (ARM / X86) ~= 0.8
 PRICE_RATIO = PRICE_ARM / PRICE_X86
+# Rest of the per-image bill (planner): per-invocation fee, S3 PUT, and data
+# transfer out for each response the client receives (0 for a client in the
+# functions' region, see structure.md)
+PRICE_REQUEST = 0.20 / 1e6
+PRICE_S3_PUT = 0.005 / 1000
+PRICE_TRANSFER_OUT_GB = 0.09
+# Lambda bills duration in 1 ms increments, memory in GB of 1024 MB
+BILLING_GRANULARITY_MS = 1
+# Memory assumed for CSVs from before the Memory_MB column
+DEFAULT_MEMORY_MB = 1024
+# Per-stage latency the planner adds up against the SLO
+PLANNER_QUANTILE = 0.95
+IMAGES_PER_PROJECTION = 1_000_000
+
+# Scaling models: a stage's request is its input image base64-encoded plus params;
+# rows whose Request_Bytes match the image this closely got that image as input
+INPUT_MATCH_SLACK_BYTES = 16 * 1024
+SCALING_CONFIDENCE = 0.95
+# Distinct image sizes a fit needs (three for the super-linear test)
+MIN_SIZES_LINEAR = 2
+MIN_SIZES_QUADRATIC = 3
+# Residual degrees of freedom a fit needs: with fewer, the residual spread behind the CIs is too unstable
+MIN_FIT_DF = 4
+DEFAULT_PREDICT_MP = [12.0, 24.0, 50.0]
+
+# Lambda functions are named {model}_func{step}-{arch}
+FUNCTION_ARCH_PATTERN = r'-(x86|arm)$'
+ARCH_PRICES = {"x86": PRICE_X86, "arm": PRICE_ARM}
+
+# Payload columns written by newer runner versions (absent = NaN in older CSVs)
+TRANSFER_COLS = ['Request_Bytes', 'Response_Bytes', 'Serialize_ms', 'Parse_ms', 'Transfer_MBps']
+
+
+def workload_order(df: pd.DataFrame) -> List[str]:
+    """
+    WORKLOAD_ORDER first, then any other workload tags in the data (from manifests), sorted.
+    """
+    present = set(df['Workload_Type'].dropna().astype(str)) if 'Workload_Type' in df.columns else set()
+    return [w for w in WORKLOAD_ORDER if w in present] + sorted(present - set(WORKLOAD_ORDER))
+
+
+def read_workload(path: Path) -> Optional[str]:
+    """
+    The Workload_Type the runner wrote into the CSV's rows, or None for CSVs
+    from before the column existed.
+    """
+    with path.open(mode='r', encoding='utf-8', newline='') as infile:
+        for row in csv.DictReader(infile):
+            return row.get("Workload_Type") or None
+    return None
 
 
 def enrich_and_save_csv(source_path: Path, target_path: Path, metadata: Dict[str, str]) -> None:
     """
-    Reads the source CSV, appends metadata columns, and saves to target.
+    Reads the source CSV, appends metadata columns it doesn't already have, and saves to target.
     """
-    new_headers: List[str] = ["LLM_Source", "Architecture", "Workload_Type"]
-    new_values: List[str] = [
-        metadata.get("llm", "Unknown"),
-        metadata.get("arch", "Unknown"),
-        metadata.get("workload", "Unknown")
-    ]
+    metadata_columns = {
+        "LLM_Source": metadata.get("llm", "Unknown"),
+        "Architecture": metadata.get("arch", "Unknown"),
+        "Workload_Type": metadata.get("workload", "Unknown"),
+    }
 
     try:
         target_path.parent.mkdir(parents=True, exist_ok=True)
@@ -56,6 +112,8 @@ def enrich_and_save_csv(source_path: Path, target_path: Path, metadata: Dict[str
                 headers = next(reader)
             except StopIteration:
                 return
+            new_headers = [h for h in metadata_columns if h not in headers]
+            new_values = [metadata_columns[h] for h in new_headers]
             writer.writerow(headers + new_headers)
             for row in reader:
                 writer.writerow(row + new_values)
@@ -72,15 +130,30 @@ def process_raw_data(source_dir: Path, target_dir: Path) -> None:
         print(f"[!] Source directory {source_dir} does not exist.")
         return
 
+    # The optional workload tag is part of the names orchestrator.py writes
     pattern = re.compile(
-        r"results_([a-zA-Z0-9]+)_([a-zA-Z0-9]+)_(\d{8})_(\d{6})\.csv")
+        r"results_([a-zA-Z0-9]+)_([a-zA-Z0-9]+)_(?:[a-zA-Z0-9-]+_)?(\d{8})_(\d{6})\.csv")
     file_groups: Dict[Tuple[str, str, str],
                       List[Dict[str, Any]]] = defaultdict(list)
 
+    processed_count = 0
     for file_path in list(source_dir.glob("*.csv")):
         match = pattern.match(file_path.name)
         if match:
             model, arch, date, time_str = match.groups()
+            workload_tag = read_workload(file_path)
+            if workload_tag:
+                # Rows carry their own workload: no need to infer it from run order
+                llm_display_name = LLM_NAME_MAPPING.get(model.lower(), model)
+                new_filename = f"results_{model}_{arch}_{workload_tag}_{date}_{time_str}.csv"
+                enrich_and_save_csv(
+                    file_path,
+                    target_dir / new_filename,
+                    {"llm": llm_display_name, "arch": arch, "workload": workload_tag}
+                )
+                processed_count += 1
+                print(f"    [OK] {file_path.name} -> {new_filename} ({llm_display_name})")
+                continue
             file_groups[(model, arch, date)].append({
                 "time": time_str,
                 "original_name": file_path.name,
@@ -90,7 +163,7 @@ def process_raw_data(source_dir: Path, target_dir: Path) -> None:
                 "date": date
             })
 
-    processed_count = 0
+    # Legacy CSVs: the workload is inferred from timestamp order (WORKLOAD_ORDER)
     for (model, arch, date), items in file_groups.items():
         sorted_items = sorted(items, key=lambda x: x["time"])
         if len(sorted_items) != 3:
@@ -142,6 +215,10 @@ def load_all_data(source_dir: Path) -> pd.DataFrame:
             combined_df[col] = pd.to_numeric(
                 combined_df[col], errors='coerce').fillna(0.0)
 
+    for col in TRANSFER_COLS:
+        if col in combined_df.columns:
+            combined_df[col] = pd.to_numeric(combined_df[col], errors='coerce')
+
     # --- FIX: Synthesize 'Pipeline_Total' from steps ---
     # Group by key identifiers to calculate sum for each run
     # Assuming 'Run_ID' is unique within a specific file context,
@@ -204,7 +281,7 @@ def analyze_primary_objective_llm_comparison(df: pd.DataFrame) -> None:
         plt.figure(figsize=(12, 6))
         g = sns.catplot(
             data=pipeline_df, kind="bar", x="Workload_Type", y="Logic_Time_ms",
-            hue="LLM_Source", col="Architecture", order=WORKLOAD_ORDER,
+            hue="LLM_Source", col="Architecture", order=workload_order(pipeline_df),
             errorbar="sd", palette="muted", height=5, aspect=1.2
         )
         g.fig.subplots_adjust(top=0.85)
@@ -232,7 +309,7 @@ def analyze_primary_objective_llm_comparison(df: pd.DataFrame) -> None:
         plt.figure(figsize=(12, 6))
         g = sns.catplot(
             data=current_step_df, kind="bar", x="Workload_Type", y="Logic_Time_ms",
-            hue="LLM_Source", col="Architecture", order=WORKLOAD_ORDER,
+            hue="LLM_Source", col="Architecture", order=workload_order(current_step_df),
             errorbar="sd", palette="muted", height=5, aspect=1.2
         )
         g.fig.subplots_adjust(top=0.85)
@@ -254,6 +331,7 @@ def analyze_secondary_objective_architecture(df: pd.DataFrame) -> None:
     if df.empty or 'Success' not in df.columns:
         return
     clean_df = df[df['Success'].astype(str).str.lower() == 'true'].copy()
+    clean_df = clean_df[clean_df['Type'] != 'WARMUP']
 
     grouped = clean_df.groupby(['Workload_Type', 'LLM_Source', 'Type', 'Step', 'Architecture'])[
         'Logic_Time_ms'].mean().reset_index()
@@ -302,7 +380,7 @@ def analyze_secondary_objective_architecture(df: pd.DataFrame) -> None:
         plt.figure(figsize=(10, 6))
         ax = sns.barplot(
             data=step_data, x="Workload_Type", y="Speedup_%", hue="LLM_Source",
-            order=WORKLOAD_ORDER, palette="viridis"
+            order=workload_order(step_data), palette="viridis"
         )
 
         # Reference Line: 0% (Performance Parity)
@@ -329,7 +407,7 @@ def analyze_secondary_objective_architecture(df: pd.DataFrame) -> None:
         plt.figure(figsize=(10, 6))
         ax = sns.barplot(
             data=total_data, x="Workload_Type", y="Cost_Saving_%", hue="LLM_Source",
-            order=WORKLOAD_ORDER, palette="Greens_d"
+            order=workload_order(total_data), palette="Greens_d"
         )
 
         # Breakeven Line at 0% Cost Savings
@@ -352,11 +430,597 @@ def analyze_secondary_objective_architecture(df: pd.DataFrame) -> None:
         plt.close()
 
 
+def fit_transfer_model(rows: pd.DataFrame) -> Optional[Tuple[float, float]]:
+    """
+    Least-squares fit of gap = overhead + bytes / bandwidth, where gap is the
+    round trip minus the handler's logic time and bytes is request + response.
+    Returns (overhead_ms, ms_per_mb), or None when the payload sizes don't vary
+    enough to separate the two.
+    """
+    payload_mb = (rows['Request_Bytes'] + rows['Response_Bytes']) / 1e6
+    gap = rows['Round_Trip_ms'] - rows['Logic_Time_ms']
+    if payload_mb.nunique() < 2:
+        return None
+    ms_per_mb, overhead_ms = np.polyfit(payload_mb, gap, 1)
+    if ms_per_mb <= 0:
+        return None
+    return max(overhead_ms, 0.0), ms_per_mb
+
+
+def analyze_transfer_decomposition(df: pd.DataFrame) -> None:
+    """
+    Splits each step's round trip into logic, payload transfer, invoke overhead and
+    client-side JSON time, from the payload sizes the runner records.
+    """
+    print("\n" + "="*80)
+    print("TRANSFER DECOMPOSITION: LOGIC vs PAYLOAD vs INVOKE OVERHEAD")
+    print("="*80)
+
+    if df.empty or 'Request_Bytes' not in df.columns:
+        print("[!] No payload sizes in the data (runs predate the Request_Bytes column).")
+        return
+
+    clean_df = df[(df['Success'].astype(str).str.lower() == 'true') &
+                  (df['Type'] == 'BENCHMARK') & (df['Step'] != 'Pipeline_Total')].dropna(
+        subset=['Request_Bytes', 'Response_Bytes']).copy()
+    if clean_df.empty:
+        print("[!] No successful runs with payload sizes.")
+        return
+
+    PLOTS_DIR.mkdir(parents=True, exist_ok=True)
+    sns.set_theme(style="whitegrid")
+
+    for arch, arch_df in clean_df.groupby('Architecture'):
+        # One fit per architecture: every step and workload shares the network path
+        fit = fit_transfer_model(arch_df)
+        if fit is None:
+            print(f"[!] {arch}: payload sizes don't vary; transfer and overhead can't be separated.")
+            continue
+        overhead_ms, ms_per_mb = fit
+        print(f"\n--- {arch}: invoke overhead {overhead_ms:.1f} ms + {ms_per_mb:.1f} ms/MB "
+              f"({1000 / ms_per_mb:.1f} MB/s) ---")
+
+        arch_df = arch_df.copy()
+        payload_mb = (arch_df['Request_Bytes'] + arch_df['Response_Bytes']) / 1e6
+        gap = arch_df['Round_Trip_ms'] - arch_df['Logic_Time_ms']
+        # Transfer can't exceed the measured gap; the rest of the gap is overhead
+        arch_df['Transfer_ms'] = np.minimum(payload_mb * ms_per_mb, gap.clip(lower=0))
+        arch_df['Overhead_ms'] = (gap - arch_df['Transfer_ms']).clip(lower=0)
+        arch_df['Client_JSON_ms'] = arch_df['Serialize_ms'].fillna(0) + arch_df['Parse_ms'].fillna(0)
+
+        components = ['Logic_Time_ms', 'Transfer_ms', 'Overhead_ms', 'Client_JSON_ms']
+        summary = arch_df.groupby(['Workload_Type', 'Step'])[components + ['Transfer_MBps']].mean()
+        summary['Payload_MB'] = (arch_df.groupby(['Workload_Type', 'Step'])[['Request_Bytes', 'Response_Bytes']]
+                                 .mean().sum(axis=1) / 1e6)
+        print(summary.round(2))
+
+        workloads = workload_order(arch_df)
+        if not workloads:
+            continue
+        fig, axes = plt.subplots(1, len(workloads), figsize=(6 * len(workloads), 6), sharey=True, squeeze=False)
+        for ax, workload in zip(axes[0], workloads):
+            summary.loc[workload, components].plot(
+                kind='bar', stacked=True, ax=ax, legend=ax is axes[0][0],
+                color=sns.color_palette("muted", len(components)))
+            ax.set_title(workload)
+            ax.set_xlabel('')
+            ax.set_ylabel('Latency (ms)')
+            ax.tick_params(axis='x', rotation=30)
+        fig.suptitle(f'{arch}: Round Trip Decomposition per Step (Logic / Transfer / Invoke Overhead / Client JSON)')
+        fig.tight_layout()
+        fig.savefig(PLOTS_DIR / f"transfer_decomposition_{arch}.png")
+        plt.close(fig)
+        print(f"    [Plotting] Generated transfer decomposition plot for {arch}.")
+
+
+def analyze_cold_starts(df: pd.DataFrame) -> None:
+    """
+    Splits invocations into cold and warm from the container identity each
+    handler returns, and reports the cold-start rate and penalty per function
+    and architecture. Warmup rows are included: that is where most cold starts are.
+    """
+    print("\n" + "="*80)
+    print("COLD vs WARM INVOCATIONS")
+    print("="*80)
+
+    if df.empty or 'Cold' not in df.columns:
+        print("[!] No container data (runs predate the Cold column).")
+        return
+
+    clean_df = df[(df['Success'].astype(str).str.lower() == 'true') &
+                  (df['Type'].isin(['WARMUP', 'BENCHMARK'])) & df['Cold'].notna()].copy()
+    if clean_df.empty:
+        print("[!] No successful runs with container data.")
+        return
+    clean_df['Start'] = np.where(clean_df['Cold'].astype(str).str.lower() == 'true', 'cold', 'warm')
+
+    rows = []
+    for (arch, llm, step), group in clean_df.groupby(['Architecture', 'LLM_Source', 'Step']):
+        cold = group[group['Start'] == 'cold']
+        warm = group[group['Start'] == 'warm']
+        benchmark = group[group['Type'] == 'BENCHMARK']
+        rows.append({
+            'Architecture': arch,
+            'LLM_Source': llm,
+            'Step': step,
+            'Invocations': len(group),
+            'Containers': group['Container_ID'].nunique(),
+            'Cold': len(cold),
+            'Cold_Rate_%': 100.0 * len(cold) / len(group),
+            # Cold starts the --warmup runs did not absorb
+            'Cold_In_Benchmark': int((benchmark['Start'] == 'cold').sum()),
+            'Warm_Round_Trip_ms': warm['Round_Trip_ms'].median(),
+            'Cold_Round_Trip_ms': cold['Round_Trip_ms'].median(),
+            # Round trip includes init; logic time only what the handler measures itself
+            'Round_Trip_Penalty_ms': cold['Round_Trip_ms'].median() - warm['Round_Trip_ms'].median(),
+            'Logic_Penalty_ms': cold['Logic_Time_ms'].median() - warm['Logic_Time_ms'].median(),
+        })
+    summary = pd.DataFrame(rows).set_index(['Architecture', 'LLM_Source', 'Step'])
+    with pd.option_context('display.float_format', '{:.2f}'.format, 'display.width', 200,
+                           'display.max_columns', None):
+        print(summary)
+
+    PLOTS_DIR.mkdir(parents=True, exist_ok=True)
+    sns.set_theme(style="whitegrid")
+    g = sns.catplot(
+        data=clean_df, kind="box", x="Step", y="Round_Trip_ms", hue="Start", hue_order=["warm", "cold"],
+        col="Architecture", palette="muted", height=5, aspect=1.4
+    )
+    g.set(yscale="log")
+    g.set_xticklabels(rotation=30)
+    g.fig.subplots_adjust(top=0.85)
+    g.fig.suptitle('Round Trip: Cold vs Warm Invocations (log scale)')
+    g.savefig(PLOTS_DIR / "cold_warm_round_trip.png")
+    plt.close()
+    print(f"    [Plotting] Generated cold/warm distribution plot.")
+
+
+def analyze_steady_state(df: pd.DataFrame) -> None:
+    """
+    Warmup length detected per function by `--warmup auto` (STEADY rows): how
+    many runs each function needs before its latency stops shifting.
+    """
+    print("\n" + "="*80)
+    print("DETECTED WARMUP (--warmup auto)")
+    print("="*80)
+
+    if df.empty or 'Stop_Reason' not in df.columns:
+        print("[!] No steady-state data.")
+        return
+    steady_df = df[df['Type'] == 'STEADY'].copy()
+    if steady_df.empty:
+        print("[!] No steady-state data (no runs used --warmup auto).")
+        return
+    steady_df['Capped'] = steady_df['Stop_Reason'] == 'max_warmup'
+
+    # Run_ID of a STEADY row is the function's detected warmup length
+    summary = steady_df.groupby(['Architecture', 'LLM_Source', 'Step']).agg(
+        Detections=('Run_ID', 'size'),
+        Warmup_Median=('Run_ID', 'median'),
+        Warmup_Max=('Run_ID', 'max'),
+        Capped=('Capped', 'sum'),
+        Steady_Round_Trip_ms=('Round_Trip_ms', 'median'),
+    )
+    with pd.option_context('display.float_format', '{:.2f}'.format, 'display.width', 200,
+                           'display.max_columns', None):
+        print(summary)
+
+
+def composite_sources(df: pd.DataFrame) -> set:
+    """
+    LLM_Source labels of composite pipelines: their Model is a --composite-name,
+    never a model of LLM_NAME_MAPPING.
+    """
+    if 'Model' not in df.columns:
+        return set()
+    return set(df.loc[df['Model'].notna() & ~df['Model'].isin(list(LLM_NAME_MAPPING)), 'LLM_Source'])
+
+
+def analyze_composites(df: pd.DataFrame) -> None:
+    """
+    Composite pipelines (a model/arch per stage, --stages / --auto-stages)
+    against the single-model pipelines on the same workload: mean summed
+    logic time and duration cost per run, each stage priced at its own
+    architecture (at equal memory, so cost is per GB configured).
+    """
+    print("\n" + "="*80)
+    print("COMPOSITE vs SINGLE-MODEL PIPELINES")
+    print("="*80)
+
+    composite_names = composite_sources(df)
+    if df.empty or not composite_names:
+        print("[!] No composite runs.")
+        return
+
+    steps = df[(df['Success'].astype(str).str.lower() == 'true') & (df['Type'] == 'BENCHMARK') &
+               (df['Step'].astype(str).str.startswith('Step '))].copy()
+    steps['Stage_Arch'] = steps['Function_Name'].str.extract(FUNCTION_ARCH_PATTERN, expand=False)
+    # Micro-USD per GB of memory
+    steps['Cost_uUSD'] = steps['Logic_Time_ms'] / 1000 * steps['Stage_Arch'].map(ARCH_PRICES) * 1e6
+    per_run = steps.groupby(['Workload_Type', 'LLM_Source', 'Architecture', 'Run_ID']).agg(
+        Logic_ms=('Logic_Time_ms', 'sum'), Cost_uUSD=('Cost_uUSD', 'sum'), Stages=('Step', 'nunique'))
+    # Only complete runs (all five stages) are comparable
+    per_run = per_run[per_run['Stages'] == 5]
+    summary = per_run.groupby(['Workload_Type', 'LLM_Source', 'Architecture'])[['Logic_ms', 'Cost_uUSD']].mean()
+    summary = summary.reset_index()
+    summary['Composite'] = summary['LLM_Source'].isin(composite_names)
+
+    for workload in workload_order(summary):
+        rows = summary[summary['Workload_Type'] == workload].copy()
+        singles = rows[~rows['Composite']]
+        if singles.empty or not rows['Composite'].any():
+            continue
+        rows['Vs_Fastest_Single_%'] = (1 - rows['Logic_ms'] / singles['Logic_ms'].min()) * 100
+        rows['Vs_Cheapest_Single_%'] = (1 - rows['Cost_uUSD'] / singles['Cost_uUSD'].min()) * 100
+        print(f"\n[{workload}] (positive % = faster / cheaper than the best single-model pipeline)")
+        with pd.option_context('display.float_format', '{:.2f}'.format, 'display.width', 200,
+                               'display.max_columns', None):
+            print(rows.drop(columns=['Workload_Type']).sort_values('Logic_ms').to_string(index=False))
+
+
+def billed_duration(steps: pd.DataFrame) -> Tuple[pd.Series, str]:
+    """
+    Duration to bill per invocation, and what it is. Lambda's billed duration
+    (init, payload decode, handler, response serialization) isn't in the CSVs.
+    The client round trip covers all of it plus the network, so it errs high.
+    Rows without one fall back to Logic_Time_ms, which leaves all but the
+    handler logic out and errs low.
+    """
+    round_trip = steps['Round_Trip_ms'] if 'Round_Trip_ms' in steps.columns else pd.Series(np.nan, steps.index)
+    round_trip = pd.to_numeric(round_trip, errors='coerce')
+    if round_trip.notna().all():
+        return round_trip, "round trip (upper bound)"
+    if round_trip.isna().all():
+        return steps['Logic_Time_ms'], "logic time only (lower bound)"
+    return round_trip.fillna(steps['Logic_Time_ms']), "round trip, logic time where missing (lower bound there)"
+
+
+def stage_options(df: pd.DataFrame, transfer_price: float, memory_mb: int) -> Tuple[pd.DataFrame, str]:
+    """
+    Every measured (arch, memory) option of every stage, per workload and LLM:
+    its p95 and mean round trip and its mean full cost per image. Also returns
+    what the duration cost was billed on (billed_duration).
+    """
+    steps = df[(df['Success'].astype(str).str.lower() == 'true') & (df['Type'] == 'BENCHMARK') &
+               (df['Step'].astype(str).str.startswith('Step ')) &
+               ~df['LLM_Source'].isin(composite_sources(df))].copy()
+    if steps.empty:
+        return pd.DataFrame(), ""
+    # The stage's own arch (a row's Architecture is the pipeline's)
+    steps['Stage_Arch'] = steps['Function_Name'].str.extract(FUNCTION_ARCH_PATTERN, expand=False)
+    memory = pd.to_numeric(steps['Memory_MB'], errors='coerce') if 'Memory_MB' in steps.columns else np.nan
+    steps['Memory_MB'] = pd.Series(memory, index=steps.index).fillna(memory_mb).astype(int)
+
+    duration_ms, billing_basis = billed_duration(steps)
+    billed_ms = np.ceil(duration_ms / BILLING_GRANULARITY_MS) * BILLING_GRANULARITY_MS
+    response_bytes = steps['Response_Bytes'].fillna(0) if 'Response_Bytes' in steps.columns else 0
+    steps['Cost'] = (
+        billed_ms / 1000 * steps['Memory_MB'] / 1024 * steps['Stage_Arch'].map(ARCH_PRICES)
+        + PRICE_REQUEST
+        + response_bytes / 1e9 * transfer_price
+        + np.where(steps['Step'].str.startswith('Step 5'), PRICE_S3_PUT, 0.0)
+    )
+    return steps.groupby(['Workload_Type', 'LLM_Source', 'Step', 'Stage_Arch', 'Memory_MB']).agg(
+        Latency_ms=('Round_Trip_ms', lambda values: values.quantile(PLANNER_QUANTILE)),
+        Mean_Latency_ms=('Round_Trip_ms', 'mean'),
+        Cost=('Cost', 'mean'),
+        Runs=('Cost', 'size'),
+    ).reset_index(), billing_basis
+
+
+def pareto_plans(options: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Latency/cost Pareto frontier of whole-pipeline plans (one option per stage),
+    sorted by latency. Both add up over stages, so a partial plan beaten on both
+    by another can never lead to a frontier plan and is dropped stage by stage.
+    """
+    plans = [{"latency": 0.0, "cost": 0.0, "stages": ()}]
+    for _, stage in options.groupby('Step', sort=True):
+        extended = [
+            {"latency": plan["latency"] + option.Latency_ms, "cost": plan["cost"] + option.Cost,
+             "stages": plan["stages"] + ((option.Step, option.Stage_Arch, option.Memory_MB),)}
+            for plan in plans for option in stage.itertuples()
+        ]
+        plans = []
+        for plan in sorted(extended, key=lambda p: (p["latency"], p["cost"])):
+            if not plans or plan["cost"] < plans[-1]["cost"]:
+                plans.append(plan)
+    return plans
+
+
+def uniform_plan(options: pd.DataFrame, arch: str) -> Optional[Dict[str, Any]]:
+    """
+    Every stage on `arch` at the most measured memory size: the single-arch baseline.
+    """
+    arch_options = options[options['Stage_Arch'] == arch]
+    if arch_options.empty:
+        return None
+    memory = arch_options['Memory_MB'].mode()[0]
+    chosen = arch_options[arch_options['Memory_MB'] == memory]
+    if chosen['Step'].nunique() != options['Step'].nunique():
+        return None
+    return {"latency": chosen['Latency_ms'].sum(), "cost": chosen['Cost'].sum()}
+
+
+def describe_plan(stages: Tuple) -> str:
+    return " ".join(f"{step.split()[1]}:{arch}/{memory}" for step, arch, memory in stages)
+
+
+def analyze_cost_planner(df: pd.DataFrame, slo_ms: Optional[float], transfer_price: float,
+                         memory_mb: int) -> None:
+    """
+    Cost-optimal arch (and memory, where the CSVs record it) per stage under a
+    latency SLO, for every workload and LLM. A plan's latency is the sum of its
+    stages' p95 round trips (an upper bound on the pipeline's p95), its cost
+    the full per-image bill: GB-seconds per started ms of each invocation's
+    round trip (Lambda's billed duration isn't recorded, see billed_duration),
+    request fees, data transfer out and step 5's S3 PUT. Reports cost per million images
+    against the all-x86 and all-ARM pipelines, and plots the Pareto frontier.
+    """
+    print("\n" + "="*80)
+    print("COST PLANNER: ARCH / MEMORY PER STAGE UNDER A LATENCY SLO")
+    print("="*80)
+
+    options, billing_basis = stage_options(df, transfer_price, memory_mb)
+    if options.empty:
+        print("[!] No successful step runs to plan from.")
+        return
+    print(f"[*] SLO: {f'{slo_ms:.0f} ms' if slo_ms else 'none'} on summed p{PLANNER_QUANTILE * 100:.0f} round trips | "
+          f"transfer out ${transfer_price}/GB | memory without Memory_MB: {memory_mb} MB")
+    print(f"[*] Duration billed on: {billing_basis}")
+
+    rows, frontiers = [], []
+    for (workload, llm), group in options.groupby(['Workload_Type', 'LLM_Source']):
+        if group['Step'].nunique() < 5:
+            print(f"[!] {workload} / {llm}: not every stage was measured, skipped.")
+            continue
+        frontier = pareto_plans(group)
+        frontiers += [{'Workload_Type': workload, 'LLM_Source': llm, 'Latency_ms': plan["latency"],
+                       'Cost_per_M': plan["cost"] * IMAGES_PER_PROJECTION} for plan in frontier]
+        feasible = [plan for plan in frontier if slo_ms is None or plan["latency"] <= slo_ms]
+        row = {'Workload_Type': workload, 'LLM_Source': llm}
+        for arch in ARCH_PRICES:
+            baseline = uniform_plan(group, arch)
+            row[f'All_{arch}_per_M'] = baseline["cost"] * IMAGES_PER_PROJECTION if baseline else np.nan
+        if not feasible:
+            rows.append({**row, 'Plan': f"none meets the SLO (fastest {frontier[0]['latency']:.0f} ms)"})
+            continue
+        # The frontier is sorted by latency with falling cost: the last feasible plan is the cheapest
+        best = feasible[-1]
+        rows.append({
+            **row,
+            'Plan': describe_plan(best["stages"]),
+            'Latency_ms': best["latency"],
+            'Cost_per_M': best["cost"] * IMAGES_PER_PROJECTION,
+        })
+
+    if not rows:
+        return
+    summary = pd.DataFrame(rows).set_index(['Workload_Type', 'LLM_Source'])
+    for arch in ARCH_PRICES:
+        if 'Cost_per_M' in summary.columns:
+            summary[f'Saving_vs_{arch}_%'] = (1 - summary['Cost_per_M'] / summary[f'All_{arch}_per_M']) * 100
+    print(f"\n(cost in USD per {IMAGES_PER_PROJECTION:,} images; plan = step:arch/memory MB)")
+    with pd.option_context('display.float_format', '{:.2f}'.format, 'display.width', 250,
+                           'display.max_columns', None, 'display.max_colwidth', 80):
+        print(summary)
+
+    frontier_df = pd.DataFrame(frontiers)
+    PLOTS_DIR.mkdir(parents=True, exist_ok=True)
+    sns.set_theme(style="whitegrid")
+    g = sns.relplot(
+        data=frontier_df, kind="line", x="Latency_ms", y="Cost_per_M", hue="LLM_Source",
+        col="Workload_Type", col_order=workload_order(frontier_df), marker="o", drawstyle="steps-post",
+        palette="muted", height=5, aspect=1.2, facet_kws={'sharex': False, 'sharey': False}
+    )
+    if slo_ms:
+        for ax in g.axes.flat:
+            ax.axvline(slo_ms, color='red', linestyle='--', linewidth=1)
+    g.set_axis_labels(f"Pipeline latency (sum of p{PLANNER_QUANTILE * 100:.0f} round trips, ms)",
+                      f"USD per {IMAGES_PER_PROJECTION:,} images")
+    g.fig.subplots_adjust(top=0.85)
+    g.fig.suptitle('Latency / Cost Pareto Frontier of Per-Stage Arch Plans')
+    g.savefig(PLOTS_DIR / "cost_pareto_frontier.png")
+    plt.close()
+    print(f"    [Plotting] Generated latency/cost Pareto frontier plot.")
+
+
+def load_image_metadata(image_dirs: List[Path]) -> pd.DataFrame:
+    """
+    Pixels, file bytes and mode of every image under `image_dirs`, by file name
+    (the CSVs' Image column). Only headers are read.
+    """
+    rows = {}
+    for image_dir in image_dirs:
+        for path in sorted(image_dir.rglob("*")):
+            if path.suffix.lower() not in ('.jpg', '.jpeg', '.png') or path.name in rows:
+                continue
+            try:
+                with Image.open(path) as img:
+                    width, height, mode = img.width, img.height, img.mode
+            except OSError:
+                continue
+            rows[path.name] = {'Image': path.name, 'Width': width, 'Height': height, 'Pixels': width * height,
+                               'Image_Bytes': path.stat().st_size, 'Image_Mode': mode}
+    return pd.DataFrame(rows.values())
+
+
+def fit_scaling(megapixels: np.ndarray, latency_ms: np.ndarray) -> Optional[Dict[str, Any]]:
+    """
+    Least squares latency = overhead + per-MP cost x megapixels, with t
+    confidence intervals for both. With enough distinct sizes, also tests a
+    quadratic term: a positive one whose interval excludes 0 means the stage
+    scales super-linearly.
+    """
+    sizes = np.unique(megapixels).size
+    count = len(megapixels)
+    if sizes < MIN_SIZES_LINEAR or count - 2 < MIN_FIT_DF:
+        return None
+    t_crit = sampling.t_quantile((1 + SCALING_CONFIDENCE) / 2, count - 2)
+    design = np.column_stack([np.ones(count), megapixels])
+    coef, _, _, _ = np.linalg.lstsq(design, latency_ms, rcond=None)
+    residuals = latency_ms - design @ coef
+    sigma2 = residuals @ residuals / (count - 2)
+    covariance = sigma2 * np.linalg.inv(design.T @ design)
+    stderr = np.sqrt(np.diag(covariance))
+    total = ((latency_ms - latency_ms.mean()) ** 2).sum()
+    fit = {
+        'overhead_ms': coef[0], 'overhead_ci': t_crit * stderr[0],
+        'ms_per_mp': coef[1], 'ms_per_mp_ci': t_crit * stderr[1],
+        'r2': 1 - (residuals @ residuals) / total if total > 0 else 1.0,
+        'n': count, 'sizes': sizes, 'max_mp': megapixels.max(),
+        'coef': coef, 'covariance': covariance, 't_crit': t_crit,
+        'quadratic_ms_per_mp2': np.nan, 'super_linear': False,
+    }
+    if sizes >= MIN_SIZES_QUADRATIC and count - 3 >= MIN_FIT_DF:
+        design_q = np.column_stack([design, megapixels ** 2])
+        coef_q, _, _, _ = np.linalg.lstsq(design_q, latency_ms, rcond=None)
+        residuals_q = latency_ms - design_q @ coef_q
+        stderr_q = np.sqrt(residuals_q @ residuals_q / (count - 3) * np.linalg.inv(design_q.T @ design_q)[2, 2])
+        fit['quadratic_ms_per_mp2'] = coef_q[2]
+        fit['super_linear'] = bool(coef_q[2] - sampling.t_quantile((1 + SCALING_CONFIDENCE) / 2, count - 3)
+                                   * stderr_q > 0)
+    return fit
+
+
+def predict_latency(fit: Dict[str, Any], megapixels: float) -> Tuple[float, float]:
+    """
+    Predicted mean latency at `megapixels` and its confidence half-width.
+    """
+    point = np.array([1.0, megapixels])
+    return float(point @ fit['coef']), float(fit['t_crit'] * np.sqrt(point @ fit['covariance'] @ point))
+
+
+def analyze_scaling(df: pd.DataFrame, image_dirs: List[Path], predict_mp: List[float], memory_mb: int) -> None:
+    """
+    Latency vs image size instead of workload categories: joins every step row
+    with its image's pixels, bytes and mode, fits overhead + per-megapixel cost
+    per stage, variant (the function's own model) and architecture, flags
+    super-linear stages, and predicts latency and cost for new sizes. Only rows
+    whose stage received the image itself count (standalone runs and step 1;
+    pipeline steps 2-5 get an earlier stage's output).
+    """
+    print("\n" + "="*80)
+    print("SCALING: LATENCY vs MEGAPIXELS")
+    print("="*80)
+
+    if df.empty or 'Image' not in df.columns:
+        print("[!] The CSVs have no Image column (older runner versions didn't log it): nothing to join image sizes on.")
+        return
+    metadata = load_image_metadata(image_dirs)
+    if metadata.empty:
+        print(f"[!] No image metadata (looked for the CSVs' images under {', '.join(map(str, image_dirs))}).")
+        return
+
+    steps = df[(df['Success'].astype(str).str.lower() == 'true') & (df['Type'] == 'BENCHMARK') &
+               (df['Step'].astype(str).str.startswith('Step '))].merge(metadata, on='Image', how='inner')
+    if steps.empty:
+        print("[!] No step rows for images that could be found.")
+        return
+    base64_bytes = 4 * np.ceil(steps['Image_Bytes'] / 3)
+    if 'Request_Bytes' in steps.columns:
+        gap = steps['Request_Bytes'] - base64_bytes
+        got_image = steps['Request_Bytes'].notna() & (gap >= 0) & (gap <= INPUT_MATCH_SLACK_BYTES)
+        # Older CSVs have no payload sizes: only step 1 surely received the image
+        got_image |= steps['Request_Bytes'].isna() & steps['Step'].str.startswith('Step 1')
+    else:
+        got_image = steps['Step'].str.startswith('Step 1')
+    steps = steps[got_image].copy()
+    steps['Megapixels'] = steps['Pixels'] / 1e6
+    function = steps['Function_Name'].str.extract(r'^([a-z]+)_func\d-(x86|arm)$')
+    steps['Variant'] = function[0].map(lambda model: LLM_NAME_MAPPING.get(model, model))
+    steps['Stage_Arch'] = function[1]
+    steps = steps.dropna(subset=['Variant', 'Stage_Arch'])
+    if 'Memory_MB' in steps.columns:
+        steps['Memory_MB'] = pd.to_numeric(steps['Memory_MB'], errors='coerce')
+
+    rows, predictions, fits = [], [], []
+    for (step, variant, arch, mode), group in steps.groupby(['Step', 'Variant', 'Stage_Arch', 'Image_Mode']):
+        fit = fit_scaling(group['Megapixels'].to_numpy(float), group['Logic_Time_ms'].to_numpy(float))
+        if fit is None:
+            continue
+        key = {'Step': step, 'Variant': variant, 'Arch': arch, 'Mode': mode}
+        rows.append({
+            **key,
+            'Sizes': fit['sizes'], 'Runs': fit['n'],
+            'Overhead_ms': fit['overhead_ms'], 'Overhead_CI': fit['overhead_ci'],
+            'ms_per_MP': fit['ms_per_mp'], 'ms_per_MP_CI': fit['ms_per_mp_ci'],
+            'MP_per_s': 1000 / fit['ms_per_mp'] if fit['ms_per_mp'] > 0 else np.nan,
+            'R2': fit['r2'],
+            'Super_Linear': fit['super_linear'],
+        })
+        fits.append((key, fit))
+        memory = group['Memory_MB'].median() if 'Memory_MB' in group.columns else np.nan
+        memory = memory_mb if pd.isna(memory) else memory
+        for mp in predict_mp:
+            latency, half_width = predict_latency(fit, mp)
+            billed_ms = np.ceil(max(latency, 0) / BILLING_GRANULARITY_MS) * BILLING_GRANULARITY_MS
+            cost = billed_ms / 1000 * memory / 1024 * ARCH_PRICES[arch] + PRICE_REQUEST
+            predictions.append({
+                **key, 'Megapixels': mp, 'Latency_ms': latency, 'CI_ms': half_width,
+                'Cost_per_M': cost * IMAGES_PER_PROJECTION,
+                # Beyond the largest measured size the linear model is an extrapolation
+                'Extrapolated': mp > fit['max_mp'],
+            })
+
+    if not rows:
+        print(f"[!] No stage was measured on {MIN_SIZES_LINEAR}+ image sizes in {MIN_FIT_DF + 2}+ runs.")
+        return
+    pd_options = ('display.float_format', '{:.3f}'.format, 'display.width', 250, 'display.max_columns', None)
+    summary = pd.DataFrame(rows).set_index(['Step', 'Variant', 'Arch', 'Mode'])
+    print(f"\n(logic time = overhead + ms_per_MP x megapixels, +/- {SCALING_CONFIDENCE:.0%} CI)")
+    with pd.option_context(*pd_options):
+        print(summary)
+    flagged = summary[summary['Super_Linear']]
+    if not flagged.empty:
+        print("\n[!] Super-linear scaling (significant quadratic term):")
+        for step, variant, arch, mode in flagged.index:
+            print(f"    {step} / {variant} / {arch} / {mode}")
+
+    if predictions:
+        forecast = pd.DataFrame(predictions).set_index(['Step', 'Variant', 'Arch', 'Mode', 'Megapixels'])
+        print(f"\n(predicted logic time; cost bills it + the request fee, a lower bound on the Lambda bill, "
+              f"USD per {IMAGES_PER_PROJECTION:,} images)")
+        with pd.option_context(*pd_options):
+            print(forecast)
+
+    PLOTS_DIR.mkdir(parents=True, exist_ok=True)
+    sns.set_theme(style="whitegrid")
+    g = sns.relplot(
+        data=steps, kind="scatter", x="Megapixels", y="Logic_Time_ms", hue="Variant", col="Step",
+        row="Stage_Arch", palette="muted", height=4, aspect=1.1, alpha=0.5,
+        facet_kws={'sharex': False, 'sharey': False}
+    )
+    palette = dict(zip(steps['Variant'].unique(), sns.color_palette("muted", steps['Variant'].nunique())))
+    for key, fit in fits:
+        ax = g.axes_dict.get((key['Arch'], key['Step']))
+        if ax is None:
+            continue
+        x = np.linspace(0, max(fit['max_mp'], max(predict_mp, default=0)), 50)
+        ax.plot(x, fit['coef'][0] + fit['coef'][1] * x, color=palette[key['Variant']], linewidth=1)
+    g.set_titles("{col_name} | {row_name}")
+    g.fig.subplots_adjust(top=0.82)
+    g.fig.suptitle('Logic Time vs Megapixels (linear fits, extended to the predicted sizes)')
+    g.savefig(PLOTS_DIR / "latency_vs_megapixels.png")
+    plt.close()
+    print(f"    [Plotting] Generated latency vs megapixels plot.")
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument('-p', '--process', action='store_true')
     parser.add_argument('--source', type=Path, default=SOURCE_DIR)
     parser.add_argument('--target', type=Path, default=TARGET_DIR)
+    parser.add_argument('--slo-ms', type=float, default=None,
+                        help='Pipeline latency SLO for the cost planner (summed per-stage p95 round trips)')
+    parser.add_argument('--transfer-price', type=float, default=PRICE_TRANSFER_OUT_GB,
+                        help='USD per GB of responses sent to the client (0 for a same-region client)')
+    parser.add_argument('--memory-mb', type=int, default=DEFAULT_MEMORY_MB,
+                        help='Function memory assumed for CSVs without a Memory_MB column')
+    parser.add_argument('--images', type=Path, nargs='+', default=IMAGE_DIRS,
+                        help='Directories holding the benchmarked images (scaling analysis)')
+    parser.add_argument('--predict-mp', type=float, nargs='+', default=DEFAULT_PREDICT_MP,
+                        help='Image sizes (megapixels) to predict latency and cost for')
     args = parser.parse_args()
 
     if args.process:
@@ -366,6 +1030,12 @@ def main() -> None:
     if not full_data.empty:
         analyze_primary_objective_llm_comparison(full_data)
         analyze_secondary_objective_architecture(full_data)
+        analyze_transfer_decomposition(full_data)
+        analyze_cold_starts(full_data)
+        analyze_steady_state(full_data)
+        analyze_composites(full_data)
+        analyze_cost_planner(full_data, args.slo_ms, args.transfer_price, args.memory_mb)
+        analyze_scaling(full_data, args.images, args.predict_mp, args.memory_mb)
     else:
         print("[!] No data found.")
 
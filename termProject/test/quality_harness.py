@@ -0,0 +1,353 @@
+import argparse
+import base64
+import csv
+import importlib.util
+import io
+import math
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# --- Configuration ---
+# Handler sources (same layout the deploy script packages)
+FUNCTIONS_DIR = Path(__file__).resolve().parent.parent / "functions"
+# Handlers import the bundled 'shared' package from their own directory
+sys.path.insert(0, str(FUNCTIONS_DIR))
+# Output directory for quality/latency CSVs
+RESULT_DIR = Path("./quality_results")
+
+MODELS = ["gpt", "gemini", "deepseek"]
+# "default" keeps each handler's own implementation (no params.engine)
+ENGINES = ["default", "pillow", "numpy"]
+
+# Same stage parameters as the benchmark runner (Step 5 is scored via the encoder sweep)
+STAGES = {
+    1: {"name": "Greyscale", "params": {}},
+    2: {"name": "Resize", "params": {"width": 800, "height": 600}},
+    3: {"name": "ColorDepth", "params": {"target_depth": 8}},
+    4: {"name": "Rotate", "params": {"angle": 90}},
+}
+
+# Encoder settings swept against every stage reference output
+ENCODER_SETTINGS: List[Tuple[str, str, Dict[str, Any]]] = [
+    ("JPEG q95", "JPEG", {"quality": 95}),
+    ("JPEG q85", "JPEG", {"quality": 85}),
+    ("JPEG q85 optimize", "JPEG", {"quality": 85, "optimize": True}),
+    ("JPEG q85 progressive", "JPEG", {"quality": 85, "progressive": True}),
+    ("JPEG q75", "JPEG", {"quality": 75}),
+    ("JPEG q60", "JPEG", {"quality": 60}),
+    ("PNG level1", "PNG", {"compress_level": 1}),
+    ("PNG level6", "PNG", {"compress_level": 6}),
+    ("PNG optimize", "PNG", {"optimize": True}),
+    ("WEBP q80", "WEBP", {"quality": 80}),
+    ("WEBP lossless", "WEBP", {"lossless": True}),
+]
+
+# SSIM constants (Wang et al. 2004, 8-bit dynamic range)
+SSIM_WINDOW = 11
+SSIM_SIGMA = 1.5
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+
+# --- Reference implementations (lossless, exact math) ---
+
+def reference_greyscale(img: Image.Image, params: Dict[str, Any]) -> Image.Image:
+    return img.convert("L")
+
+
+def reference_resize(img: Image.Image, params: Dict[str, Any]) -> Image.Image:
+    size = (int(params.get("width", 800)), int(params.get("height", 600)))
+    return img.resize(size, Image.Resampling.LANCZOS)
+
+
+def reference_color_depth(img: Image.Image, params: Dict[str, Any]) -> Image.Image:
+    """
+    The prompt's mapping evaluated in float64:
+    L -> 10-bit (x4) -> 255 * (p / 1023) ** (1 / 2.2) -> 8-bit.
+    """
+    luma = np.asarray(img.convert("L"), dtype=np.float64)
+    mapped = 255.0 * ((luma * 4.0) / 1023.0) ** (1.0 / 2.2)
+    return Image.fromarray(np.clip(np.rint(mapped), 0, 255).astype(np.uint8), "L")
+
+
+def reference_rotate(img: Image.Image, params: Dict[str, Any]) -> Image.Image:
+    return img.rotate(float(params.get("angle", 90)), expand=True)
+
+
+REFERENCES: Dict[int, Callable[[Image.Image, Dict[str, Any]], Image.Image]] = {
+    1: reference_greyscale,
+    2: reference_resize,
+    3: reference_color_depth,
+    4: reference_rotate,
+}
+
+
+# --- Metrics (vectorized) ---
+
+def _as_float_array(img: Image.Image) -> np.ndarray:
+    arr = np.asarray(img, dtype=np.float64)
+    return arr[..., np.newaxis] if arr.ndim == 2 else arr
+
+
+def _align(candidate: Image.Image, reference: Image.Image) -> Optional[Image.Image]:
+    """
+    Brings the candidate into the reference mode; returns None if the geometry differs.
+    """
+    if candidate.size != reference.size:
+        return None
+    if candidate.mode != reference.mode:
+        candidate = candidate.convert(reference.mode)
+    return candidate
+
+
+def psnr(candidate: Image.Image, reference: Image.Image) -> float:
+    aligned = _align(candidate, reference)
+    if aligned is None:
+        return float("nan")
+    diff = _as_float_array(aligned) - _as_float_array(reference)
+    mse = float(np.mean(diff * diff))
+    if mse == 0:
+        return float("inf")
+    return 10.0 * math.log10((255.0 ** 2) / mse)
+
+
+def _gaussian_kernel(size: int = SSIM_WINDOW, sigma: float = SSIM_SIGMA) -> np.ndarray:
+    x = np.arange(size, dtype=np.float64) - (size - 1) / 2.0
+    kernel = np.exp(-(x * x) / (2.0 * sigma * sigma))
+    return kernel / kernel.sum()
+
+
+def _filter2d(channel: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    """
+    Separable 'valid' Gaussian filter using strided windows (no Python loop over pixels).
+    """
+    windows = np.lib.stride_tricks.sliding_window_view(channel, kernel.size, axis=0)
+    rows = windows @ kernel
+    windows = np.lib.stride_tricks.sliding_window_view(rows, kernel.size, axis=1)
+    return windows @ kernel
+
+
+def ssim(candidate: Image.Image, reference: Image.Image) -> float:
+    aligned = _align(candidate, reference)
+    if aligned is None:
+        return float("nan")
+    a = _as_float_array(aligned)
+    b = _as_float_array(reference)
+    if min(a.shape[0], a.shape[1]) < SSIM_WINDOW:
+        return float("nan")
+
+    kernel = _gaussian_kernel()
+    scores = []
+    for c in range(a.shape[2]):
+        x, y = a[..., c], b[..., c]
+        mu_x, mu_y = _filter2d(x, kernel), _filter2d(y, kernel)
+        sigma_x = _filter2d(x * x, kernel) - mu_x * mu_x
+        sigma_y = _filter2d(y * y, kernel) - mu_y * mu_y
+        sigma_xy = _filter2d(x * y, kernel) - mu_x * mu_y
+        ssim_map = ((2 * mu_x * mu_y + SSIM_C1) * (2 * sigma_xy + SSIM_C2)) / \
+            ((mu_x * mu_x + mu_y * mu_y + SSIM_C1) * (sigma_x + sigma_y + SSIM_C2))
+        scores.append(float(ssim_map.mean()))
+    return statistics.mean(scores)
+
+
+# --- Runners ---
+
+def load_handler(model: str, step_id: int) -> Tuple[Optional[Callable], Optional[str]]:
+    """
+    Imports functions/<model>/<model>_func<N>.py the way Lambda would (as a standalone module).
+    """
+    path = FUNCTIONS_DIR / model / f"{model}_func{step_id}.py"
+    try:
+        spec = importlib.util.spec_from_file_location(f"{model}_func{step_id}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.lambda_handler, None
+    except Exception as e:
+        return None, f"Import failed: {e}"
+
+
+def encode_b64_image(img: Image.Image) -> str:
+    # Lossless hand-off so the next stage is scored on exact reference pixels
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+def score_handler(handler: Callable, payload: Dict[str, Any], reference: Image.Image,
+                  repeats: int) -> Dict[str, Any]:
+    wall_times: List[float] = []
+    logic_times: List[float] = []
+    response: Dict[str, Any] = {}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = handler(payload, None)
+        wall_times.append((time.perf_counter() - start) * 1000)
+        logic_times.append(float(response.get("execution_time_ms") or 0.0))
+        if not response.get("success"):
+            return {"Error": response.get("error", "Unknown Error")}
+
+    output_bytes = base64.b64decode(response["image"])
+    output = Image.open(io.BytesIO(output_bytes))
+    output.load()
+    return {
+        "Latency_ms": statistics.median(wall_times),
+        "Logic_Time_ms": statistics.median(logic_times),
+        "Output_Bytes": len(output_bytes),
+        "Output_Mode": output.mode,
+        "PSNR_dB": psnr(output, reference),
+        "SSIM": ssim(output, reference),
+    }
+
+
+def score_encoder(reference: Image.Image, fmt: str, options: Dict[str, Any],
+                  repeats: int) -> Dict[str, Any]:
+    times: List[float] = []
+    data = b""
+    try:
+        for _ in range(repeats):
+            buffer = io.BytesIO()
+            start = time.perf_counter()
+            reference.save(buffer, format=fmt, **options)
+            times.append((time.perf_counter() - start) * 1000)
+            data = buffer.getvalue()
+        output = Image.open(io.BytesIO(data))
+        output.load()
+    except Exception as e:
+        return {"Error": str(e)}
+
+    return {
+        "Latency_ms": statistics.median(times),
+        "Logic_Time_ms": statistics.median(times),
+        "Output_Bytes": len(data),
+        "Output_Mode": output.mode,
+        "PSNR_dB": psnr(output, reference),
+        "SSIM": ssim(output, reference),
+    }
+
+
+def mark_pareto(rows: List[Dict[str, Any]]) -> None:
+    """
+    Flags rows not dominated on (lower latency, higher PSNR) within the given group.
+    """
+    valid = [r for r in rows if not r.get("Error") and not math.isnan(r["PSNR_dB"])]
+    for row in rows:
+        row["Pareto"] = False
+    for row in valid:
+        row["Pareto"] = not any(
+            other["Latency_ms"] <= row["Latency_ms"] and other["PSNR_dB"] >= row["PSNR_dB"]
+            and (other["Latency_ms"] < row["Latency_ms"] or other["PSNR_dB"] > row["PSNR_dB"])
+            for other in valid
+        )
+
+
+def run_quality(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    print(f"\n🔬 Quality Harness | Images: {', '.join(args.images)} | Mode: {args.mode}")
+    print(f"🔄 Repeats: {args.repeats} | Models: {', '.join(args.models)}")
+
+    handlers = {(m, s): load_handler(m, s) for m in args.models for s in STAGES}
+    results: List[Dict[str, Any]] = []
+
+    for image_path in args.images:
+        original = Image.open(image_path)
+        original.load()
+        original_b64 = base64.b64encode(Path(image_path).read_bytes()).decode("utf-8")
+
+        stage_input, stage_input_b64 = original, original_b64
+        for step_id, stage in STAGES.items():
+            step_label = f"Step {step_id} ({stage['name']})"
+            reference = REFERENCES[step_id](stage_input, stage["params"])
+            print(f"  👉 {Path(image_path).name} | {step_label} ...")
+
+            stage_rows: List[Dict[str, Any]] = []
+            for model in args.models:
+                handler, import_error = handlers[(model, step_id)]
+                for engine in args.engines:
+                    params = dict(stage["params"])
+                    if engine != "default":
+                        params["engine"] = engine
+                    payload = {"image": stage_input_b64, "params": params}
+                    metrics = ({"Error": import_error} if handler is None
+                               else score_handler(handler, payload, reference, args.repeats))
+                    stage_rows.append({"Kind": "handler", "Variant": f"{model}_func{step_id}",
+                                       "Setting": engine, **metrics})
+
+            for label, fmt, options in ENCODER_SETTINGS:
+                metrics = score_encoder(reference, fmt, options, args.repeats)
+                stage_rows.append({"Kind": "encoder", "Variant": fmt, "Setting": label, **metrics})
+
+            # Handlers include decode + encode, so they are ranked among themselves
+            mark_pareto([r for r in stage_rows if r["Kind"] == "handler"])
+            mark_pareto([r for r in stage_rows if r["Kind"] == "encoder"])
+            for row in stage_rows:
+                row.update({"Image": Path(image_path).name, "Step": step_label})
+            results.extend(stage_rows)
+
+            # Pipeline mode scores every stage on the exact output of the previous reference
+            if args.mode == "pipeline":
+                stage_input, stage_input_b64 = reference, encode_b64_image(reference)
+
+    return results
+
+
+def save_results(results: List[Dict[str, Any]]) -> Path:
+    RESULT_DIR.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_path = RESULT_DIR / f"quality_{timestamp}.csv"
+    fieldnames = ["Image", "Step", "Kind", "Variant", "Setting", "Latency_ms", "Logic_Time_ms",
+                  "Output_Bytes", "Output_Mode", "PSNR_dB", "SSIM", "Pareto", "Error"]
+    with csv_path.open(mode="w", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+    return csv_path
+
+
+def print_pareto_table(results: List[Dict[str, Any]]) -> None:
+    print("\n" + "=" * 96)
+    print("📈 LATENCY vs QUALITY (★ = Pareto-optimal among handlers / among encoders)")
+    print("=" * 96)
+    header = f"{'':<2}{'Variant / Setting':<32} | {'Latency (ms)':>12} | {'Bytes':>10} | {'PSNR (dB)':>9} | {'SSIM':>6}"
+
+    keys = sorted({(r["Image"], r["Step"]) for r in results}, key=lambda k: (k[0], k[1]))
+    for image, step in keys:
+        print(f"\n🖼️  {image} | {step}")
+        print(header)
+        print("-" * 96)
+        rows = [r for r in results if r["Image"] == image and r["Step"] == step]
+        for row in sorted(rows, key=lambda r: (bool(r.get("Error")), r.get("Latency_ms", 0.0))):
+            name = f"{row['Variant']} [{row['Setting']}]" if row["Kind"] == "handler" else row["Setting"]
+            if row.get("Error"):
+                print(f"{'':<2}{name:<32} | ❌ {row['Error'][:56]}")
+                continue
+            star = "★" if row["Pareto"] else ""
+            print(f"{star:<2}{name:<32} | {row['Latency_ms']:>12.2f} | {row['Output_Bytes']:>10} | "
+                  f"{row['PSNR_dB']:>9.2f} | {row['SSIM']:>6.4f}")
+    print("=" * 96)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TCSS 562 Quality-vs-Speed Harness")
+    parser.add_argument("--images", nargs="+",
+                        default=["images/std.jpg", "images/heavy.jpg", "images/light.jpg"],
+                        help="Input image paths")
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=MODELS,
+                        help="Handler variants to score")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES,
+                        help="Engines to request via params.engine")
+    parser.add_argument("--mode", choices=["pipeline", "standalone"], default="standalone",
+                        help="pipeline: each stage gets the previous reference output; standalone: original image")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Timed repetitions per handler/encoder (median is reported)")
+
+    args = parser.parse_args()
+
+    quality_results = run_quality(args)
+    print_pareto_table(quality_results)
+    print(f"\n✅ Quality results saved to: {save_results(quality_results)}")
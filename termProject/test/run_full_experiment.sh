@@ -1,4 +1,6 @@
 #!/bin/bash
+# Superseded by orchestrator.py (interleaved, resumable, concurrent cells):
+#   python3 orchestrator.py manifests/full_experiment.json --runner benchmark
 
 # Define image set
 IMAGES=("std.jpg" "heavy.jpg" "light.jpg")
@@ -0,0 +1,151 @@
+"""
+Sequential sampling: keep running until the logic-time confidence interval
+is tight enough, instead of a fixed run count.
+
+After `min_runs`, the caller checks every step's CI after each run (the runner)
+or batch (the orchestrator) and stops once all of them are within `target`:
+CI half-width <= target x estimate. `max_runs` is the hard cap.
+
+- stat "mean", method "t": Student-t interval.
+- stat "mean" or "p95", method "bootstrap": percentile bootstrap with a fixed
+  seed, so a rerun on the same data reaches the same decision.
+"""
+import functools
+import math
+import random
+import statistics
+from typing import Any, Dict, List, Optional, Tuple
+
+CI_STATS = ("mean", "p95")
+CI_METHODS = ("t", "bootstrap")
+BOOTSTRAP_RESAMPLES = 2000
+BOOTSTRAP_SEED = 562
+# Fewest runs before a CI may stop sampling: with fewer, the sample SD is too unstable to trust
+MIN_RUNS = 5
+# Continued-fraction terms for the incomplete beta (t quantiles converge in far fewer)
+BETA_MAX_TERMS = 300
+
+# Row Type of the per-step CI rows (pipeline totals already use SUMMARY)
+CI_ROW_TYPE = "CI"
+# Stop reasons written to the CI rows
+STOP_CI = "ci_target"
+STOP_CAP = "max_runs"
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Linear interpolation between closest ranks (numpy's default), q in [0, 1].
+    """
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def statistic(values: List[float], stat: str) -> float:
+    return statistics.mean(values) if stat == "mean" else percentile(values, 0.95)
+
+
+def _incomplete_beta(x: float, a: float, b: float) -> float:
+    """
+    Regularized incomplete beta I_x(a, b), by Lentz's continued fraction.
+    """
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        # The fraction converges fast only below the mean; use the symmetry there
+        return 1.0 - _incomplete_beta(1.0 - x, b, a)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log1p(-x)) / a
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, BETA_MAX_TERMS):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            delta = c * d
+            result *= delta
+        if abs(delta - 1.0) < 1e-15:
+            break
+    return front * result
+
+
+def t_cdf(t: float, df: int) -> float:
+    tail = 0.5 * _incomplete_beta(df / (df + t * t), df / 2, 0.5)
+    return 1.0 - tail if t > 0 else tail
+
+
+@functools.lru_cache(maxsize=None)
+def t_quantile(p: float, df: int) -> float:
+    """
+    Student-t quantile, by bisection on the exact CDF, so no scipy is needed.
+    Matches the printed t tables (e.g. 4.6041 at p=0.995, df=4) at any level.
+    """
+    if p < 0.5:
+        return -t_quantile(1.0 - p, df)
+    low, high = 0.0, 1.0
+    while t_cdf(high, df) < p:
+        low, high = high, high * 2
+    while high - low > 1e-12 * high:
+        middle = (low + high) / 2
+        if t_cdf(middle, df) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def confidence_interval(values: List[float], stat: str, method: str, level: float) -> Optional[Dict[str, float]]:
+    """
+    {estimate, low, high, rel_half_width}, or None with fewer than 2 values.
+    """
+    if len(values) < 2:
+        return None
+    estimate = statistic(values, stat)
+    if method == "t":
+        half = t_quantile((1 + level) / 2, len(values) - 1) * statistics.stdev(values) / math.sqrt(len(values))
+        low, high = estimate - half, estimate + half
+    else:
+        rng = random.Random(BOOTSTRAP_SEED)
+        replicates = [statistic(rng.choices(values, k=len(values)), stat) for _ in range(BOOTSTRAP_RESAMPLES)]
+        low = percentile(replicates, (1 - level) / 2)
+        high = percentile(replicates, (1 + level) / 2)
+    return {
+        "estimate": estimate,
+        "low": low,
+        "high": high,
+        "rel_half_width": (high - low) / 2 / estimate if estimate > 0 else math.inf,
+    }
+
+
+def check(samples: Dict[Any, List[float]], stat: str, method: str, level: float,
+          target: float) -> Tuple[bool, Dict[Any, Optional[Dict[str, float]]]]:
+    """
+    (every CI within target, CI per key). A key without a CI yet never converges.
+    """
+    intervals = {key: confidence_interval(values, stat, method, level) for key, values in samples.items()}
+    converged = bool(intervals) and all(
+        ci is not None and ci["rel_half_width"] <= target for ci in intervals.values())
+    return converged, intervals
+
+
+def summary_columns(ci: Optional[Dict[str, float]], stat: str, method: str, level: float,
+                    reason: str) -> Dict[str, Any]:
+    """
+    The CI columns of a CI row.
+    """
+    return {
+        'CI_Stat': f"{stat} {level:.0%} {method}",
+        'CI_Low': ci["low"] if ci else None,
+        'CI_High': ci["high"] if ci else None,
+        'CI_Rel_Width': ci["rel_half_width"] if ci else None,
+        'Stop_Reason': reason,
+    }
@@ -0,0 +1,135 @@
+"""
+Steady-state detection (`--warmup auto`): end the warmup once the latency
+transient is over, instead of after a fixed number of runs.
+
+Each function's round-trip latencies are fed in one run at a time. After every
+sample, binary segmentation looks for mean shifts in the log latency (cold
+starts and cache warm-up are multiplicative, and the log makes one threshold
+fit a 5 ms and a 500 ms function alike). A split is kept when it lowers the
+squared error by more than PENALTY x sigma^2 x ln(n), with sigma estimated
+robustly from the first differences so the transient itself does not inflate it.
+
+Mean shifts miss a slow drift, so the function is steady once `window`
+samples have followed its last change point and their fitted trend moves the
+latency by less than TREND_SIGMAS x sigma across the window. The last change
+point is then its detected warmup length. The window samples are
+still warmup runs: only runs after every function is steady are benchmarked.
+"""
+import math
+import statistics
+from typing import List, Optional
+
+DEFAULT_WINDOW = 5
+DEFAULT_MAX_WARMUP = 30
+PENALTY = 3.0
+TREND_SIGMAS = 2.0
+# Noise floor for sigma (log scale, ~0.5%), so identical samples do not make every split significant
+MIN_SIGMA = 0.005
+
+# Row Type of the per-step detection rows
+STEADY_ROW_TYPE = "STEADY"
+# Why the warmup ended, written to the detection rows
+STOP_STEADY = "steady_state"
+STOP_CAP = "max_warmup"
+
+
+def noise_sigma(values: List[float]) -> float:
+    """
+    Robust noise estimate: MAD of the first differences, scaled to a standard deviation.
+    """
+    if len(values) < 3:
+        return MIN_SIGMA
+    diffs = [abs(b - a) for a, b in zip(values, values[1:])]
+    return max(statistics.median(diffs) / (0.6745 * math.sqrt(2)), MIN_SIGMA)
+
+
+def _sse(prefix: List[float], prefix_sq: List[float], start: int, end: int) -> float:
+    count = end - start
+    total = prefix[end] - prefix[start]
+    return prefix_sq[end] - prefix_sq[start] - total * total / count
+
+
+def change_points(values: List[float], sigma: float) -> List[int]:
+    """
+    Sorted indices where a new mean segment starts (binary segmentation).
+    """
+    prefix, prefix_sq = [0.0], [0.0]
+    for value in values:
+        prefix.append(prefix[-1] + value)
+        prefix_sq.append(prefix_sq[-1] + value * value)
+    threshold = PENALTY * sigma * sigma * math.log(max(len(values), 2))
+
+    points: List[int] = []
+    segments = [(0, len(values))]
+    while segments:
+        start, end = segments.pop()
+        if end - start < 2:
+            continue
+        whole = _sse(prefix, prefix_sq, start, end)
+        gain, split = max((whole - _sse(prefix, prefix_sq, start, k) - _sse(prefix, prefix_sq, k, end), k)
+                          for k in range(start + 1, end))
+        if gain > threshold:
+            points.append(split)
+            segments += [(start, split), (split, end)]
+    return sorted(points)
+
+
+def trend_change(values: List[float]) -> float:
+    """
+    First-to-last change of the least-squares line through the values.
+    """
+    count = len(values)
+    if count < 2:
+        return 0.0
+    x_mean = (count - 1) / 2
+    y_mean = statistics.mean(values)
+    slope = (sum((x - x_mean) * (y - y_mean) for x, y in enumerate(values))
+             / sum((x - x_mean) ** 2 for x in range(count)))
+    return slope * (count - 1)
+
+
+class SteadyStateDetector:
+    """
+    Online detector for one function. `add` returns True once it is steady.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self.log_latencies: List[float] = []
+        self.latencies: List[float] = []
+        # Samples before the last change point, once steady
+        self.warmup: Optional[int] = None
+
+    @property
+    def steady(self) -> bool:
+        return self.warmup is not None
+
+    def add(self, latency_ms: float) -> bool:
+        if self.steady:
+            return True
+        self.latencies.append(latency_ms)
+        self.log_latencies.append(math.log(max(latency_ms, 1e-3)))
+        sigma = noise_sigma(self.log_latencies)
+        points = change_points(self.log_latencies, sigma)
+        last = points[-1] if points else 0
+        tail = self.log_latencies[-self.window:]
+        if (len(self.log_latencies) - last >= self.window
+                and abs(trend_change(tail)) < TREND_SIGMAS * sigma):
+            self.warmup = last
+        return self.steady
+
+    def force(self) -> None:
+        """
+        Ends detection at the warmup cap: the transient is taken to end at the last change point so far.
+        """
+        if not self.steady:
+            points = change_points(self.log_latencies, noise_sigma(self.log_latencies))
+            self.warmup = points[-1] if points else 0
+
+    def steady_mean(self) -> Optional[float]:
+        """
+        Mean latency of the window that was judged steady.
+        """
+        if not self.steady or not self.latencies:
+            return None
+        return statistics.mean(self.latencies[-self.window:])